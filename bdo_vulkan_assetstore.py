@@ -0,0 +1,273 @@
+# bdo_vulkan_assetstore.py
+"""
+Content-addressed, compressed preset store for the bundled build.
+
+Instead of one folder per preset (each with its own copy of dxgi.dll and
+dxvk.conf), the build packs every preset into a single file,
+assets/presets.pack:
+
+    "BDOPACK1", u32 index length, index (JSON), blobs
+
+The index lists each preset's files (path, size, mtime, sha256) and, per
+sha256, where its blob lies in the pack and how it is compressed (lzma, zlib
+or stored). A file shared by several presets or DXVK versions is stored once.
+Blobs are only decompressed when a file is actually deployed, streamed in
+chunks and checked against their sha256 on the way; manifests and delta
+checks use the digests from the index without touching the blobs.
+
+    python bdo_vulkan_assetstore.py build assets/presets.pack Normal=assets/Normal Potato=assets/Potato
+    python bdo_vulkan_assetstore.py list assets/presets.pack
+
+A preset named <Mode>@<version> (e.g. Normal@2.6.1) is another DXVK version
+of <Mode>, picked with [assets] dxvk_version in the config.
+"""
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+
+from bdo_vulkan_core import DeploySource, DirectorySource, SourceFile, load_config, log
+
+PACK_MAGIC = b"BDOPACK1"
+PACK_VERSION = 1
+CODECS = ("lzma", "zlib", "store")
+READ_CHUNK = 1 << 16   # compressed bytes read from the pack at a time
+
+_HEADER = struct.Struct("<8sI")
+
+
+class PackError(ValueError):
+    pass
+
+
+def read_index(path) -> dict:
+    """The pack's index, with "data" set to the offset its blob offsets count from."""
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size or raw[:8] != PACK_MAGIC:
+            raise PackError(f"{path}: not a preset pack")
+        _, length = _HEADER.unpack(raw)
+        try:
+            index = json.loads(f.read(length).decode("utf-8"))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise PackError(f"{path}: bad index: {e}") from None
+    if index.get("version") != PACK_VERSION:
+        raise PackError(f"{path}: unsupported pack version {index.get('version')}")
+    index["data"] = _HEADER.size + length
+    return index
+
+
+def _decompressor(codec: str):
+    if codec == "lzma":
+        import lzma
+        return lzma.LZMADecompressor()
+    if codec == "zlib":
+        import zlib
+        return zlib.decompressobj()
+    if codec == "store":
+        return None
+    raise PackError(f"unknown codec {codec!r}")
+
+
+class BlobReader(io.RawIOBase):
+    """One blob of a pack as a stream: read, decompressed and hashed a chunk at a time."""
+
+    def __init__(self, pack: Path, offset: int, stored: int, codec: str, size: int, digest: str):
+        self._d = _decompressor(codec)
+        self._f = open(pack, "rb")
+        self._f.seek(offset)
+        self._left = stored
+        self._size, self._digest = size, digest
+        self._hash = hashlib.sha256()
+        self._out = 0
+        self._buf = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self):
+        chunk = self._f.read(min(READ_CHUNK, self._left))
+        if not chunk:
+            raise PackError("pack truncated")
+        self._left -= len(chunk)
+        data = self._d.decompress(chunk) if self._d else chunk
+        if not self._left and hasattr(self._d, "flush"):
+            data += self._d.flush()
+        self._hash.update(data)
+        self._out += len(data)
+        self._buf += data
+        if not self._left and (self._out != self._size or self._hash.hexdigest() != self._digest):
+            raise PackError(f"corrupt blob {self._digest[:12]}")
+
+    def readinto(self, b) -> int:
+        while not self._buf and self._left:
+            self._fill()
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        del self._buf[:n]
+        return n
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+class PackSource(DeploySource):
+    """One preset of a pack."""
+
+    def __init__(self, pack, preset: str, index: dict | None = None):
+        self.pack = Path(pack)
+        self.preset = preset
+        self._index = index if index is not None else read_index(self.pack)
+        try:
+            entries = self._index["presets"][preset]
+        except KeyError:
+            raise PackError(f"{self.pack}: no preset {preset!r}") from None
+        self._files = [SourceFile(rel, size, mtime_ns, digest)
+                       for rel, size, mtime_ns, digest in entries]
+
+    def __str__(self):
+        return f"{self.pack}!{self.preset}"
+
+    def files(self) -> list[SourceFile]:
+        return list(self._files)
+
+    def _archive_stamp(self) -> list[int]:
+        st = os.stat(self.pack)
+        return [st.st_size, st.st_mtime_ns]
+
+    def scan(self) -> tuple[list[SourceFile], dict | None]:
+        return self.files(), {"archive": self._archive_stamp()}
+
+    def stamp_current(self, stamp: dict, files: list[SourceFile]) -> bool:
+        try:
+            return stamp.get("archive") == self._archive_stamp()
+        except OSError:
+            return False
+
+    def digest(self, sf: SourceFile) -> str:
+        return sf.digest or next(f.digest for f in self._files if f.rel == sf.rel)
+
+    def open(self, sf: SourceFile):
+        digest = self.digest(sf)
+        blob = self._index["blobs"][digest]
+        raw = BlobReader(self.pack, self._index["data"] + blob["offset"], blob["stored"],
+                         blob["codec"], sf.size, digest)
+        return io.BufferedReader(raw, READ_CHUNK)
+
+
+def pack_preset_name(presets, mode: str, cfg=None) -> str | None:
+    """The preset of the pack to use for mode: <mode>@<[assets] dxvk_version> if packed, else <mode>."""
+    cfg = cfg if cfg is not None else load_config()
+    version = cfg.get("assets", "dxvk_version", fallback="").strip()
+    if version:
+        if f"{mode}@{version}" in presets:
+            return f"{mode}@{version}"
+        log.warning(f"[ASSETS] No {mode} preset for DXVK {version} in the pack; using the default")
+    return mode if mode in presets else None
+
+
+def open_pack_source(pack, mode: str) -> PackSource | None:
+    index = read_index(pack)
+    name = pack_preset_name(index["presets"], mode)
+    return PackSource(pack, name, index) if name else None
+
+
+# ==========================
+# Building packs
+# ==========================
+
+def _compress(data: bytes, codec: str) -> tuple[str, bytes]:
+    if codec == "lzma":
+        import lzma
+        # A dictionary no bigger than the file keeps the decoder's memory small;
+        # the x86 branch filter makes DLL code compress noticeably better.
+        dict_size = max(1 << 16, min(1 << 26, 1 << max(len(data) - 1, 1).bit_length()))
+        filters = [{"id": lzma.FILTER_LZMA2, "preset": 9 | lzma.PRESET_EXTREME, "dict_size": dict_size}]
+        if data[:2] == b"MZ":
+            filters.insert(0, {"id": lzma.FILTER_X86})
+        packed = lzma.compress(data, filters=filters)
+    elif codec == "zlib":
+        import zlib
+        packed = zlib.compress(data, 9)
+    else:
+        return "store", data
+    return (codec, packed) if len(packed) < len(data) else ("store", data)
+
+
+def build_pack(out, presets: dict[str, str], codec: str = "lzma") -> dict:
+    """Write the {name: folder} presets into a pack at out; returns size stats."""
+    if codec not in CODECS:
+        raise PackError(f"unknown codec {codec!r}")
+    index = {"version": PACK_VERSION, "presets": {}, "blobs": {}}
+    chunks, offset, raw_bytes, files = [], 0, 0, 0
+    for name, folder in presets.items():
+        source = DirectorySource(folder)
+        entries = []
+        for sf in sorted(source.files(), key=lambda f: f.rel):
+            with source.open(sf) as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            entries.append([sf.rel, len(data), sf.mtime_ns, digest])
+            files += 1
+            raw_bytes += len(data)
+            if digest in index["blobs"]:
+                continue
+            used, packed = _compress(data, codec)
+            index["blobs"][digest] = {"offset": offset, "stored": len(packed), "codec": used}
+            chunks.append(packed)
+            offset += len(packed)
+        index["presets"][name] = entries
+    head = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    out = Path(out)
+    tmp = out.with_name(out.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(PACK_MAGIC, len(head)))
+        f.write(head)
+        for packed in chunks:
+            f.write(packed)
+    os.replace(tmp, out)
+    return {"presets": len(presets), "files": files, "blobs": len(index["blobs"]),
+            "raw_bytes": raw_bytes, "pack_bytes": out.stat().st_size}
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog="bdo_vulkan_assetstore",
+                                     description="Build or list a preset pack (assets/presets.pack)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="pack preset folders into one deduplicated, compressed file")
+    p.add_argument("out")
+    p.add_argument("presets", nargs="+", metavar="NAME=DIR",
+                   help="preset name (Normal, Potato, or e.g. Normal@2.6.1) and its folder")
+    p.add_argument("--codec", choices=CODECS, default="lzma")
+    p = sub.add_parser("list", help="show the presets and blobs of a pack")
+    p.add_argument("pack")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        presets = {}
+        for spec in args.presets:
+            name, sep, folder = spec.partition("=")
+            if not sep or not name or not Path(folder).is_dir():
+                parser.error(f"expected NAME=DIR with an existing folder: {spec}")
+            presets[name] = folder
+        stats = build_pack(args.out, presets, args.codec)
+        print(f"{args.out}: {stats['presets']} preset(s), {stats['files']} file(s), "
+              f"{stats['blobs']} blob(s), {stats['raw_bytes']} -> {stats['pack_bytes']} bytes")
+        return 0
+
+    index = read_index(args.pack)
+    for name, entries in index["presets"].items():
+        print(name)
+        for rel, size, _, digest in entries:
+            blob = index["blobs"][digest]
+            print(f"  {rel}  {size} bytes, {blob['codec']} {blob['stored']} bytes  {digest[:12]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,460 @@
+# bdo_vulkan_cli.py
+"""
+Command-line front end for scripted / headless use. Drives the same core
+functions as the GUI, never prompts, and reports through exit codes plus
+either plain text or (--json) a single JSON document on stdout.
+
+    python bdo_vulkan_cli.py scan
+    python bdo_vulkan_cli.py deploy --mode Normal --all
+    python bdo_vulkan_cli.py remove --mode Potato --install "D:\\Games\\BlackDesert"
+    python bdo_vulkan_cli.py status --json
+    python bdo_vulkan_cli.py conf --mode Normal --all
+    python bdo_vulkan_cli.py watch --all
+    python bdo_vulkan_cli.py fleet lab.ini --concurrency 16
+"""
+import argparse
+import dataclasses
+import json
+import logging
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+from bdo_vulkan_core import (
+    DEEP_SCAN_MODES, GAME_EXE, PRESETS, TRACE_FILE, DeployResult, RemoveResult, add_cached_installs,
+    copy_replace, deploy_manifest, enable_tracing, enable_tracing_from_config, is_process_running,
+    iter_scan_installs, load_cache, load_config, load_scan_rules, preflight, record_deploy,
+    recover_interrupted_deploy, remove_matching, resolve_source, scan_all_installs, verify_installs,
+    wait_for_process_exit, write_cache, write_trace,
+)
+
+EXIT_OK = 0
+EXIT_FAILED = 1          # some files could not be copied/removed, some targets were invalid or
+                         # failed the preflight, or (status) preset files were modified or missing
+EXIT_USAGE = 2           # bad arguments (argparse also uses 2)
+EXIT_GAME_RUNNING = 3
+EXIT_NO_INSTALLS = 4
+EXIT_NO_SOURCE = 5
+
+MODES = PRESETS
+COMMANDS = ("scan", "deploy", "remove", "status", "preflight", "statecache", "conf", "watch", "fleet")
+
+log = logging.getLogger("BDO-Vulkan")
+
+
+def _emit(args, payload: dict, lines: list[str]):
+    if args.json:
+        print(json.dumps(payload, indent=2))
+    else:
+        for line in lines:
+            print(line)
+
+
+def _resolve_targets(args) -> tuple[list[str], list[str]]:
+    """(valid installs, paths without GAME_EXE) from --install or the cache (--all)."""
+    if args.install:
+        paths = list(dict.fromkeys(args.install))
+    else:
+        paths = load_cache()
+        if not paths and args.scan:
+            origins = {}
+            paths = scan_all_installs(found_by=origins)
+            if paths:
+                write_cache(paths, found_by=origins)
+    valid = [p for p in paths if (Path(p) / GAME_EXE).exists()]
+    invalid = [p for p in paths if p not in valid]
+    return valid, invalid
+
+
+def _guard_game(args) -> bool:
+    if not is_process_running(GAME_EXE):
+        return True
+    if args.wait or load_config().getboolean("general", "wait_for_game_exit", fallback=False):
+        log.warning(f"Waiting for {GAME_EXE} to exit...")
+        if wait_for_process_exit(GAME_EXE, timeout=args.wait_timeout):
+            return True
+    _emit(args, {"error": "game_running"},
+          [f"{GAME_EXE} is running; close Black Desert Online first."])
+    return False
+
+
+def cmd_scan(args) -> int:
+    origins = {}
+    rules = load_scan_rules()
+    if args.stop_after is not None:
+        rules = dataclasses.replace(rules, stop_after=args.stop_after)
+    if args.deep_scan is not None:
+        rules = dataclasses.replace(rules, deep_scan=args.deep_scan)
+    installs = []
+    for path, origin in iter_scan_installs(rules=rules):
+        # Printed and cached as found, so an interrupted scan keeps what it had.
+        installs.append(path)
+        origins[path] = origin
+        if not args.no_write:
+            add_cached_installs([path], origin)
+        if not args.json:
+            print(path, flush=True)
+    if installs and not args.no_write:
+        write_cache(installs, found_by=origins)
+    if args.json or not installs:
+        _emit(args, {"installs": installs}, ["No installations found."])
+    return EXIT_OK if installs else EXIT_NO_INSTALLS
+
+
+def _run_action(args, action: str) -> int:
+    source = resolve_source(args.mode, args.source)
+    if source is None:
+        _emit(args, {"error": "no_source", "mode": args.mode},
+              [f"No source files found for mode '{args.mode}'."])
+        return EXIT_NO_SOURCE
+    targets, invalid = _resolve_targets(args)
+    if not targets:
+        _emit(args, {"error": "no_installs", "invalid": invalid},
+              ["No valid installations to act on."] + [f"  invalid: {p}" for p in invalid])
+        return EXIT_NO_INSTALLS
+    if not _guard_game(args):
+        return EXIT_GAME_RUNNING
+
+    restored = recover_interrupted_deploy()
+    checks = preflight(targets, source, removing=action == "remove")
+    blocked = [r for r in checks if not r.ok]
+    targets = [r.path for r in checks if r.ok]
+    skipped = [f"  skipped: {r.path}: {'; '.join(r.problems())}" for r in blocked]
+    if not targets:
+        _emit(args, {"error": "preflight_failed", "preflight": [r.to_dict() for r in blocked]},
+              ["No installation passed the preflight checks."] + skipped)
+        return EXIT_FAILED
+    payload = {"action": action, "mode": args.mode, "source": str(source),
+               "installs": targets, "invalid": invalid, "recovered": restored,
+               "preflight": [r.to_dict() for r in blocked]}
+    if action == "deploy":
+        result: DeployResult = copy_replace(source, targets, delta=not args.no_delta)
+        payload.update(copied=result.copied, skipped=result.skipped,
+                       failed=result.failed, errors=result.errors)
+        lines = result.summary().splitlines() + [f"  error: {e}" for e in result.errors]
+        failed = bool(result.failed)
+        if not failed:
+            record_deploy(targets, args.mode)
+    else:
+        removal: RemoveResult = remove_matching(source, targets)
+        payload.update(removed=removal.removed, kept=removal.kept, failed=removal.failed,
+                       errors=removal.errors, incomplete=removal.incomplete)
+        lines = removal.summary().splitlines() + [f"  error: {e}" for e in removal.errors]
+        failed = bool(removal.failed)
+        # An install that still has some of the preset's files keeps its record.
+        record_deploy(removal.cleaned(targets), None)
+    lines += [f"  invalid: {p}" for p in invalid] + skipped
+    _emit(args, payload, lines)
+    return EXIT_FAILED if failed or invalid or blocked else EXIT_OK
+
+
+def cmd_deploy(args) -> int:
+    return _run_action(args, "deploy")
+
+
+def cmd_remove(args) -> int:
+    return _run_action(args, "remove")
+
+
+def _status_table(statuses) -> list[str]:
+    header = ("INSTALL", "PRESET", "DXVK", "MODIFIED", "MISSING")
+    rows = [(st.path, st.error or st.preset or "-", st.dxvk_version or "-",
+             ", ".join(st.modified) or "-", ", ".join(st.missing) or "-") for st in statuses]
+    widths = [max(len(r[i]) for r in [header] + rows) for i in range(len(header))]
+    return ["  ".join(cell.ljust(w) for cell, w in zip(r, widths)).rstrip()
+            for r in [header] + rows]
+
+
+def cmd_status(args) -> int:
+    targets, invalid = _resolve_targets(args)
+    statuses = verify_installs(targets)
+    lines = _status_table(statuses) if statuses else []
+    lines += [f"{p}: {GAME_EXE} missing" for p in invalid]
+    _emit(args, {"installs": [st.to_dict() for st in statuses], "invalid": invalid},
+          lines or ["No installations known."])
+    if not statuses:
+        return EXIT_NO_INSTALLS
+    return EXIT_FAILED if any(st.modified or st.missing for st in statuses) else EXIT_OK
+
+
+def _preflight_table(results) -> list[str]:
+    header = ("INSTALL", "CHECK", "FREE", "NEEDED", "DRIVE")
+    rows = [(r.path, "; ".join(r.problems() + r.warnings()) or "ok",
+             f"{r.free_bytes / (1 << 20):.0f} MB" if r.free_bytes is not None else "-",
+             f"{r.needed_bytes / (1 << 20):.1f} MB", r.drive_type) for r in results]
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    return ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip()
+            for row in [header] + rows]
+
+
+def cmd_preflight(args) -> int:
+    source = resolve_source(args.mode, args.source)
+    if source is None:
+        _emit(args, {"error": "no_source", "mode": args.mode},
+              [f"No source files found for mode '{args.mode}'."])
+        return EXIT_NO_SOURCE
+    targets, invalid = _resolve_targets(args)
+    results = preflight(targets + invalid, source, removing=args.remove)
+    _emit(args, {"mode": args.mode, "installs": [r.to_dict() for r in results]},
+          _preflight_table(results) if results else ["No installations known."])
+    if not results:
+        return EXIT_NO_INSTALLS
+    return EXIT_OK if all(r.ok for r in results) else EXIT_FAILED
+
+
+def cmd_statecache(args) -> int:
+    from bdo_vulkan_statecache import (
+        STATE_CACHE_STORE, StateCacheError, collect_state_caches, install_cache_path,
+        prune_state_cache, seed_state_caches,
+    )
+    targets = _resolve_targets(args)[0] if args.all or args.install else []
+    if (args.seed or args.prune) and targets and not _guard_game(args):
+        return EXIT_GAME_RUNNING
+    store = collect_state_caches(targets, args.import_files or [])
+    lines = [f"Store: {store.entries} entries (v{store.version}), +{store.added} new  {STATE_CACHE_STORE}"]
+    lines += [f"  dropped (other version or not a state cache): {p}" for p in store.dropped]
+    refused = [p for p in args.import_files or []
+               if str(Path(p)) in store.dropped or not Path(p).is_file()]
+    lines += [f"Not imported: {p}" for p in refused]
+    pruned, errors = {}, {}
+    if args.prune:
+        for t in targets:
+            if install_cache_path(t).exists():
+                try:
+                    pruned[t] = prune_state_cache(install_cache_path(t))
+                except (OSError, StateCacheError) as e:
+                    errors[t] = str(e)
+                    lines.append(f"{t}: cannot prune: {e}")
+                    continue
+                lines.append(f"{t}: pruned to {pruned[t].entries} entries")
+    seeded = seed_state_caches(targets) if args.seed else {}
+    for t, info in seeded.items():
+        lines.append(f"{t}: +{info.added} entries, {info.entries} total"
+                     + (" (other version, left alone)" if info.dropped and not info.added else ""))
+    if args.export and STATE_CACHE_STORE.exists():
+        shutil.copyfile(STATE_CACHE_STORE, args.export)
+        lines.append(f"Exported to {args.export}")
+    _emit(args, {"store": store.to_dict(), "pruned": {t: i.to_dict() for t, i in pruned.items()},
+                 "seeded": {t: i.to_dict() for t, i in seeded.items()},
+                 "not_imported": refused, "errors": errors}, lines)
+    return EXIT_FAILED if refused or errors else EXIT_OK
+
+
+def cmd_conf(args) -> int:
+    from bdo_vulkan_dxvkconf import available_profiles, diff_install, profile_names
+    if args.list_profiles:
+        active = profile_names()
+        profiles = available_profiles()
+        _emit(args, {"profiles": profiles, "active": active},
+              [f"{'*' if name in active else ' '} {name}  ({where})" for name, where in profiles.items()])
+        return EXIT_OK
+    source = resolve_source(args.mode, args.source)
+    if source is None:
+        _emit(args, {"error": "no_source", "mode": args.mode},
+              [f"No source files found for mode '{args.mode}'."])
+        return EXIT_NO_SOURCE
+    targets, invalid = _resolve_targets(args)
+    if not targets:
+        _emit(args, {"error": "no_installs", "invalid": invalid},
+              ["No valid installations to act on."] + [f"  invalid: {p}" for p in invalid])
+        return EXIT_NO_INSTALLS
+    files = deploy_manifest(source)
+    diffs = {t: diff_install(source, files, t) for t in targets}
+    lines = []
+    for t, diff in diffs.items():
+        lines += diff.splitlines() if diff else [f"{t}: dxvk.conf up to date"]
+    _emit(args, {"mode": args.mode, "diffs": diffs, "invalid": invalid}, lines)
+    return EXIT_FAILED if any(diffs.values()) or invalid else EXIT_OK
+
+
+def cmd_watch(args) -> int:
+    from bdo_vulkan_watch import InstallWatch
+
+    def on_event(kind, install, detail):
+        # One line (or JSON object) per event as it happens, for logs and pipes.
+        if args.json:
+            print(json.dumps({"event": kind, "install": install, "detail": detail}), flush=True)
+        else:
+            print(f"{kind}: {install}  {detail}" if install else f"{kind}: {detail}", flush=True)
+
+    installs = list(dict.fromkeys(args.install)) if args.install else None
+    watch = InstallWatch(installs, backend="poll" if args.poll else "auto", debounce=args.debounce,
+                         poll_interval=args.interval, on_event=on_event)
+    try:
+        watched = watch.run(args.duration)
+    except KeyboardInterrupt:
+        return EXIT_OK
+    if not watched:
+        _emit(args, {"error": "no_installs"},
+              ["No installations with a deployed preset to watch (deploy one first)."])
+        return EXIT_NO_INSTALLS
+    return EXIT_OK
+
+
+def cmd_fleet(args) -> int:
+    from bdo_vulkan_fleet import Fleet, FleetError, load_inventory, write_report
+    try:
+        inv = load_inventory(args.inventory)
+    except FleetError as e:
+        _emit(args, {"error": "bad_inventory", "detail": str(e)}, [str(e)])
+        return EXIT_USAGE
+    unknown = sorted(set(args.only or ()) - {t.name for t in inv.targets})
+    if unknown:
+        _emit(args, {"error": "unknown_targets", "targets": unknown},
+              [f"Not in {args.inventory}: {', '.join(unknown)}"])
+        return EXIT_USAGE
+    lock = threading.Lock()
+
+    def on_event(kind, name, detail):
+        if not args.json:
+            with lock:
+                print(f"{kind}: [{name}] {detail}", flush=True)
+
+    fleet = Fleet(inv, args.concurrency, resume=not args.restart, only=args.only, on_event=on_event)
+    if args.dry_run:
+        plan = [{"name": t.name, "path": t.path, "action": t.action, "preset": t.preset,
+                 "done_before": fleet.done_before(t)} for t in fleet.targets()]
+        _emit(args, {"targets": plan},
+              [f"{'done ' if p['done_before'] else 'to do'}  [{p['name']}] {p['action']} {p['preset']}  {p['path']}"
+               for p in plan])
+        return EXIT_OK
+    report = fleet.run()
+    path = write_report(report, args.report)
+    counts = report.counts()
+    lines = ["", ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+             + (" (interrupted; run again to resume)" if report.interrupted else "")]
+    lines += [f"  [{o.name}] {o.status}: {o.errors[-1] if o.errors else ''}" for o in report.outcomes
+              if o.status not in ("ok", "done_before")]
+    lines.append(f"Report: {path}")
+    _emit(args, {**report.to_dict(), "report": str(path)}, lines)
+    return EXIT_OK if report.ok else EXIT_FAILED
+
+
+def is_cli_argv(argv: list[str]) -> bool:
+    """True if argv (without the program name) is meant for the CLI rather than the GUI."""
+    return bool(argv) and (argv[0] in COMMANDS or argv[0] in ("--json", "--debug", "--trace", "--trace-file", "-h", "--help"))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="bdo_vulkan_cli", description="Black Desert Online Vulkan/DXVK manager (headless)")
+    parser.add_argument("--json", action="store_true", help="machine-readable output on stdout")
+    parser.add_argument("--debug", action="store_true", help="debug logging on stderr")
+    parser.add_argument("--trace", action="store_true",
+                        help="record timing spans and counters as a Chrome trace")
+    parser.add_argument("--trace-file", metavar="FILE",
+                        help=f"where --trace writes to (default {TRACE_FILE.name} next to the app)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scan", help="scan all drives and refresh the install cache")
+    p.add_argument("--no-write", action="store_true", help="do not update the install cache")
+    p.add_argument("--stop-after", type=int, metavar="N",
+                   help="end the deep scan after N installs (overrides [scan] stop_after)")
+    p.add_argument("--deep-scan", choices=DEEP_SCAN_MODES,
+                   help="when to walk whole drives after discovery (overrides [scan] deep_scan)")
+    p.set_defaults(func=cmd_scan)
+
+    def add_targets(p, required=True):
+        grp = p.add_mutually_exclusive_group(required=required)
+        grp.add_argument("--all", action="store_true", help="every cached installation")
+        grp.add_argument("--install", action="append", metavar="PATH",
+                         help="installation folder (repeatable)")
+        p.add_argument("--scan", action="store_true",
+                       help="with --all: scan drives if the cache is empty")
+
+    for name, func, help_text in (("deploy", cmd_deploy, "copy/replace the preset files"),
+                                  ("remove", cmd_remove, "remove the preset files")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--mode", choices=MODES, default="Normal")
+        p.add_argument("--source", metavar="DIR", help="use this folder instead of the bundled/default source")
+        add_targets(p)
+        p.add_argument("--wait", action="store_true",
+                       help=f"if {GAME_EXE} is running, wait for it to exit instead of failing")
+        p.add_argument("--wait-timeout", type=float, metavar="SECONDS",
+                       help="give up waiting after this long (exit code 3)")
+        if name == "deploy":
+            p.add_argument("--no-delta", action="store_true",
+                           help="rewrite files even if already identical")
+        p.set_defaults(func=func)
+
+    p = sub.add_parser("status", help="verify which preset (and DXVK version) each installation has")
+    add_targets(p)
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("preflight", help="check write access, free space, locked files and the game exe")
+    p.add_argument("--mode", choices=MODES, default="Normal")
+    p.add_argument("--source", metavar="DIR", help="use this folder instead of the bundled/default source")
+    add_targets(p)
+    p.add_argument("--remove", action="store_true", help="check for a removal instead of a deploy")
+    p.set_defaults(func=cmd_preflight)
+
+    p = sub.add_parser("statecache", help="merge, prune and seed DXVK state caches (.dxvk-cache)")
+    add_targets(p, required=False)
+    p.add_argument("--import", dest="import_files", action="append", metavar="FILE",
+                   help="merge this cache file (e.g. from another PC) into the store (repeatable)")
+    p.add_argument("--seed", action="store_true", help="add the store's entries to each install's cache")
+    p.add_argument("--prune", action="store_true",
+                   help="rewrite each install's cache without duplicate or corrupt entries")
+    p.add_argument("--export", metavar="FILE", help="copy the merged store to FILE")
+    p.add_argument("--wait", action="store_true",
+                   help=f"if {GAME_EXE} is running, wait for it to exit instead of failing")
+    p.add_argument("--wait-timeout", type=float, metavar="SECONDS")
+    p.set_defaults(func=cmd_statecache)
+
+    p = sub.add_parser("conf", help="show how each installation's dxvk.conf differs from what a deploy writes")
+    p.add_argument("--mode", choices=MODES, default="Normal")
+    p.add_argument("--source", metavar="DIR", help="use this folder instead of the bundled/default source")
+    add_targets(p, required=False)
+    p.add_argument("--list-profiles", action="store_true",
+                   help="list the dxvk.conf profiles ([dxvk] profiles marks the active ones with *)")
+    p.set_defaults(func=cmd_conf)
+
+    p = sub.add_parser("watch", help="redeploy each installation's preset when a game patch changes its files")
+    add_targets(p, required=False)
+    p.add_argument("--poll", action="store_true",
+                   help="poll the files instead of using change notifications (overrides [watch] backend)")
+    p.add_argument("--debounce", type=float, metavar="SECONDS",
+                   help="quiet time after a change before checking (overrides [watch] debounce)")
+    p.add_argument("--interval", type=float, metavar="SECONDS",
+                   help="seconds between polls (overrides [watch] poll_interval)")
+    p.add_argument("--duration", type=float, metavar="SECONDS", help="stop after this long")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("fleet", help="deploy to (or remove from) the installs of an inventory file, several at a time")
+    p.add_argument("inventory", help="ini file with a section per install (see bdo_vulkan_fleet.py)")
+    p.add_argument("--concurrency", type=int, metavar="N",
+                   help="installs worked on at once (overrides [fleet] concurrency)")
+    p.add_argument("--only", action="append", metavar="NAME", help="only this target (repeatable)")
+    p.add_argument("--restart", action="store_true",
+                   help="redo every target instead of resuming the last rollout")
+    p.add_argument("--report", metavar="FILE", help="where to write the JSON report (default <inventory>.report.json)")
+    p.add_argument("--dry-run", action="store_true", help="list what would be done")
+    p.set_defaults(func=cmd_fleet)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    cfg = load_config()
+    if args.trace or args.trace_file:
+        enable_tracing(args.trace_file)
+    else:
+        enable_tracing_from_config(cfg)
+    debug = args.debug or cfg.getboolean("general", "debug", fallback=False)
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.WARNING,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%H:%M:%S",
+        stream=sys.stderr,
+    )
+    try:
+        return args.func(args)
+    finally:
+        trace = write_trace()
+        if trace:
+            print(f"Trace written to {trace}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2991 @@
+# bdo_vulkan_core.py
+"""
+Headless core of the BDO Vulkan utility: install discovery, the install cache,
+deploy sources and the copy/remove actions. Nothing in here imports tkinter or
+shows UI, so it can be driven by the GUI (bdo_vulkan_manager.py), the CLI
+(bdo_vulkan_cli.py) or scripts alike.
+
+Only cheap stdlib modules are imported at module level; ctypes, subprocess,
+configparser, zipfile and mmap are imported inside the functions that use them
+so that importing the core (and starting the GUI) stays fast.
+"""
+import abc
+import os
+import sys
+import logging
+from pathlib import Path, PurePosixPath
+import io
+import time
+from contextlib import contextmanager, nullcontext
+import threading
+import queue
+import json
+import stat
+import zlib
+import hashlib
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================
+# BUILD-TIME SWITCH
+# ==========================
+BUNDLED = True   # <<< SET THIS: True = bundle assets via --add-data, False = use local ./BDO_Vulkan_API
+
+# ==========================
+# Runtime context & paths
+# ==========================
+# Detect if running as compiled executable (Nuitka uses __compiled__, PyInstaller uses frozen)
+FROZEN = getattr(sys, "frozen", False) or "__compiled__" in globals()
+APP_DIR = (Path(sys.executable).resolve(
+).parent if FROZEN else Path(__file__).resolve().parent)
+# For Nuitka: resources are typically next to exe; for PyInstaller: in _MEIPASS
+MEIPASS_DIR = Path(getattr(sys, "_MEIPASS", APP_DIR)).resolve()
+
+CONFIG_FILE = APP_DIR / "bdovulkan_config.ini"
+CACHE_FILE = APP_DIR / "bdovulkan_installs.json"
+LEGACY_CACHE_FILE = APP_DIR / "bdovulkan_installs.txt"  # pre-1.1 flat list, migrated on load
+SCAN_INDEX_FILE = APP_DIR / "bdovulkan_scanindex.bin"
+DEPLOY_JOURNAL_FILE = APP_DIR / "bdovulkan_deploy.journal"
+TRACE_FILE = APP_DIR / "bdovulkan_trace.json"
+MANIFEST_FILE = APP_DIR / "bdovulkan_manifests.json"
+DIGEST_CACHE_FILE = APP_DIR / "bdovulkan_digests.json"
+
+SOURCE_ROOT = APP_DIR / "BDO_Vulkan_API"   # used when BUNDLED=False
+ASSETS_NORMAL_REL = Path("assets/Normal")  # used when BUNDLED=True
+ASSETS_POTATO_REL = Path("assets/Potato")  # used when BUNDLED=True
+ASSETS_PACK_REL = Path("assets/presets.pack")  # all presets in one pack (bdo_vulkan_assetstore)
+
+GAME_EXE = "BlackDesert64.exe"
+DXGI_DLL = "dxgi.dll"
+PRESETS = ("Normal", "Potato")
+
+COMMON_RELATIVE_PATHS = [
+    r"\BlackDesert",
+    r"\PearlAbyss",
+    r"\Program Files\BlackDesert",
+    r"\Program Files (x86)\BlackDesert",
+    r"\Program Files\PearlAbyss",
+    r"\Program Files (x86)\PearlAbyss",
+    r"\Program Files\Steam\steamapps\common\Black Desert Online",
+    r"\Program Files (x86)\Steam\steamapps\common\Black Desert Online",
+    r"\Games\BlackDesert",
+]
+
+log = logging.getLogger("BDO-Vulkan")
+
+# ==========================
+# Config
+# ==========================
+
+
+def load_config():
+    import configparser
+    cfg = configparser.ConfigParser()
+    cfg["general"] = {"debug": "false", "wait_for_game_exit": "false",
+                      "trace": "false", "trace_file": ""}
+    if CONFIG_FILE.exists():
+        try:
+            cfg.read(CONFIG_FILE, encoding="utf-8")
+        except Exception:
+            pass
+    else:
+        try:
+            CONFIG_FILE.write_text(
+                "[general]\ndebug = false\n", encoding="utf-8")
+        except Exception:
+            pass
+    return cfg
+
+# ==========================
+# Tracing
+# ==========================
+
+
+class Tracer:
+    """
+    Timed spans and counters for one run, written as a Chrome trace
+    (chrome://tracing or ui.perfetto.dev). Only exists while tracing is on;
+    otherwise trace_span/trace_count return straight away.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.events: list[dict] = []
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def add_span(self, name: str, start_ns: int, end_ns: int, args: dict):
+        ev = {"name": name, "cat": name.split(".", 1)[0], "ph": "X",
+              "ts": (start_ns - self._t0) / 1000, "dur": (end_ns - start_ns) / 1000,
+              "pid": self._pid, "tid": threading.get_ident(), "args": args}
+        with self._lock:
+            self.events.append(ev)
+
+    def count(self, name: str, n: int):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            events, counters = list(self.events), dict(self.counters)
+        end = (time.perf_counter_ns() - self._t0) / 1000
+        totals: dict[str, dict] = {}
+        for ev in events:
+            t = totals.setdefault(ev["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            t["count"] += 1
+            t["total_ms"] += ev["dur"] / 1000
+            t["max_ms"] = max(t["max_ms"], ev["dur"] / 1000)
+        events += [{"name": name, "ph": "C", "ts": end, "pid": self._pid, "tid": 0,
+                    "args": {"value": value}} for name, value in sorted(counters.items())]
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"counters": counters, "spans": totals}}
+
+    def write(self):
+        self.path.write_text(json.dumps(self.to_dict()), encoding="utf-8")
+
+
+_TRACER: Tracer | None = None
+_NO_SPAN = nullcontext()
+
+
+def enable_tracing(path=None) -> Tracer:
+    global _TRACER
+    _TRACER = Tracer(path or TRACE_FILE)
+    return _TRACER
+
+
+def enable_tracing_from_config(cfg) -> Tracer | None:
+    """Turn tracing on if `trace = true` in the [general] section."""
+    if not cfg.getboolean("general", "trace", fallback=False):
+        return None
+    return enable_tracing(cfg.get("general", "trace_file", fallback="") or None)
+
+
+def write_trace() -> Path | None:
+    """Write the trace file if tracing is on; returns its path."""
+    tracer = _TRACER
+    if tracer is None:
+        return None
+    try:
+        tracer.write()
+    except OSError as e:
+        log.debug(f"[TRACE] Could not write {tracer.path}: {e}")
+        return None
+    return tracer.path
+
+
+@contextmanager
+def _span(tracer: Tracer, name: str, args: dict):
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        tracer.add_span(name, start, time.perf_counter_ns(), args)
+
+
+def trace_span(name: str, **args):
+    """Context manager timing a block; a shared no-op when tracing is off."""
+    tracer = _TRACER
+    if tracer is None:
+        return _NO_SPAN
+    return _span(tracer, name, args)
+
+
+def trace_event(name: str, start_ns: int, **args):
+    """Span that started earlier (possibly on another thread) and ends now."""
+    tracer = _TRACER
+    if tracer is not None:
+        tracer.add_span(name, start_ns, time.perf_counter_ns(), args)
+
+
+def trace_count(name: str, n: int = 1):
+    tracer = _TRACER
+    if tracer is not None:
+        tracer.count(name, n)
+
+
+def trace_error(exc: BaseException):
+    tracer = _TRACER
+    if tracer is not None:
+        tracer.count(f"errors.{type(exc).__name__}", 1)
+
+# ==========================
+# UAC helpers
+# ==========================
+
+
+def is_admin() -> bool:
+    try:
+        import ctypes
+        return ctypes.windll.shell32.IsUserAnAdmin() != 0
+    except Exception:
+        return False
+
+
+def find_unwritable_paths(paths: list[str]) -> list[str]:
+    """Installs where a probe file cannot be created (elevation needed, or read-only)."""
+    return [r.path for r in preflight(paths) if not r.writable]
+
+
+# ==========================
+# Preflight
+# ==========================
+# All selected installs are checked at once, each on its own daemon thread, so
+# a hung network share costs at most PREFLIGHT_TIMEOUT and never blocks exit.
+PREFLIGHT_TIMEOUT = 5.0           # seconds before an install that has not answered is reported
+PREFLIGHT_CACHE_TTL = 600.0       # passing results are reused this long within a session
+PREFLIGHT_SPACE_MARGIN = 4 << 20  # free space required beyond what a deploy stages
+NETWORK_FILESYSTEMS = frozenset({"nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "fuse.sshfs"})
+ERROR_SHARING_VIOLATION = 32
+ERROR_LOCK_VIOLATION = 33
+
+_PREFLIGHT_CACHE: dict[tuple[str, str], tuple[float, "PreflightResult"]] = {}
+_PREFLIGHT_LOCK = threading.Lock()
+
+
+@dataclass
+class PreflightResult:
+    path: str
+    exe_ok: bool = False
+    writable: bool = False
+    needs_elevation: bool = False   # writes are denied and the process is not elevated
+    drive_type: str = "unknown"     # fixed, network, removable or unknown
+    free_bytes: int | None = None
+    needed_bytes: int = 0           # what a deploy would stage here
+    locked: list[str] = field(default_factory=list)   # preset files another process holds open
+    timed_out: bool = False
+    error: str | None = None
+
+    @property
+    def enough_space(self) -> bool:
+        return (not self.needed_bytes or self.free_bytes is None
+                or self.free_bytes >= self.needed_bytes + PREFLIGHT_SPACE_MARGIN)
+
+    @property
+    def ok(self) -> bool:
+        return (self.exe_ok and self.writable and not self.locked and self.enough_space
+                and not self.timed_out)
+
+    def problems(self) -> list[str]:
+        if self.timed_out:
+            return ["did not respond in time (unreachable drive?)"]
+        out = []
+        if not self.exe_ok:
+            out.append(f"{GAME_EXE} missing or unreadable")
+        if self.needs_elevation:
+            out.append("needs administrator rights")
+        elif not self.writable:
+            out.append(f"not writable ({self.error})" if self.error else "not writable")
+        if not self.enough_space:
+            out.append(f"needs {_fmt_bytes(self.needed_bytes)}, {_fmt_bytes(self.free_bytes)} free")
+        if self.locked:
+            out.append("in use by another process: " + ", ".join(self.locked))
+        return out
+
+    def warnings(self) -> list[str]:
+        return [f"on a {self.drive_type} drive"] if self.drive_type in ("network", "removable") else []
+
+    def to_dict(self) -> dict:
+        return {**self.__dict__, "ok": self.ok, "problems": self.problems(), "warnings": self.warnings()}
+
+
+def _drive_type(path: str) -> str:
+    if os.name == "nt":
+        import ctypes
+        root = os.path.splitdrive(os.path.abspath(path))[0] + "\\"
+        kind = ctypes.windll.kernel32.GetDriveTypeW(root)
+        # DRIVE_REMOVABLE, DRIVE_FIXED, DRIVE_REMOTE, DRIVE_CDROM, DRIVE_RAMDISK
+        return {2: "removable", 3: "fixed", 4: "network", 5: "removable", 6: "fixed"}.get(kind, "unknown")
+    try:
+        with open("/proc/self/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return "unknown"
+    target = os.path.realpath(path)
+    best = None
+    for mnt, fstype in mounts:
+        mnt = mnt.replace("\\040", " ")
+        if (target == mnt or target.startswith(mnt.rstrip("/") + "/")) and (
+                best is None or len(mnt) > len(best[0])):
+            best = (mnt, fstype)
+    if best is None:
+        return "unknown"
+    if best[1] in NETWORK_FILESYSTEMS:
+        return "network"
+    return "removable" if best[0].startswith(("/media/", "/run/media/")) else "fixed"
+
+
+def _file_locked(path: Path) -> bool:
+    """True if another process has path open without allowing it to be renamed (Windows only)."""
+    if os.name != "nt":
+        return False
+    import ctypes
+    from ctypes import wintypes
+    k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    k32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+    k32.CreateFileW.restype = wintypes.HANDLE
+    k32.CloseHandle.argtypes = [wintypes.HANDLE]
+    DELETE, SHARE_ALL, OPEN_EXISTING = 0x00010000, 0x7, 3
+    h = k32.CreateFileW(str(path), DELETE, SHARE_ALL, None, OPEN_EXISTING, 0, None)
+    if h == wintypes.HANDLE(-1).value:
+        return ctypes.get_last_error() in (ERROR_SHARING_VIOLATION, ERROR_LOCK_VIOLATION)
+    k32.CloseHandle(h)
+    return False
+
+
+def _probe_write(root: Path) -> tuple[bool, bool, str | None]:
+    """(writable, needs elevation, error) from creating and deleting a probe file."""
+    test = root / f".__bdo_preflight_{os.getpid()}.tmp"
+    try:
+        fd = os.open(test, os.O_CREAT | os.O_TRUNC | os.O_WRONLY, 0o644)
+        os.close(fd)
+        os.unlink(test)
+        return True, False, None
+    except PermissionError as e:
+        trace_error(e)
+        return False, not is_admin(), e.strerror or str(e)
+    except OSError as e:
+        trace_error(e)
+        return False, False, e.strerror or str(e)
+
+
+def _preflight_install(path: str, files: "list[SourceFile]", removing: bool) -> PreflightResult:
+    import shutil
+    r = PreflightResult(path)
+    root = Path(path)
+    try:
+        with open(root / GAME_EXE, "rb") as f:
+            f.read(2)
+        r.exe_ok = True
+    except OSError as e:
+        log.debug(f"[PREFLIGHT] {path}: {GAME_EXE}: {e}")
+    r.drive_type = _drive_type(path)
+    r.writable, r.needs_elevation, r.error = _probe_write(root)
+    try:
+        r.free_bytes = shutil.disk_usage(root).free
+    except OSError:
+        pass
+    for sf in files:
+        dst = root / sf.rel
+        try:
+            st = os.stat(dst)
+        except FileNotFoundError:
+            r.needed_bytes += 0 if removing else sf.size
+            continue
+        except OSError:
+            continue
+        if not removing and (st.st_size != sf.size or st.st_mtime_ns != sf.mtime_ns):
+            r.needed_bytes += sf.size
+        if _file_locked(dst):
+            r.locked.append(sf.rel)
+    return r
+
+
+def clear_preflight_cache(paths=None):
+    """Forget cached results (for these installs, or all)."""
+    with _PREFLIGHT_LOCK:
+        if paths is None:
+            _PREFLIGHT_CACHE.clear()
+            return
+        drop = set(paths)
+        for key in [k for k in _PREFLIGHT_CACHE if k[0] in drop]:
+            del _PREFLIGHT_CACHE[key]
+
+
+def preflight(paths: list[str], source=None, removing: bool = False, refresh: bool = False,
+              timeout: float = PREFLIGHT_TIMEOUT) -> list[PreflightResult]:
+    """
+    Check installs concurrently before deploying `source` to them (or removing
+    it): a readable GAME_EXE, write access, free space for the files a deploy
+    would stage, preset files locked by another process, and the drive type.
+    An install that does not answer within timeout is reported as timed out.
+    Passing results are cached for the session; failing ones are probed again
+    on the next call, so a fix-and-retry loop only re-checks what failed.
+    """
+    paths = list(dict.fromkeys(paths))
+    files = deploy_manifest(source) if source is not None else []
+    # Removal touches the files each install owns, where that is recorded.
+    owned_by = {r.path: [SourceFile(rel, *entry) for rel, entry in r.owned.items()]
+                for r in load_cache_records() if r.tracked or r.owned} if removing else {}
+    key = f"{'remove' if removing else 'deploy'}:{source or ''}"
+    now = time.monotonic()
+    results, todo = {}, []
+    with _PREFLIGHT_LOCK:
+        for p in paths:
+            hit = None if refresh else _PREFLIGHT_CACHE.get((p, key))
+            if hit and now - hit[0] < PREFLIGHT_CACHE_TTL:
+                results[p] = hit[1]
+            else:
+                todo.append(p)
+    trace_count("preflight.cached", len(results))
+
+    def work(p: str):
+        try:
+            box.put(_preflight_install(p, owned_by.get(p, files), removing))
+        except Exception as e:
+            log.debug(f"[PREFLIGHT] {p}: {e}")
+            box.put(PreflightResult(p, error=str(e)))
+
+    with trace_span("preflight", installs=len(todo)):
+        box: queue.Queue = queue.Queue()
+        for p in todo:
+            threading.Thread(target=work, args=(p,), name="bdo-preflight", daemon=True).start()
+        deadline = time.monotonic() + timeout
+        for _ in todo:
+            try:
+                r = box.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            results[r.path] = r
+        for p in todo:
+            if p not in results:
+                log.debug(f"[PREFLIGHT] {p}: no answer within {timeout:g} s")
+                results[p] = PreflightResult(p, timed_out=True)
+    with _PREFLIGHT_LOCK:
+        for p in todo:
+            if results[p].ok:
+                _PREFLIGHT_CACHE[(p, key)] = (now, results[p])
+    return [results[p] for p in paths]
+
+# ==========================
+# Game-running check
+# ==========================
+
+
+class ProcessBackend(abc.ABC):
+    """
+    Finds processes by image name and waits for them to exit. Pick one with
+    get_process_backend(); set_process_backend() swaps it (tests, fixtures).
+    """
+    name = "base"
+    poll_interval = 0.5
+
+    @abc.abstractmethod
+    def pids(self, image_name: str) -> list[int]:
+        ...
+
+    @abc.abstractmethod
+    def is_alive(self, pid: int) -> bool:
+        ...
+
+    def wait_for_exit(self, pids: list[int], timeout: float) -> bool:
+        """Block up to timeout seconds; True once every pid has exited."""
+        deadline = time.monotonic() + timeout
+        while True:
+            alive = [p for p in pids if self.is_alive(p)]
+            if not alive:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.poll_interval, remaining))
+
+
+class ToolhelpProcessBackend(ProcessBackend):
+    """Windows: CreateToolhelp32Snapshot to enumerate, a SYNCHRONIZE handle to wait."""
+    name = "toolhelp"
+    TH32CS_SNAPPROCESS = 0x00000002
+    SYNCHRONIZE = 0x00100000
+    WAIT_TIMEOUT = 0x00000102
+    MAXIMUM_WAIT_OBJECTS = 64
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESSENTRY32W(ctypes.Structure):
+            _fields_ = [
+                ("dwSize", wintypes.DWORD),
+                ("cntUsage", wintypes.DWORD),
+                ("th32ProcessID", wintypes.DWORD),
+                ("th32DefaultHeapID", ctypes.c_size_t),
+                ("th32ModuleID", wintypes.DWORD),
+                ("cntThreads", wintypes.DWORD),
+                ("th32ParentProcessID", wintypes.DWORD),
+                ("pcPriClassBase", ctypes.c_long),
+                ("dwFlags", wintypes.DWORD),
+                ("szExeFile", ctypes.c_wchar * 260),
+            ]
+
+        k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        k32.CreateToolhelp32Snapshot.argtypes = [wintypes.DWORD, wintypes.DWORD]
+        k32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+        k32.Process32FirstW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+        k32.Process32FirstW.restype = wintypes.BOOL
+        k32.Process32NextW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+        k32.Process32NextW.restype = wintypes.BOOL
+        k32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+        k32.OpenProcess.restype = wintypes.HANDLE
+        k32.WaitForMultipleObjects.argtypes = [
+            wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE), wintypes.BOOL, wintypes.DWORD]
+        k32.WaitForMultipleObjects.restype = wintypes.DWORD
+        k32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._ctypes = ctypes
+        self._HANDLE = wintypes.HANDLE
+        self._entry_type = PROCESSENTRY32W
+        self._k32 = k32
+        self._invalid = wintypes.HANDLE(-1).value
+
+    def pids(self, image_name: str) -> list[int]:
+        snap = self._k32.CreateToolhelp32Snapshot(self.TH32CS_SNAPPROCESS, 0)
+        if not snap or snap == self._invalid:
+            raise OSError(self._ctypes.get_last_error(), "CreateToolhelp32Snapshot failed")
+        try:
+            entry = self._entry_type()
+            entry.dwSize = self._ctypes.sizeof(entry)
+            target = image_name.lower()
+            found = []
+            ok = self._k32.Process32FirstW(snap, self._ctypes.byref(entry))
+            while ok:
+                if entry.szExeFile.lower() == target:
+                    found.append(entry.th32ProcessID)
+                ok = self._k32.Process32NextW(snap, self._ctypes.byref(entry))
+            return found
+        finally:
+            self._k32.CloseHandle(snap)
+
+    def is_alive(self, pid: int) -> bool:
+        h = self._k32.OpenProcess(self.SYNCHRONIZE, False, pid)
+        if not h:
+            return False
+        try:
+            return self._k32.WaitForMultipleObjects(
+                1, (self._HANDLE * 1)(h), True, 0) == self.WAIT_TIMEOUT
+        finally:
+            self._k32.CloseHandle(h)
+
+    def wait_for_exit(self, pids: list[int], timeout: float) -> bool:
+        handles = [h for h in (self._k32.OpenProcess(self.SYNCHRONIZE, False, p)
+                               for p in pids[:self.MAXIMUM_WAIT_OBJECTS]) if h]
+        if not handles:
+            return True   # gone already (or not ours to open: the caller re-checks by name)
+        try:
+            arr = (self._HANDLE * len(handles))(*handles)
+            rc = self._k32.WaitForMultipleObjects(len(handles), arr, True, int(timeout * 1000))
+            return rc != self.WAIT_TIMEOUT
+        finally:
+            for h in handles:
+                self._k32.CloseHandle(h)
+
+
+class ProcFsProcessBackend(ProcessBackend):
+    """Linux (and Wine/Proton): reads /proc. `root` can point at a fixture tree."""
+    name = "procfs"
+
+    def __init__(self, root: str = "/proc"):
+        self.root = root
+
+    def _image_names(self, pid: str) -> set[str]:
+        names = set()
+        base = os.path.join(self.root, pid)
+        try:
+            with open(os.path.join(base, "comm"), encoding="utf-8", errors="replace") as f:
+                names.add(f.read().strip().lower())
+        except OSError:
+            pass
+        try:
+            with open(os.path.join(base, "cmdline"), "rb") as f:
+                argv0 = f.read().split(b"\0", 1)[0].decode("utf-8", "replace")
+            # Wine shows the Windows path of the exe as argv[0].
+            names.add(argv0.replace("\\", "/").rsplit("/", 1)[-1].lower())
+        except OSError:
+            pass
+        return names
+
+    def pids(self, image_name: str) -> list[int]:
+        target = image_name.lower()
+        found = []
+        for entry in os.listdir(self.root):
+            if not entry.isdigit():
+                continue
+            # comm is truncated to 15 chars; argv[0] covers longer names.
+            if target in self._image_names(entry):
+                found.append(int(entry))
+        return found
+
+    def is_alive(self, pid: int) -> bool:
+        return os.path.exists(os.path.join(self.root, str(pid)))
+
+
+class TasklistProcessBackend(ProcessBackend):
+    """Fallback: shells out to 'tasklist' (slow, ~hundreds of ms per call)."""
+    name = "tasklist"
+
+    def _run(self, *filters: str) -> list[list[str]]:
+        import csv
+        import subprocess
+        args = ["tasklist", "/FO", "CSV", "/NH"]
+        for flt in filters:
+            args += ["/FI", flt]
+        res = subprocess.run(args, capture_output=True, text=True,
+                             creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        return [row for row in csv.reader((res.stdout or "").splitlines()) if len(row) > 1]
+
+    def pids(self, image_name: str) -> list[int]:
+        return [int(row[1]) for row in self._run(f"IMAGENAME eq {image_name}")
+                if row[0].lower() == image_name.lower() and row[1].isdigit()]
+
+    def is_alive(self, pid: int) -> bool:
+        return any(row[1] == str(pid) for row in self._run(f"PID eq {pid}"))
+
+
+_PROCESS_BACKEND: ProcessBackend | None = None
+
+
+def get_process_backend() -> ProcessBackend:
+    global _PROCESS_BACKEND
+    if _PROCESS_BACKEND is None:
+        if os.name == "nt":
+            try:
+                _PROCESS_BACKEND = ToolhelpProcessBackend()
+            except Exception as e:
+                log.debug(f"[PROC] Toolhelp unavailable, using tasklist: {e}")
+                _PROCESS_BACKEND = TasklistProcessBackend()
+        elif os.path.isdir("/proc"):
+            _PROCESS_BACKEND = ProcFsProcessBackend()
+        else:
+            _PROCESS_BACKEND = TasklistProcessBackend()
+        log.debug(f"[PROC] Using {_PROCESS_BACKEND.name} backend")
+    return _PROCESS_BACKEND
+
+
+def set_process_backend(backend: ProcessBackend | None):
+    global _PROCESS_BACKEND
+    _PROCESS_BACKEND = backend
+
+
+def is_process_running(image_name: str) -> bool:
+    """True if a process with this image name (e.g. BlackDesert64.exe) is running."""
+    try:
+        return bool(get_process_backend().pids(image_name))
+    except Exception as e:
+        log.debug(f"[PROC] Process lookup failed: {e}")
+        return False
+
+
+def wait_for_process_exit(image_name: str, timeout: float | None = None,
+                          cancelled=None, slice_seconds: float = 1.0) -> bool:
+    """
+    Block until no process named image_name is left. Sleeps in the OS wait
+    where the backend supports it, re-enumerating every slice_seconds so a
+    relaunched game is noticed. `cancelled` is an optional callable.
+    Returns False on timeout or cancellation.
+    """
+    backend = get_process_backend()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            pids = backend.pids(image_name)
+        except Exception as e:
+            log.debug(f"[PROC] Process lookup failed while waiting: {e}")
+            return False
+        if not pids:
+            return True
+        if cancelled and cancelled():
+            return False
+        wait = slice_seconds
+        if deadline is not None:
+            wait = min(wait, deadline - time.monotonic())
+            if wait <= 0:
+                return False
+        backend.wait_for_exit(pids, wait)
+
+
+# ==========================
+# Deploy sources (bundled vs non-bundled)
+# ==========================
+
+
+def _bundle_path(rel: Path) -> Path:
+    return (MEIPASS_DIR / rel).resolve()
+
+
+MMAP_THRESHOLD = 8 << 20  # source files at least this big are mapped instead of read
+
+
+@dataclass(frozen=True)
+class SourceFile:
+    rel: str        # posix-style path relative to the source root
+    size: int
+    mtime_ns: int
+    digest: str | None = None   # sha256, set on deploy manifest entries
+
+
+class DeploySource(abc.ABC):
+    """
+    Read-only set of files to deploy. Files are read straight from wherever the
+    source lives (a folder, the PyInstaller/Nuitka bundle, a zip, memory); nothing
+    is extracted to a temp dir first.
+    """
+
+    @abc.abstractmethod
+    def files(self) -> list[SourceFile]:
+        ...
+
+    def scan(self) -> tuple[list[SourceFile], dict | None]:
+        """files() plus a stamp stamp_current() can cheaply re-check later (None: do not cache)."""
+        return self.files(), None
+
+    def stamp_current(self, stamp: dict, files: list[SourceFile]) -> bool:
+        """True if nothing in the source changed since scan() returned stamp and files."""
+        return False
+
+    @abc.abstractmethod
+    def open(self, sf: SourceFile):
+        """Binary file object for sf's content."""
+
+    def digest(self, sf: SourceFile) -> str:
+        key = (f"{self}:{sf.rel}", sf.size, sf.mtime_ns)
+        with _DIGEST_LOCK:
+            cached = _DIGEST_CACHE.get(key)
+        if cached is None:
+            with self.open(sf) as f:
+                cached = hashlib.file_digest(f, "sha256").hexdigest()
+            with _DIGEST_LOCK:
+                _DIGEST_CACHE[key] = cached
+        return cached
+
+    @contextmanager
+    def buffer(self, sf: SourceFile):
+        """sf's whole content as a bytes-like object, read once and shared by all writers."""
+        with self.open(sf) as f:
+            yield f.read()
+
+
+class DirectorySource(DeploySource):
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def __str__(self):
+        return str(self.root)
+
+    def scan(self) -> tuple[list[SourceFile], dict | None]:
+        out, dirs = [], {}
+        for root, _, names in os.walk(self.root):
+            try:
+                dirs[Path(root).relative_to(self.root).as_posix()] = os.stat(root).st_mtime_ns
+            except OSError as e:
+                log.debug(f"[ASSETS] Cannot stat {root}: {e}")
+            for name in names:
+                p = Path(root) / name
+                try:
+                    st = p.stat()
+                except OSError as e:
+                    log.debug(f"[ASSETS] Cannot stat {p}: {e}")
+                    continue
+                out.append(SourceFile(p.relative_to(self.root).as_posix(),
+                                      st.st_size, st.st_mtime_ns))
+        return out, {"dirs": dirs}
+
+    def files(self) -> list[SourceFile]:
+        return self.scan()[0]
+
+    def stamp_current(self, stamp: dict, files: list[SourceFile]) -> bool:
+        # A folder's mtime changes whenever an entry is added, removed or renamed
+        # in it; a file rewritten in place changes its own size or mtime.
+        try:
+            for rel, mtime_ns in stamp["dirs"].items():
+                if os.stat(self.root / rel).st_mtime_ns != mtime_ns:
+                    return False
+            for sf in files:
+                st = os.stat(self.root / sf.rel)
+                if st.st_size != sf.size or st.st_mtime_ns != sf.mtime_ns:
+                    return False
+        except (OSError, KeyError, AttributeError):
+            return False
+        return True
+
+    def path(self, sf: SourceFile) -> Path:
+        return self.root / sf.rel
+
+    def open(self, sf: SourceFile):
+        return open(self.path(sf), "rb")
+
+    def digest(self, sf: SourceFile) -> str:
+        return file_digest(self.path(sf))
+
+    @contextmanager
+    def buffer(self, sf: SourceFile):
+        if sf.size < MMAP_THRESHOLD:
+            with self.open(sf) as f:
+                yield f.read()
+            return
+        import mmap
+        with self.open(sf) as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+class ZipSource(DeploySource):
+    """Files under `prefix` inside a zip archive (e.g. a packed assets/<Mode>.zip)."""
+
+    def __init__(self, archive, prefix: str = ""):
+        self.archive = Path(archive)
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        import zipfile
+        self._zf = zipfile.ZipFile(self.archive)
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f"{self.archive}!/{self.prefix}"
+
+    def files(self) -> list[SourceFile]:
+        out = []
+        for info in self._zf.infolist():
+            if info.is_dir() or not info.filename.startswith(self.prefix):
+                continue
+            mtime_ns = int(time.mktime(info.date_time + (0, 0, -1))) * 1_000_000_000
+            out.append(SourceFile(info.filename[len(self.prefix):], info.file_size, mtime_ns))
+        return out
+
+    def _archive_stamp(self) -> list[int]:
+        st = os.stat(self.archive)
+        return [st.st_size, st.st_mtime_ns]
+
+    def scan(self) -> tuple[list[SourceFile], dict | None]:
+        return self.files(), {"archive": self._archive_stamp()}
+
+    def stamp_current(self, stamp: dict, files: list[SourceFile]) -> bool:
+        try:
+            return stamp.get("archive") == self._archive_stamp()
+        except OSError:
+            return False
+
+    def open(self, sf: SourceFile):
+        # ZipFile handles are not safe to share between concurrent readers.
+        with self._lock:
+            return io.BytesIO(self._zf.read(self.prefix + sf.rel))
+
+
+class MemorySource(DeploySource):
+    """In-memory files, {rel path: bytes}."""
+
+    def __init__(self, blobs: dict[str, bytes], name: str = "memory", mtime_ns: int | None = None):
+        self.blobs = blobs
+        self.name = name
+        self.mtime_ns = time.time_ns() if mtime_ns is None else mtime_ns
+
+    def __str__(self):
+        return f"<{self.name}>"
+
+    def files(self) -> list[SourceFile]:
+        return [SourceFile(rel, len(data), self.mtime_ns) for rel, data in self.blobs.items()]
+
+    def open(self, sf: SourceFile):
+        return io.BytesIO(self.blobs[sf.rel])
+
+
+def as_source(source) -> DeploySource:
+    return source if isinstance(source, DeploySource) else DirectorySource(source)
+
+
+def _bundled_source(mode: str) -> DeploySource | None:
+    rel = ASSETS_NORMAL_REL if mode.lower() == "normal" else ASSETS_POTATO_REL
+    bundled_dir = _bundle_path(rel)
+    if bundled_dir.is_dir():
+        return DirectorySource(bundled_dir)
+    pack = _bundle_path(ASSETS_PACK_REL)
+    if pack.is_file():
+        try:
+            from bdo_vulkan_assetstore import open_pack_source
+            source = open_pack_source(pack, rel.name)
+            if source is not None:
+                return source
+        except Exception as e:
+            log.debug(f"[ASSETS] Cannot open {pack}: {e}")
+    archive = _bundle_path(rel.with_suffix(".zip"))
+    if archive.is_file():
+        try:
+            return ZipSource(archive)
+        except Exception as e:
+            log.debug(f"[ASSETS] Cannot open {archive}: {e}")
+    return None
+
+
+def resolve_source(mode: str, source_dir: str | None = None) -> DeploySource | None:
+    """
+    Non-interactive source lookup for a mode ("Normal"/"Potato").
+    An explicit source_dir wins; otherwise bundled assets when BUNDLED, else
+    ./BDO_Vulkan_API/<Mode>. Returns None if nothing usable is found.
+    """
+    with trace_span("source.resolve", mode=mode):
+        if source_dir:
+            return DirectorySource(source_dir) if Path(source_dir).is_dir() else None
+        if BUNDLED:
+            return _bundled_source(mode)
+        target_dir = SOURCE_ROOT / mode
+        if target_dir.exists() and any(target_dir.rglob("*")):
+            return DirectorySource(target_dir)
+        return None
+
+
+# ==========================
+# Elevation handoff
+# ==========================
+# When some installs need administrator rights, the GUI hands the pending
+# operation to an elevated copy of itself instead of restarting the whole flow.
+# The handoff file lives in the user's temp folder and is signed with a random
+# key that only travels on the elevated process's command line. It is single
+# use and expires after HANDOFF_TTL.
+HANDOFF_VERSION = 1
+HANDOFF_TTL = 120.0
+HANDOFF_PREFIX = "bdovulkan_handoff_"
+
+
+class HandoffError(ValueError):
+    pass
+
+
+@dataclass
+class Handoff:
+    action: str                # "COPY" or "REMOVE"
+    mode: str
+    source_dir: str | None     # a folder the user picked; None = the mode's default source
+    results: list[PreflightResult]
+    wait_for_game: bool = False
+
+    @property
+    def paths(self) -> list[str]:
+        """The installs to act on: only those whose preflight found that they need elevation."""
+        return [r.path for r in self.results if r.needs_elevation]
+
+    def source(self) -> DeploySource | None:
+        # Bundled assets are looked up again: a one-file build unpacks them
+        # into a folder of its own per process.
+        return resolve_source(self.mode, self.source_dir)
+
+
+def _handoff_signature(key: bytes, payload: dict) -> str:
+    import hmac
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hmac.new(key, body, hashlib.sha256).hexdigest()
+
+
+def _sweep_handoffs(folder: Path):
+    cutoff = time.time() - HANDOFF_TTL
+    for p in folder.glob(HANDOFF_PREFIX + "*.json"):
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+        except OSError:
+            pass
+
+
+def write_handoff(action: str, mode: str, source: DeploySource, results: list[PreflightResult],
+                  wait_for_game: bool = False) -> tuple[Path, str]:
+    """
+    Write the pending operation for an elevated instance; returns the file and
+    the hex key it is signed with, both to be passed on the command line.
+    Raises HandoffError for a source the elevated instance could not find again.
+    """
+    import secrets
+    import tempfile
+    default = resolve_source(mode)
+    if default is not None and str(default) == str(source):
+        source_dir = None
+    elif isinstance(source, DirectorySource):
+        source_dir = str(source.root.resolve())
+    else:
+        raise HandoffError(f"cannot hand off source {source}")
+    payload = {"version": HANDOFF_VERSION, "created": time.time(), "action": action, "mode": mode,
+               "source_dir": source_dir, "wait_for_game": wait_for_game,
+               "results": [dict(r.__dict__) for r in results]}
+    key = secrets.token_bytes(32)
+    folder = Path(tempfile.gettempdir())
+    _sweep_handoffs(folder)
+    path = folder / f"{HANDOFF_PREFIX}{secrets.token_hex(8)}.json"
+    data = json.dumps({"payload": payload, "signature": _handoff_signature(key, payload)})
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(data)
+    log.debug(f"[UAC] Handoff of {len(results)} install(s) written to {path}")
+    return path, key.hex()
+
+
+def read_handoff(path, key: str) -> Handoff:
+    """
+    Load and delete a handoff file. Raises HandoffError if it is missing,
+    unsigned or signed with another key, expired, or malformed.
+    """
+    import hmac
+    path = Path(path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+    except (OSError, ValueError) as e:
+        raise HandoffError(f"cannot read {path}: {e}") from None
+    finally:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    try:
+        payload, signature = doc["payload"], doc["signature"]
+        good = hmac.compare_digest(_handoff_signature(bytes.fromhex(key), payload), signature)
+    except (KeyError, TypeError, ValueError):
+        good = False
+    if not good:
+        raise HandoffError(f"{path}: bad signature")
+    if payload.get("version") != HANDOFF_VERSION:
+        raise HandoffError(f"{path}: unsupported handoff version {payload.get('version')}")
+    age = time.time() - payload.get("created", 0)
+    if not 0 <= age <= HANDOFF_TTL:
+        raise HandoffError(f"{path}: expired ({age:.0f} s old)")
+    try:
+        if payload["action"] not in ("COPY", "REMOVE"):
+            raise ValueError(f"unknown action {payload['action']!r}")
+        results = [PreflightResult(**r) for r in payload["results"]]
+        return Handoff(payload["action"], payload["mode"], payload["source_dir"], results,
+                       bool(payload["wait_for_game"]))
+    except (KeyError, TypeError, ValueError) as e:
+        raise HandoffError(f"{path}: malformed handoff: {e}") from None
+
+
+# ==========================
+# Deploy manifests
+# ==========================
+# Per source, its files (paths relative to the source root) with size, mtime and
+# sha256, so deploy, remove and status never re-walk or re-hash an unchanged
+# preset. Kept in MANIFEST_FILE keyed by str(source).
+MANIFEST_VERSION = 1
+MANIFEST_CACHE_MAX = 16   # sources kept in MANIFEST_FILE, least recently used dropped first
+
+_MANIFEST_SOURCES: dict | None = None   # MANIFEST_FILE's "sources", loaded on first use
+_MANIFEST_LOCK = threading.Lock()
+
+
+def _load_manifest_file() -> dict:
+    try:
+        data = json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))
+        if data.get("version") == MANIFEST_VERSION:
+            return data["sources"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.debug(f"[MANIFEST] Error reading {MANIFEST_FILE}: {e}")
+    return {}
+
+
+def _write_manifest_file(sources: dict):
+    try:
+        keep = sorted(sources.items(), key=lambda kv: kv[1].get("used", 0), reverse=True)
+        tmp = MANIFEST_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": MANIFEST_VERSION,
+                                   "sources": dict(keep[:MANIFEST_CACHE_MAX])}), encoding="utf-8")
+        os.replace(tmp, MANIFEST_FILE)
+    except Exception as e:
+        log.debug(f"[MANIFEST] Write failed: {e}")
+
+
+def _build_manifest(source: DeploySource) -> tuple[list[SourceFile], dict | None]:
+    files, stamp = source.scan()
+    with ThreadPoolExecutor(max_workers=DEPLOY_WORKERS, thread_name_prefix="bdo-manifest") as pool:
+        digests = list(pool.map(source.digest, files))
+    return [SourceFile(sf.rel, sf.size, sf.mtime_ns, d) for sf, d in zip(files, digests)], stamp
+
+
+def deploy_manifest(source) -> list[SourceFile]:
+    """
+    The source's files with their digests. Taken from MANIFEST_FILE when the
+    source has not changed since it was recorded (a few stat() calls), else
+    built once and recorded.
+    """
+    global _MANIFEST_SOURCES
+    source = as_source(source)
+    key = str(source)
+    with trace_span("manifest", source=key):
+        with _MANIFEST_LOCK:
+            if _MANIFEST_SOURCES is None:
+                _MANIFEST_SOURCES = _load_manifest_file()
+            entry = _MANIFEST_SOURCES.get(key)
+        if entry:
+            try:
+                files = [SourceFile(*f) for f in entry["files"]]
+                if source.stamp_current(entry["stamp"], files):
+                    entry["used"] = time.time()
+                    trace_count("manifest.hits")
+                    return files
+            except (KeyError, TypeError) as e:
+                log.debug(f"[MANIFEST] Bad entry for {key}: {e}")
+        files, stamp = _build_manifest(source)
+        trace_count("manifest.builds")
+        log.debug(f"[MANIFEST] Built manifest for {key}: {len(files)} file(s)")
+        if stamp is not None:
+            with _MANIFEST_LOCK:
+                _MANIFEST_SOURCES[key] = {
+                    "stamp": stamp, "used": time.time(),
+                    "files": [[sf.rel, sf.size, sf.mtime_ns, sf.digest] for sf in files]}
+                _write_manifest_file(_MANIFEST_SOURCES)
+        return files
+
+
+# ==========================
+# Drive discovery & scan
+# ==========================
+def get_drives():
+    with trace_span("scan.drives"):
+        return _get_drives()
+
+
+def _get_drives():
+    if os.name != "nt":
+        return ["/"]
+    import ctypes
+    import string
+    drives = []
+    bitmask = ctypes.windll.kernel32.GetLogicalDrives()
+    for i, letter in enumerate(string.ascii_uppercase):
+        if bitmask & (1 << i):
+            root = f"{letter}:\\"
+            try:
+                if os.path.isdir(root):
+                    drives.append(root)
+            except Exception:
+                pass
+    if not drives:
+        drives = ["C:\\"]
+    log.debug(f"Detected drives: {drives}")
+    return drives
+
+
+def quick_search_on_drive(drive_root: str, progress: "ScanProgress | None" = None):
+    with trace_span("scan.quick", drive=drive_root):
+        return _quick_search_on_drive(drive_root, progress)
+
+
+def _quick_search_on_drive(drive_root: str, progress: "ScanProgress | None"):
+    found = []
+    for rel in COMMON_RELATIVE_PATHS:
+        if progress and progress.cancelled:
+            break
+        candidate = Path(drive_root + rel)
+        if progress:
+            progress.update_status(f"Scanning {drive_root} (quick)\n{candidate}")
+        try:
+            if (candidate / GAME_EXE).exists():
+                log.debug(f"[QUICK] Found at {candidate}")
+                found.append(str(candidate))
+                if progress:
+                    progress.found(str(candidate))
+        except PermissionError:
+            log.debug(f"[QUICK] Permission denied: {candidate}")
+        except Exception as e:
+            log.debug(f"[QUICK] Error at {candidate}: {e}")
+    return found
+
+
+# Directory names never descended into by the deep scan (matched on the entry name).
+SKIP_DIRS = frozenset({"System Volume Information",
+                       "$Recycle.Bin", "Windows", "Recovery", "PerfLogs"})
+# Default [scan] rules. Patterns are case-insensitive globs; one without a '/'
+# matches a folder's name, one with a '/' its path relative to the drive root.
+DEFAULT_SCAN_SKIP = tuple(sorted(SKIP_DIRS)) + (
+    "Windows.old", "$WinREAgent", "$SysReset", "Config.Msi", "WinSxS",
+    ".git", ".svn", ".hg", "node_modules", "__pycache__", ".cache",
+    "Cache", "Code Cache", "GPUCache", "ShaderCache", "Service Worker",
+    "*/AppData/Local/Temp", "*/AppData/Local/Packages", "*/AppData/Local/Microsoft",
+    "ProgramData/Microsoft", "ProgramData/Package Cache",
+    "*/steamapps/shadercache", "*/steamapps/downloading", "*/steamapps/workshop",
+)
+DEFAULT_SCAN_PRIORITY = ("*game*", "*steam*", "*pearlabyss*", "*black*desert*",
+                         "program files*", "*epic*")
+FILE_ATTRIBUTE_REPARSE_POINT = 0x400
+# When scan_all_installs walks drives after discovery and the quick search:
+#   fallback  - only if nothing was found at all (default)
+#   per_drive - every drive nothing was found on
+#   always    - every drive
+#   never     - no deep scan
+DEEP_SCAN_MODES = ("fallback", "per_drive", "always", "never")
+
+
+def _compile_globs(patterns) -> tuple[frozenset, "object | None"]:
+    """(exact lower-case names, compiled regex for the rest or None)."""
+    import fnmatch
+    import re
+    exact, globs = set(), []
+    for p in patterns:
+        p = p.strip().replace("\\", "/").lower()
+        if not p:
+            continue
+        if any(c in p for c in "*?["):
+            globs.append(fnmatch.translate(p))
+        else:
+            exact.add(p)
+    return frozenset(exact), (re.compile("|".join(globs)) if globs else None)
+
+
+@dataclass(frozen=True)
+class ScanRules:
+    """
+    What the deep scan prunes and in which order it walks. Loaded from the
+    [scan] section of the config by load_scan_rules().
+    """
+    skip: tuple[str, ...] = DEFAULT_SCAN_SKIP
+    max_depth: int = 16              # 0 = unlimited
+    skip_reparse_points: bool = True  # junctions/mount points (symlinks are never followed)
+    max_entries: int = 50_000        # don't descend into dirs bigger than this (0 = no limit)
+    priority: tuple[str, ...] = DEFAULT_SCAN_PRIORITY
+    stop_after: int = 0              # stop once this many installs were found (0 = find all)
+    deep_scan: str = "fallback"      # see DEEP_SCAN_MODES
+    _names: tuple = field(init=False, repr=False, compare=False)
+    _paths: tuple = field(init=False, repr=False, compare=False)
+    _prio: tuple = field(init=False, repr=False, compare=False)
+    _tails: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        names = [p for p in self.skip if "/" not in p.replace("\\", "/")]
+        paths = [p for p in self.skip if p not in names]
+        object.__setattr__(self, "_names", _compile_globs(names))
+        object.__setattr__(self, "_paths", _compile_globs(paths))
+        object.__setattr__(self, "_prio", _compile_globs(self.priority))
+        # A path pattern can only match a folder named like its last component,
+        # so the relative path is built for those folders only.
+        object.__setattr__(self, "_tails", _compile_globs(
+            p.replace("\\", "/").rstrip("/").rsplit("/", 1)[-1] for p in paths))
+
+    @staticmethod
+    def _match(compiled, text: str) -> bool:
+        exact, regex = compiled
+        return text in exact or (regex is not None and regex.match(text) is not None)
+
+    def prunes(self, name: str, path: str, drive_root: str) -> bool:
+        name = name.lower()
+        if self._match(self._names, name):
+            return True
+        if self._match(self._tails, name):
+            rel = path[len(drive_root):].replace("\\", "/").strip("/").lower()
+            return self._match(self._paths, rel)
+        return False
+
+    def is_priority(self, name: str) -> bool:
+        return self._match(self._prio, name.lower())
+
+    @property
+    def fingerprint(self) -> str:
+        """Changes whenever the pruning changes, which invalidates the scan index."""
+        key = json.dumps([sorted(self.skip), self.max_depth, self.skip_reparse_points,
+                          self.max_entries])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _config_list(value: str) -> tuple[str, ...]:
+    return tuple(p.strip() for p in value.replace("\n", ",").split(",") if p.strip())
+
+
+def _deep_scan_mode(value: str) -> str:
+    value = value.strip().lower()
+    if value not in DEEP_SCAN_MODES:
+        raise ValueError(f"deep_scan must be one of {', '.join(DEEP_SCAN_MODES)}")
+    return value
+
+
+def load_scan_rules(cfg=None) -> ScanRules:
+    """
+    [scan] section of the config, e.g.:
+
+        skip = +Downloads, */Steam/steamapps/common/SomeHugeGame
+        max_depth = 16
+        skip_reparse_points = true
+        max_entries = 50000
+        priority = *game*, *steam*
+        stop_after = 0
+        deep_scan = fallback
+
+    A skip or priority list starting with '+' extends the defaults instead of
+    replacing them.
+    """
+    cfg = cfg if cfg is not None else load_config()
+    d = ScanRules()
+
+    def patterns(key, default):
+        raw = cfg.get("scan", key, fallback="").strip()
+        if not raw:
+            return default
+        if raw.startswith("+"):
+            return default + _config_list(raw[1:])
+        return _config_list(raw)
+
+    try:
+        return ScanRules(
+            skip=patterns("skip", d.skip),
+            max_depth=cfg.getint("scan", "max_depth", fallback=d.max_depth),
+            skip_reparse_points=cfg.getboolean("scan", "skip_reparse_points",
+                                               fallback=d.skip_reparse_points),
+            max_entries=cfg.getint("scan", "max_entries", fallback=d.max_entries),
+            priority=patterns("priority", d.priority),
+            stop_after=cfg.getint("scan", "stop_after", fallback=d.stop_after),
+            deep_scan=_deep_scan_mode(cfg.get("scan", "deep_scan", fallback=d.deep_scan)),
+        )
+    except ValueError as e:
+        log.debug(f"[SCAN] Bad [scan] settings, using defaults: {e}")
+        return d
+
+
+# Shared by every drive being scanned; the walk is I/O bound so oversubscribe the CPUs a bit.
+SCAN_WORKERS = min(16, (os.cpu_count() or 4) + 4)
+# Directories shallower than this are handed to the pool as their own subtree task,
+# deeper ones are walked inline by the task that found them.
+SCAN_SPLIT_DEPTH = 3
+SCAN_POLL_INTERVAL = 0.1  # seconds between status snapshots posted by a running scan
+
+
+class ScanProgress:
+    """
+    Status channel between a scan running on a worker thread and whatever
+    displays it. The scan posts ("status", text) and ("found", path) events
+    into `events`; the consumer drains them on its own schedule. cancel() may
+    be called from any thread and stops the walk within milliseconds, even in
+    the middle of a huge directory.
+    """
+
+    def __init__(self):
+        self.events: queue.Queue = queue.Queue()
+        self.cancelled = False
+        self._hooks: list = []
+        self._lock = threading.Lock()
+
+    def update_status(self, text: str):
+        self.events.put(("status", text))
+
+    def found(self, path: str):
+        self.events.put(("found", path))
+
+    def on_cancel(self, hook):
+        """Call hook() on cancel(), or right away if already cancelled."""
+        with self._lock:
+            if not self.cancelled:
+                self._hooks.append(hook)
+                return
+        hook()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            hooks, self._hooks = self._hooks, []
+        for hook in hooks:
+            hook()
+
+
+# ==========================
+# Persistent scan index
+# ==========================
+# Per drive, a tree of nodes [dir mtime_ns, has GAME_EXE, {child name: node | None}]
+# from the last deep scan, zlib-compressed JSON behind a magic header.
+SCAN_INDEX_MAGIC = b"BDOIDX2\n"
+SCAN_INDEX_MAX_DIRS_PER_DRIVE = 500_000
+SCAN_INDEX_MAX_DEPTH = 64
+
+
+def _index_node_valid(node) -> bool:
+    return (isinstance(node, list) and len(node) == 3
+            and isinstance(node[0], int) and isinstance(node[2], dict))
+
+
+def _index_node_matches(node, mtime_ns: int) -> bool:
+    return _index_node_valid(node) and node[0] == mtime_ns
+
+
+def load_scan_index(fingerprint: str = "") -> dict:
+    """
+    Returns {drive_root: node}. Anything unreadable, or an index built under
+    different pruning rules (fingerprint), means an empty index (full scan).
+    """
+    try:
+        data = SCAN_INDEX_FILE.read_bytes()
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        log.debug(f"[INDEX] Read failed: {e}")
+        return {}
+    try:
+        if not data.startswith(SCAN_INDEX_MAGIC):
+            raise ValueError("bad header")
+        payload = json.loads(zlib.decompress(data[len(SCAN_INDEX_MAGIC):]))
+        drives = payload["drives"]
+        if not isinstance(drives, dict):
+            raise ValueError("bad payload")
+    except Exception as e:
+        log.debug(f"[INDEX] Ignoring corrupt scan index: {e}")
+        return {}
+    if payload.get("rules", "") != fingerprint:
+        log.debug("[INDEX] Scan rules changed since the index was built; ignoring it")
+        return {}
+    log.debug(f"[INDEX] Loaded index for {list(drives)}")
+    return drives
+
+
+def _index_size(node) -> int:
+    """Directories recorded under node; the expected size of the next walk (for the ETA)."""
+    count, stack = 0, [node]
+    while stack:
+        n = stack.pop()
+        if _index_node_valid(n):
+            count += 1
+            stack.extend(c for c in n[2].values() if c is not None)
+    return count
+
+
+def write_scan_index(drives: dict, fingerprint: str = ""):
+    try:
+        payload = json.dumps({"rules": fingerprint, "drives": drives},
+                             separators=(",", ":")).encode("utf-8")
+        tmp = SCAN_INDEX_FILE.with_suffix(".tmp")
+        tmp.write_bytes(SCAN_INDEX_MAGIC + zlib.compress(payload, 6))
+        os.replace(tmp, SCAN_INDEX_FILE)
+        log.debug(f"[INDEX] Wrote index for {list(drives)} to {SCAN_INDEX_FILE}")
+    except Exception as e:
+        log.debug(f"[INDEX] Write failed: {e}")
+
+
+class TreeScanner:
+    """
+    Deep scan of a single drive on a shared thread pool.
+
+    Uses os.scandir and the DirEntry type cache, so no extra stat() per entry.
+    Every directory carries an order key (the index path from the drive root) so
+    results can be returned in the same top-down order os.walk would yield them.
+
+    If `index` (a node from a previous scan, see load_scan_index) is given, any
+    directory whose mtime still matches its node is not re-listed: its children
+    are taken from the node and only stat()ed. `new_index` holds the node tree
+    for this walk once the scan finishes.
+
+    `rules` decides which folders are pruned and which subfolders are walked
+    first (results keep the listing order regardless). on_found(path) is
+    called from the worker threads for every install found.
+    """
+
+    def __init__(self, drive_root: str, pool: ThreadPoolExecutor, rules: ScanRules | None = None,
+                 index: list | None = None, build_index: bool = False, on_found=None):
+        self.drive_root = drive_root
+        self.current_path = drive_root   # last directory a worker picked up (for display)
+        self.expected_dirs = _index_size(index) if index is not None else None
+        self._on_found = on_found
+        self.pool = pool
+        self.rules = rules or ScanRules()
+        self.cancelled = False
+        self.scanned_dirs = 0
+        self.reused_dirs = 0
+        self.skipped_entries = 0   # pruned dirs, symlinks and reparse points not descended into
+        self.new_index: list | None = None
+        self._old_index = index
+        self._build_index = build_index or index is not None
+        self._index_budget = SCAN_INDEX_MAX_DIRS_PER_DRIVE
+        self._found: list[tuple[tuple[int, ...], str]] = []
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._done = threading.Event()
+
+    def start(self) -> "TreeScanner":
+        self._started_ns = time.perf_counter_ns()
+        mtime = None
+        if self._build_index:
+            try:
+                mtime = os.stat(self.drive_root).st_mtime_ns
+            except OSError:
+                pass
+        self._submit((self.drive_root, (), 0, mtime, self._old_index, None))
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def results(self) -> list[str]:
+        with self._lock:
+            return [p for _, p in sorted(self._found)]
+
+    def _submit(self, item: tuple):
+        with self._lock:
+            self._pending += 1
+        try:
+            self.pool.submit(self._run, item)
+        except RuntimeError:
+            # Pool already shut down (cancelled scan tearing down).
+            self._task_done()
+
+    def _task_done(self):
+        with self._lock:
+            self._pending -= 1
+            finished = self._pending == 0
+        if finished:
+            trace_event("scan.deep", self._started_ns, drive=self.drive_root,
+                        dirs=self.scanned_dirs, reused=self.reused_dirs,
+                        cancelled=self.cancelled)
+            trace_count("scan.dirs_visited", self.scanned_dirs)
+            trace_count("scan.dirs_reused", self.reused_dirs)
+            trace_count("scan.entries_skipped", self.skipped_entries)
+            self._done.set()
+
+    def _run(self, item: tuple):
+        try:
+            self._walk(item)
+        except Exception as e:
+            log.debug("[DEEP] Worker error under %s: %s", item[0], e)
+            trace_error(e)
+        finally:
+            self._task_done()
+
+    def _list_dir(self, path: str):
+        """Fresh listing: (has_exe, [(name, path, mtime_ns)], skipped) or None if unreadable."""
+        subdirs = []
+        has_exe = False
+        skipped = entries = 0
+        rules = self.rules
+        check_reparse = rules.skip_reparse_points and os.name == "nt"
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if self.cancelled:
+                        return None
+                    entries += 1
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        if entry.name == GAME_EXE:
+                            has_exe = True
+                        continue
+                    if rules.prunes(entry.name, entry.path, self.drive_root):
+                        skipped += 1
+                        continue
+                    try:
+                        # followlinks=False semantics: never descended into.
+                        if entry.is_symlink():
+                            skipped += 1
+                            continue
+                        st = (entry.stat(follow_symlinks=False)
+                              if self._build_index or check_reparse else None)
+                    except OSError:
+                        continue
+                    if check_reparse and st.st_file_attributes & FILE_ATTRIBUTE_REPARSE_POINT:
+                        skipped += 1
+                        continue
+                    subdirs.append((entry.name, entry.path,
+                                    st.st_mtime_ns if self._build_index else None))
+        except OSError:
+            # Same as os.walk without onerror: unreadable dirs are silently skipped.
+            return None
+        if rules.max_entries and entries > rules.max_entries:
+            # Size hint: caches and asset dumps, not a place an install hides under.
+            skipped += len(subdirs)
+            subdirs = []
+        return has_exe, subdirs, skipped
+
+    def _reuse_dir(self, path: str, node):
+        """Unchanged directory: children come from the index node, one stat() each."""
+        subdirs = []
+        for name in node[2]:
+            if self.cancelled:
+                break
+            child = os.path.join(path, name)
+            try:
+                st = os.stat(child, follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                subdirs.append((name, child, st.st_mtime_ns))
+        return bool(node[1]), subdirs, 0
+
+    def _walk(self, top: tuple):
+        stack = [top]
+        while stack:
+            if self.cancelled:
+                return
+            path, key, depth, mtime, old, slot = stack.pop()
+            self.current_path = path
+            if mtime is not None and _index_node_matches(old, mtime):
+                has_exe, subdirs, skipped = self._reuse_dir(path, old)
+                reused = True
+            else:
+                listing = self._list_dir(path)
+                if listing is None:
+                    continue
+                has_exe, subdirs, skipped = listing
+                reused = False
+
+            node = None
+            with self._lock:
+                self.scanned_dirs += 1
+                self.reused_dirs += reused
+                self.skipped_entries += skipped
+                if has_exe:
+                    self._found.append((key, path))
+                if (self._build_index and mtime is not None
+                        and depth < SCAN_INDEX_MAX_DEPTH and self._index_budget > 0):
+                    self._index_budget -= 1
+                    # Children are filled in as they finish; a None child is simply
+                    # re-listed next time, so a cancelled walk still leaves a valid index.
+                    node = [mtime, int(has_exe), dict.fromkeys(n for n, _, _ in subdirs)]
+            if has_exe:
+                log.debug("[DEEP] Found at %s", path)
+                if self._on_found:
+                    self._on_found(path)
+            if node is not None:
+                if slot is None:
+                    self.new_index = node
+                else:
+                    slot[0][slot[1]] = node
+
+            if self.rules.max_depth and depth >= self.rules.max_depth:
+                with self._lock:
+                    self.skipped_entries += len(subdirs)
+                continue
+            old_children = old[2] if reused else (
+                old[2] if _index_node_valid(old) else {})
+            # Likely game-library folders first; the key keeps the listing order for results.
+            order = list(enumerate(subdirs))
+            if len(order) > 1:
+                order.sort(key=lambda c: not self.rules.is_priority(c[1][0]))
+            inline = []
+            for i, (name, child_path, child_mtime) in order:
+                child = (child_path, key + (i,), depth + 1, child_mtime,
+                         old_children.get(name), (node[2], name) if node else None)
+                if depth + 1 < SCAN_SPLIT_DEPTH:
+                    self._submit(child)
+                else:
+                    inline.append(child)
+            stack.extend(reversed(inline))
+
+
+def _fmt_duration(seconds: float) -> str:
+    if seconds < 1:
+        return "<1 s"
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    return f"{int(seconds // 60)} min {int(seconds % 60):02d} s"
+
+
+def _shorten(path: str, width: int = 60) -> str:
+    return path if len(path) <= width else "…" + path[-(width - 1):]
+
+
+def _scan_eta(scanners: list[TreeScanner], elapsed: float) -> str:
+    """ETA from the size of each drive's previous walk; unknown on a first scan."""
+    if any(s.expected_dirs is None for s in scanners):
+        return "ETA unknown (first scan)"
+    done = sum(s.scanned_dirs for s in scanners)
+    if not done or elapsed <= 0:
+        return "ETA estimating…"
+    left = max(0, sum(s.expected_dirs for s in scanners) - done)
+    return f"ETA ~{_fmt_duration(left / (done / elapsed))}"
+
+
+def _follow_scanners(scanners: list[TreeScanner], progress: ScanProgress | None, label: str,
+                     found: queue.Queue | None = None):
+    """
+    Run until every scanner finishes, posting a status snapshot every
+    SCAN_POLL_INTERVAL and yielding the paths the scanners put on `found`
+    as they arrive.
+    """
+    if progress:
+        def cancel_all():
+            for s in scanners:
+                s.cancel()
+        progress.on_cancel(cancel_all)
+    started = time.monotonic()
+    while True:
+        pending = [s for s in scanners if not s.done]
+        if not pending:
+            break
+        if found is None:
+            pending[0].wait(SCAN_POLL_INTERVAL)
+        else:
+            deadline = time.monotonic() + SCAN_POLL_INTERVAL
+            while (left := deadline - time.monotonic()) > 0:
+                try:
+                    yield found.get(timeout=left)
+                except queue.Empty:
+                    break
+        if progress and not progress.cancelled:
+            elapsed = time.monotonic() - started
+            total = sum(s.scanned_dirs for s in scanners)
+            rate = total / elapsed if elapsed > 0 else 0
+            progress.update_status(
+                f"{label}\nDirs scanned: {total:,} ({rate:,.0f}/s) · {_scan_eta(scanners, elapsed)}\n"
+                f"{_shorten(pending[0].current_path)}")
+    while found is not None and not found.empty():
+        yield found.get_nowait()
+
+
+def _wait_for_scanners(scanners: list[TreeScanner], progress: ScanProgress | None, label: str):
+    """Block until every scanner finishes, posting a status snapshot every SCAN_POLL_INTERVAL."""
+    for _ in _follow_scanners(scanners, progress, label):
+        pass
+
+
+def _found_handler(progress: ScanProgress | None, stop_after: int, scanners: list[TreeScanner],
+                   found: queue.Queue | None = None):
+    """on_found callback: reports finds (to progress and `found`) and stops every scanner after stop_after of them."""
+    lock = threading.Lock()
+    count = [0]
+
+    def on_found(path: str):
+        if progress:
+            progress.found(path)
+        if found is not None:
+            found.put(path)
+        if not stop_after:
+            return
+        with lock:
+            count[0] += 1
+            stop = count[0] >= stop_after
+        if stop:
+            log.debug(f"[SCAN] Found {stop_after} install(s); stopping the deep scan")
+            for s in scanners:
+                s.cancel()
+
+    return on_found if progress or stop_after or found is not None else None
+
+
+def deep_scan_drive(drive_root: str, progress: ScanProgress | None = None,
+                    rules: ScanRules | None = None):
+    rules = rules or load_scan_rules()
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="bdo-scan") as pool:
+        scanners: list[TreeScanner] = []
+        scanner = TreeScanner(drive_root, pool, rules,
+                              on_found=_found_handler(progress, rules.stop_after, scanners))
+        scanners.append(scanner)
+        scanner.start()
+        _wait_for_scanners(
+            [scanner], progress, f"Scanning {drive_root} (deep)")
+    if progress and not progress.cancelled:
+        progress.update_status(
+            f"Scanning {drive_root} (deep) complete\nDirs scanned: {scanner.scanned_dirs:,}")
+    return scanner.results()
+
+
+def iter_scan_installs(progress: ScanProgress | None = None, rules: ScanRules | None = None):
+    """
+    Yield (path, origin) for each install as soon as it is found: discovery
+    from Steam/registry/launcher manifests ("steam" | "registry" | "launcher"),
+    then a quick pass on every drive ("quick"), then (per rules.deep_scan, by
+    default only if nothing turned up) a deep scan of all drives at once
+    ("deep"). Each path is yielded once.
+
+    The walks run on worker threads; the generator itself runs on the
+    consumer's thread. Cancelling `progress` ends it early, and so does
+    closing it (or breaking out of the loop), which stops the walks; the scan
+    index still records what was walked. `rules` defaults to the config's [scan].
+    """
+    from concurrent.futures import as_completed
+    from bdo_vulkan_discovery import discover_installs
+
+    seen = set()
+    rules = rules or load_scan_rules()
+    if progress:
+        progress.update_status("Checking Steam libraries and launcher settings...")
+    with trace_span("scan.discover"):
+        discovered = discover_installs()
+    for p, origin in discovered:
+        if p not in seen:
+            seen.add(p)
+            if progress:
+                progress.found(p)
+            yield p, origin
+    drives = get_drives()
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="bdo-scan") as pool:
+        # Quick pass on every drive at once; it is only a handful of stat() calls each.
+        if progress:
+            progress.update_status(f"Scanning {len(drives)} drive(s) (quick)")
+        quick_futs = {pool.submit(quick_search_on_drive, drv, progress): drv for drv in drives}
+        quick = {}
+        for fut in as_completed(quick_futs):
+            quick[quick_futs[fut]] = fut.result()
+            for p in quick[quick_futs[fut]]:
+                if p not in seen:
+                    seen.add(p)
+                    yield p, "quick"
+
+        # Deep-scan every drive the quick pass came up empty on, concurrently.
+        scanners = {}
+        index = None
+        deep: list[TreeScanner] = []
+        found: queue.Queue = queue.Queue()
+        on_found = _found_handler(progress, rules.stop_after, deep, found)
+        hit_drives = {os.path.normcase(_drive_of(p)) for p, _ in discovered}
+        hit_drives |= {os.path.normcase(drv) for drv in drives if quick[drv]}
+        mode = rules.deep_scan
+        if mode == "never" or (mode == "fallback" and hit_drives):
+            log.debug(f"[SCAN] Skipping deep scan ({mode}): found {len(hit_drives)} drive(s) with installs")
+        elif not (progress and progress.cancelled):
+            for drv in drives:
+                if mode != "always" and os.path.normcase(drv) in hit_drives:
+                    log.debug(
+                        f"[SCAN] Skipping deep scan on {drv}: already found there.")
+                    continue
+                if index is None:
+                    index = load_scan_index(rules.fingerprint)
+                scanners[drv] = TreeScanner(drv, pool, rules, index=index.get(drv),
+                                            build_index=True, on_found=on_found)
+        if scanners:
+            # Every scanner exists before any starts, so a stop_after hit reaches them all.
+            deep.extend(scanners.values())
+            for sc in deep:
+                sc.start()
+            try:
+                for p in _follow_scanners(deep, progress, f"Scanning {', '.join(scanners)} (deep)", found):
+                    if p not in seen:
+                        seen.add(p)
+                        yield p, "deep"
+            finally:
+                # Also reached when the consumer stops early: end the walks, keep what they indexed.
+                for sc in deep:
+                    sc.cancel()
+                for sc in deep:
+                    sc.wait()
+                for drv, sc in scanners.items():
+                    log.debug(
+                        f"[SCAN] {drv}: {sc.scanned_dirs} dirs, {sc.reused_dirs} unchanged since last scan")
+                    if sc.new_index is not None:
+                        index[drv] = sc.new_index
+                write_scan_index(index, rules.fingerprint)
+
+
+def scan_all_installs(progress: ScanProgress | None = None,
+                      found_by: dict | None = None,
+                      rules: ScanRules | None = None) -> list[str]:
+    """
+    iter_scan_installs() to the end: every install found, in the order found.
+    Blocks the calling thread. If given, found_by is filled with {path: origin}.
+    """
+    installs = []
+    for p, origin in iter_scan_installs(progress, rules):
+        installs.append(p)
+        if found_by is not None:
+            found_by[p] = origin
+    log.debug(f"Scan complete. Found installs: {installs}")
+    return installs
+
+
+# ==========================
+# Cache
+# ==========================
+
+
+CACHE_VERSION = 1
+CACHE_VALIDATE_WORKERS = 8
+# Serializes read-modify-write of the cache file: a scan in the background
+# adds its finds while the UI thread records deploys.
+_cache_lock = threading.RLock()
+
+
+@dataclass
+class InstallRecord:
+    path: str
+    drive: str = ""
+    exe_size: int | None = None
+    exe_mtime_ns: int | None = None
+    preset: str | None = None          # preset last deployed by this tool
+    deployed_at: float | None = None
+    last_verified: float | None = None
+    found_by: str = "unknown"          # quick | deep | manual | migrated | ...
+    # Files this tool wrote: rel path -> [size, mtime_ns, sha256] as written.
+    owned: dict[str, list] = field(default_factory=dict)
+    # owned is complete: the install was deployed to (or cleaned) since ownership
+    # is recorded. Otherwise a removal falls back to the preset's files.
+    tracked: bool = False
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "InstallRecord":
+        known = {k: d[k] for k in cls.__dataclass_fields__ if k in d}
+        return cls(**known)
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def _drive_of(path: str) -> str:
+    drive = os.path.splitdrive(path)[0]
+    return drive + os.sep if drive else os.sep
+
+
+def _migrate_legacy_cache() -> list[InstallRecord]:
+    records = []
+    try:
+        for line in LEGACY_CACHE_FILE.read_text(encoding="utf-8").splitlines():
+            p = line.strip().strip('"')
+            if p:
+                records.append(InstallRecord(p, _drive_of(p), found_by="migrated"))
+    except Exception as e:
+        log.debug(f"[CACHE] Error reading legacy cache: {e}")
+        return []
+    write_cache_records(records)
+    try:
+        LEGACY_CACHE_FILE.unlink()
+    except OSError:
+        pass
+    log.debug(f"[CACHE] Migrated {len(records)} path(s) from {LEGACY_CACHE_FILE}")
+    return records
+
+
+def load_cache_records() -> list[InstallRecord]:
+    """Cached installs as recorded, without touching the disks they live on."""
+    with trace_span("cache.read"):
+        return _load_cache_records()
+
+
+def _load_cache_records() -> list[InstallRecord]:
+    if not CACHE_FILE.exists():
+        return _migrate_legacy_cache() if LEGACY_CACHE_FILE.exists() else []
+    try:
+        data = json.loads(CACHE_FILE.read_text(encoding="utf-8"))
+        if data.get("version") != CACHE_VERSION:
+            raise ValueError(f"unsupported cache version {data.get('version')!r}")
+        records = [InstallRecord.from_dict(d) for d in data["installs"]]
+    except Exception as e:
+        log.debug(f"[CACHE] Error reading cache: {e}")
+        return []
+    log.debug(f"[CACHE] Loaded {len(records)} record(s)")
+    return records
+
+
+def write_cache_records(records: list[InstallRecord]):
+    try:
+        uniq = {}
+        for r in records:
+            uniq.setdefault(r.path, r)
+        data = {"version": CACHE_VERSION,
+                "installs": [uniq[p].to_dict() for p in sorted(uniq)]}
+        tmp = CACHE_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+        os.replace(tmp, CACHE_FILE)
+        log.debug(f"[CACHE] Wrote {len(uniq)} record(s) to {CACHE_FILE}")
+    except Exception as e:
+        log.debug(f"[CACHE] Write failed: {e}")
+
+
+def write_cache(paths, found_by: str | dict[str, str] = "unknown"):
+    """
+    Replace the cached install list with `paths`, keeping the metadata of
+    installs that were already known. found_by is one origin for all new
+    paths or a {path: origin} map.
+    """
+    with _cache_lock:
+        old = {r.path: r for r in load_cache_records()}
+        records = []
+        for p in dict.fromkeys(paths):
+            rec = old.get(p)
+            if rec is None:
+                origin = found_by.get(p, "unknown") if isinstance(found_by, dict) else found_by
+                rec = InstallRecord(p, _drive_of(p), found_by=origin)
+            records.append(rec)
+        write_cache_records(records)
+
+
+def add_cached_installs(paths, found_by: str | dict[str, str] = "unknown") -> list[str]:
+    """
+    Add the paths that are not cached yet, keeping every cached install (a
+    scan in progress saves its finds this way). Returns the paths added.
+    """
+    with _cache_lock:
+        records = load_cache_records()
+        known = {r.path for r in records}
+        added = [p for p in dict.fromkeys(paths) if p not in known]
+        for p in added:
+            origin = found_by.get(p, "unknown") if isinstance(found_by, dict) else found_by
+            records.append(InstallRecord(p, _drive_of(p), found_by=origin))
+        if added:
+            write_cache_records(records)
+    return added
+
+
+def update_cache_records(records=(), forget=()):
+    """
+    Write these records over the cached ones of the same path and drop the
+    paths in `forget`; every other cached install is kept as it is on disk.
+    """
+    forget = set(forget)
+    with _cache_lock:
+        changed = {r.path: r for r in records}
+        out = [changed.pop(r.path, r) for r in load_cache_records()]
+        out = [r for r in out + list(changed.values()) if r.path not in forget]
+        write_cache_records(out)
+
+
+def clear_cache():
+    for f in (CACHE_FILE, LEGACY_CACHE_FILE):
+        try:
+            f.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
+def record_deploy(paths: list[str], preset: str | None):
+    """Remember which preset was last deployed to (or removed from, preset=None) each install."""
+    with _cache_lock:
+        records = load_cache_records()
+        targets = set(paths)
+        now = time.time()
+        for r in records:
+            if r.path in targets:
+                r.preset = preset
+                r.deployed_at = now
+        write_cache_records(records)
+
+
+def record_ownership(changes: dict[str, dict[str, list | None]]):
+    """
+    Apply {install: {rel path: [size, mtime_ns, sha256], or None to forget it}}
+    to the installs' owned-file records, which count as complete from then on
+    (an empty dict marks an install that owns nothing). Installs not cached
+    yet are added.
+    """
+    if not changes:
+        return
+    with _cache_lock:
+        records = load_cache_records()
+        by_path = {r.path: r for r in records}
+        for install, files in changes.items():
+            rec = by_path.get(install)
+            if rec is None:
+                rec = by_path[install] = InstallRecord(install, _drive_of(install), found_by="manual")
+                records.append(rec)
+            rec.tracked = True
+            for rel, entry in files.items():
+                if entry is None:
+                    rec.owned.pop(rel, None)
+                else:
+                    rec.owned[rel] = entry
+        write_cache_records(records)
+
+
+def validate_record(rec: InstallRecord) -> bool:
+    """stat() the install's exe; refreshes the record's metadata when it is there."""
+    try:
+        st = os.stat(Path(rec.path) / GAME_EXE)
+    except OSError:
+        return False
+    rec.exe_size, rec.exe_mtime_ns = st.st_size, st.st_mtime_ns
+    rec.last_verified = time.time()
+    rec.drive = rec.drive or _drive_of(rec.path)
+    return True
+
+
+def validate_records_async(records: list[InstallRecord],
+                           workers: int = CACHE_VALIDATE_WORKERS) -> "queue.Queue":
+    """
+    Validate records in parallel on daemon threads (a hung network drive must
+    not keep the process alive). Each result arrives on the returned queue as
+    (record, ok); a final None marks the end.
+    """
+    results: queue.Queue = queue.Queue()
+    todo: queue.Queue = queue.Queue()
+    for r in records:
+        todo.put(r)
+    remaining = [len(records)]
+    lock = threading.Lock()
+    started = time.perf_counter_ns()
+
+    def work():
+        while True:
+            try:
+                rec = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                ok = validate_record(rec)
+            except Exception as e:
+                trace_error(e)
+                ok = False
+            if not ok:
+                log.debug("[CACHE] Invalid or missing exe: %s", rec.path)
+                trace_count("cache.stale")
+            results.put((rec, ok))
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                trace_event("cache.validate", started, records=len(records))
+                results.put(None)
+
+    if not records:
+        results.put(None)
+    for _ in range(min(workers, len(records))):
+        threading.Thread(target=work, name="bdo-cache-validate", daemon=True).start()
+    return results
+
+
+def load_cache() -> list[str]:
+    """Cached installs whose exe is present (validated in parallel), in cache order."""
+    records = load_cache_records()
+    valid = {}
+    results = validate_records_async(records)
+    while (item := results.get()) is not None:
+        rec, ok = item
+        if ok:
+            valid[rec.path] = rec
+    if valid:
+        # Deploys and scans may have written the cache while the disks were
+        # checked: merge only the fields validation refreshes into the current records.
+        with _cache_lock:
+            current = load_cache_records()
+            for cur in current:
+                rec = valid.get(cur.path)
+                if rec is not None:
+                    cur.exe_size, cur.exe_mtime_ns = rec.exe_size, rec.exe_mtime_ns
+                    cur.last_verified, cur.drive = rec.last_verified, rec.drive
+            write_cache_records(current)
+    paths = [r.path for r in records if r.path in valid]
+    log.debug(f"[CACHE] Loaded: {paths}")
+    return paths
+
+
+# ==========================
+# File digests (delta deploy)
+# ==========================
+# (normalized path, size, mtime_ns) -> sha256 hex; a changed file gets a new key.
+# Entries for real files are kept across runs in DIGEST_CACHE_FILE.
+DIGEST_CACHE_VERSION = 1
+DIGEST_CACHE_MAX = 4096   # most recent entries written back
+_DIGEST_CACHE: dict[tuple[str, int, int], str] = {}
+_DIGEST_LOCK = threading.Lock()
+_DIGEST_STATE = {"loaded": False, "dirty": False}
+
+
+def _load_digest_cache():
+    """Merge DIGEST_CACHE_FILE into the in-memory cache, once. Caller holds _DIGEST_LOCK."""
+    _DIGEST_STATE["loaded"] = True
+    try:
+        data = json.loads(DIGEST_CACHE_FILE.read_text(encoding="utf-8"))
+        if data.get("version") != DIGEST_CACHE_VERSION:
+            return
+        for path, size, mtime_ns, digest in data["digests"]:
+            _DIGEST_CACHE.setdefault((path, size, mtime_ns), digest)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.debug(f"[DIGEST] Error reading {DIGEST_CACHE_FILE}: {e}")
+
+
+def save_digest_cache():
+    """Write the file digests computed so far to DIGEST_CACHE_FILE (if any are new). Never raises."""
+    with _DIGEST_LOCK:
+        if not _DIGEST_STATE["dirty"]:
+            return
+        rows = [[*key, d] for key, d in _DIGEST_CACHE.items() if os.path.isabs(key[0])]
+        _DIGEST_STATE["dirty"] = False
+    try:
+        tmp = DIGEST_CACHE_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": DIGEST_CACHE_VERSION,
+                                   "digests": rows[-DIGEST_CACHE_MAX:]}), encoding="utf-8")
+        os.replace(tmp, DIGEST_CACHE_FILE)
+    except Exception as e:
+        log.debug(f"[DIGEST] Write failed: {e}")
+
+
+def _hash_file(path, size: int) -> str:
+    with open(path, "rb") as f:
+        if size < MMAP_THRESHOLD:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        import mmap
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+def file_digest(path, st: os.stat_result | None = None) -> str:
+    st = st or os.stat(path)
+    key = (os.path.normcase(os.path.abspath(path)), st.st_size, st.st_mtime_ns)
+    with _DIGEST_LOCK:
+        if not _DIGEST_STATE["loaded"]:
+            _load_digest_cache()
+        cached = _DIGEST_CACHE.get(key)
+    if cached is not None:
+        trace_count("digest.hits")
+        return cached
+    digest = _hash_file(path, st.st_size)
+    trace_count("digest.bytes_hashed", st.st_size)
+    with _DIGEST_LOCK:
+        _DIGEST_CACHE.pop(key, None)   # re-insert so the newest entries are the ones saved
+        _DIGEST_CACHE[key] = digest
+        _DIGEST_STATE["dirty"] = True
+    return digest
+
+
+def is_up_to_date(source: "DeploySource", sf: "SourceFile", dst) -> bool:
+    """
+    True if dst already has sf's content. Size + mtime decide the common case
+    (deploys preserve the source mtime); the content digest is only computed
+    when sizes match but mtimes differ. In that case dst's mtime is synced to
+    the source's so the next check takes the fast path again.
+    """
+    try:
+        dst_st = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if dst_st.st_size != sf.size:
+        return False
+    if dst_st.st_mtime_ns == sf.mtime_ns:
+        return True
+    if (sf.digest or source.digest(sf)) != file_digest(dst, dst_st):
+        return False
+    try:
+        os.utime(dst, ns=(dst_st.st_atime_ns, sf.mtime_ns))
+    except OSError:
+        pass
+    return True
+
+
+@dataclass
+class DeployResult:
+    copied: int = 0
+    skipped: int = 0   # already identical at the destination
+    failed: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        if self.failed and not self.copied:
+            return (f"Nothing was changed (all changes rolled back).\n"
+                    f"Already up to date: {self.skipped}\n"
+                    f"Failed: {self.failed}")
+        return (f"Copied/Replaced: {self.copied}\n"
+                f"Already up to date: {self.skipped}\n"
+                f"Failed: {self.failed}")
+
+
+@dataclass
+class RemoveResult:
+    removed: int = 0
+    kept: int = 0      # changed since they were deployed, so left alone
+    failed: int = 0
+    errors: list[str] = field(default_factory=list)
+    incomplete: list[str] = field(default_factory=list)   # installs with a file that could not be removed
+
+    def summary(self) -> str:
+        return (f"Removed: {self.removed}\n"
+                f"Kept (changed since deployed): {self.kept}\n"
+                f"Failed: {self.failed}")
+
+    def cleaned(self, paths: list[str]) -> list[str]:
+        """The installs of paths every file could be removed from."""
+        return [p for p in paths if p not in self.incomplete]
+
+
+# ==========================
+# Deploy transactions
+# ==========================
+STAGE_SUFFIX = ".bdo-stage"
+BACKUP_SUFFIX = ".bdo-bak"
+
+
+def _journal_path(token: str) -> Path:
+    """One journal per transaction, so concurrent deploys (fleet mode) do not share one."""
+    return DEPLOY_JOURNAL_FILE.with_name(f"{DEPLOY_JOURNAL_FILE.stem}.{token}{DEPLOY_JOURNAL_FILE.suffix}")
+
+
+def _journal_files() -> list[Path]:
+    """Journals left behind, including the single shared one older versions wrote."""
+    pattern = f"{DEPLOY_JOURNAL_FILE.stem}.*{DEPLOY_JOURNAL_FILE.suffix}"
+    return [p for p in [DEPLOY_JOURNAL_FILE, *sorted(DEPLOY_JOURNAL_FILE.parent.glob(pattern))] if p.exists()]
+
+
+def _write_journal(path: Path, data: dict | None):
+    """Persist (or with None, delete) a deploy journal. Never raises."""
+    try:
+        if data is None:
+            path.unlink(missing_ok=True)
+            return
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception as e:
+        log.debug(f"[TX] Journal write failed: {e}")
+
+
+def _fsync_file(path: Path):
+    # Windows needs a writable handle for FlushFileBuffers.
+    with open(path, "r+b") as f:
+        os.fsync(f.fileno())
+
+
+DEPLOY_WORKERS = 8       # concurrent destination writers
+DEPLOY_CHUNK = 1 << 20   # bytes written between progress updates
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+class DeployProgress:
+    """Thread-safe byte counters for a deploy, per install and overall."""
+
+    def __init__(self):
+        self.cancelled = False
+        self.total = 0
+        self.done = 0
+        self.started = time.monotonic()
+        self._per_install: dict[str, list] = {}  # install -> [done, total, first write time]
+        self._lock = threading.Lock()
+
+    def plan(self, install: str, nbytes: int):
+        with self._lock:
+            self.total += nbytes
+            self._per_install.setdefault(install, [0, 0, None])[1] += nbytes
+
+    def advance(self, install: str, nbytes: int):
+        now = time.monotonic()
+        with self._lock:
+            self.done += nbytes
+            entry = self._per_install[install]
+            entry[0] += nbytes
+            if entry[2] is None:
+                entry[2] = now
+
+    def fraction(self) -> float:
+        with self._lock:
+            return self.done / self.total if self.total else 1.0
+
+    def status_text(self, max_lines: int = 6) -> str:
+        now = time.monotonic()
+        with self._lock:
+            rate = self.done / max(now - self.started, 1e-6)
+            eta = f"  ETA ~{_fmt_duration((self.total - self.done) / rate)}" if self.done else ""
+            lines = [f"Copying {_fmt_bytes(self.done)} / {_fmt_bytes(self.total)}"
+                     f"  ({_fmt_bytes(rate)}/s){eta}"]
+            rows = sorted(self._per_install.items(), key=lambda kv: kv[1][0] / max(kv[1][1], 1))
+            for install, (done, total, t0) in rows[:max_lines]:
+                r = done / max(now - t0, 1e-6) if t0 else 0.0
+                pct = 100 * done / total if total else 100
+                lines.append(f"  {pct:3.0f}%  {_fmt_bytes(r)}/s  {install}")
+            if len(rows) > max_lines:
+                lines.append(f"  … and {len(rows) - max_lines} more")
+        return "\n".join(lines)
+
+
+def _write_buffer(buf, dst: Path, mtime_ns: int, install: str, progress: DeployProgress | None):
+    with trace_span("deploy.write", install=install, file=dst.name), \
+            memoryview(buf) as view, open(dst, "wb") as f:
+        for off in range(0, len(view), DEPLOY_CHUNK):
+            if progress and progress.cancelled:
+                raise InterruptedError("Cancelled by user")
+            chunk = view[off:off + DEPLOY_CHUNK]
+            f.write(chunk)
+            if progress:
+                progress.advance(install, len(chunk))
+        trace_count("deploy.bytes_written", len(view))
+    os.utime(dst, ns=(mtime_ns, mtime_ns))
+
+
+class DeployTransaction:
+    """
+    All-or-nothing copy of files into one or more installs.
+
+    Every file is first staged as a hidden temp sibling of its destination,
+    then all staged files are fsynced in one pass, and only then swapped in
+    with os.replace (the old file is renamed to a backup first). A failure at
+    any point puts every destination back the way it was. A journal next to
+    DEPLOY_JOURNAL_FILE records the plan so recover_interrupted_deploy() can
+    finish the rollback if the process dies half-way.
+
+    Staging reads each source file once and fans the buffer out to all its
+    destinations on a bounded thread pool, so the copy is paced by the slowest
+    disk rather than the sum of all of them.
+    """
+
+    def __init__(self):
+        self.ops: list[dict] = []
+        self._files: list[tuple[DeploySource, SourceFile]] = []
+        token = os.urandom(4).hex()
+        self._stage_ext = f".{token}{STAGE_SUFFIX}"
+        self._backup_ext = f".{token}{BACKUP_SUFFIX}"
+        self._journal_file = _journal_path(token)
+
+    def add(self, source: DeploySource, sf: SourceFile, dst: Path, install: str | None = None):
+        self._files.append((source, sf))
+        install = install or str(dst.parent)
+        # Folders under the install the file needs that are not there yet, outermost first.
+        mkdirs, parent = [], dst.parent
+        while parent != Path(install) and parent != parent.parent and not parent.exists():
+            mkdirs.insert(0, str(parent))
+            parent = parent.parent
+        self.ops.append({
+            "src": f"{source}:{sf.rel}",
+            "dst": str(dst),
+            "install": install,
+            "stage": str(dst.with_name(f".{dst.name}{self._stage_ext}")),
+            "backup": str(dst.with_name(f".{dst.name}{self._backup_ext}")) if dst.exists() else None,
+            "mkdirs": mkdirs,
+        })
+
+    def _journal(self, phase: str | None):
+        _write_journal(self._journal_file, phase and {"version": 1, "phase": phase, "ops": self.ops})
+
+    def _stage(self, pool: ThreadPoolExecutor, progress: DeployProgress | None) -> list[str]:
+        # Group destinations by source file so every file is read exactly once.
+        groups: dict[tuple[int, str], list[int]] = {}
+        for i, (source, sf) in enumerate(self._files):
+            groups.setdefault((id(source), sf.rel), []).append(i)
+            if progress:
+                progress.plan(self.ops[i]["install"], sf.size)
+
+        errors = []
+        for op in self.ops:
+            for d in op["mkdirs"]:
+                try:
+                    os.makedirs(d, exist_ok=True)
+                except OSError as e:
+                    trace_error(e)
+                    return [f"{op['dst']}: {e}"]
+        for idxs in groups.values():
+            if progress and progress.cancelled:
+                return ["Cancelled by user"]
+            source, sf = self._files[idxs[0]]
+            try:
+                with trace_span("deploy.stage", file=sf.rel, targets=len(idxs)), \
+                        source.buffer(sf) as buf:
+                    futs = {pool.submit(_write_buffer, buf, Path(self.ops[i]["stage"]),
+                                        sf.mtime_ns, self.ops[i]["install"], progress): i
+                            for i in idxs}
+                    for fut, i in futs.items():
+                        try:
+                            fut.result()
+                        except Exception as e:
+                            trace_error(e)
+                            errors.append(f"{self.ops[i]['dst']}: {e}")
+            except Exception as e:
+                trace_error(e)
+                errors.append(f"{source}:{sf.rel}: {e}")
+            if progress and progress.cancelled:
+                return ["Cancelled by user"]
+            if errors:
+                return errors
+
+        # One sync pass over everything staged, spread over the pool too.
+        with trace_span("deploy.fsync", files=len(self.ops)):
+            futs = {pool.submit(_fsync_file, Path(op["stage"])): op for op in self.ops}
+            for fut, op in futs.items():
+                try:
+                    fut.result()
+                except Exception as e:
+                    trace_error(e)
+                    errors.append(f"{op['dst']}: {e}")
+        return errors
+
+    def run(self, progress: DeployProgress | None = None) -> list[str]:
+        """Stage, sync and commit every op. Returns errors; empty means committed."""
+        if not self.ops:
+            return []
+        self._journal("staging")
+        with ThreadPoolExecutor(max_workers=DEPLOY_WORKERS, thread_name_prefix="bdo-deploy") as pool:
+            errors = self._stage(pool, progress)
+        if not errors and progress and progress.cancelled:
+            errors = ["Cancelled by user"]
+        if errors:
+            log.debug(f"[TX] Staging failed, rolling back: {errors}")
+            _rollback_ops(self.ops)
+            self._journal(None)
+            return errors
+
+        self._journal("committing")
+        with trace_span("deploy.commit", files=len(self.ops)):
+            for op in self.ops:
+                try:
+                    if op["backup"]:
+                        os.replace(op["dst"], op["backup"])
+                    os.replace(op["stage"], op["dst"])
+                except Exception as e:
+                    errors.append(f"{op['dst']}: {e}")
+                    trace_error(e)
+                    log.debug(f"[TX] Commit failed at {op['dst']}, rolling back: {e}")
+                    _rollback_ops(self.ops)
+                    self._journal(None)
+                    return errors
+
+        self._journal("committed")
+        _discard_backups(self.ops)
+        self._journal(None)
+        log.debug(f"[TX] Committed {len(self.ops)} file(s)")
+        return []
+
+
+def _rollback_ops(ops: list[dict]) -> int:
+    """Undo whatever part of a transaction reached the disk. Returns files restored."""
+    restored = 0
+    for op in reversed(ops):
+        stage, dst, backup = op["stage"], op["dst"], op["backup"]
+        try:
+            if backup:
+                if os.path.exists(backup):
+                    os.replace(backup, dst)
+                    restored += 1
+            elif not os.path.exists(stage) and os.path.exists(dst):
+                # New file that was already swapped in: the install did not have it before.
+                os.unlink(dst)
+                restored += 1
+        except Exception as e:
+            log.debug(f"[TX] Rollback failed at {dst}: {e}")
+        try:
+            if os.path.exists(stage):
+                os.unlink(stage)
+        except Exception as e:
+            log.debug(f"[TX] Could not remove staged file {stage}: {e}")
+        for d in reversed(op.get("mkdirs") or ()):
+            try:
+                os.rmdir(d)
+            except OSError:
+                break   # not empty (still needed by another op) or already gone
+    return restored
+
+
+def _discard_backups(ops: list[dict]):
+    for op in ops:
+        if op["backup"]:
+            try:
+                os.unlink(op["backup"])
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                log.debug(f"[TX] Could not remove backup {op['backup']}: {e}")
+
+
+def recover_interrupted_deploy() -> int:
+    """
+    Finish the deploys that were interrupted last run: a transaction that never
+    reached "committed" is rolled back, one that did only has its backups
+    cleaned up. Returns the number of files restored.
+    """
+    restored = 0
+    for journal in _journal_files():
+        try:
+            data = json.loads(journal.read_text(encoding="utf-8"))
+            phase, ops = data["phase"], data["ops"]
+        except Exception as e:
+            log.debug(f"[TX] Unreadable deploy journal {journal.name}, discarding: {e}")
+            _write_journal(journal, None)
+            continue
+        if phase == "committed":
+            _discard_backups(ops)
+            count = 0
+        else:
+            count = _rollback_ops(ops)
+        log.debug(f"[TX] Recovered interrupted deploy ({phase}); restored {count} file(s)")
+        restored += count
+        _write_journal(journal, None)
+    return restored
+
+
+def deploy_file_for(source: DeploySource, sf: SourceFile, install: str) -> tuple[DeploySource, SourceFile]:
+    """The preset file itself, or for dxvk.conf the version rendered for this install."""
+    if Path(sf.rel).name.lower() != "dxvk.conf":
+        return source, sf
+    from bdo_vulkan_dxvkconf import render_for_install
+    try:
+        return render_for_install(source, sf, install) or (source, sf)
+    except Exception as e:
+        log.warning(f"[DXVKCONF] Cannot render {sf.rel} for {install}, deploying the preset's: {e}")
+        trace_error(e)
+        return source, sf
+
+
+def copy_replace(source, dest_paths: list[str], delta: bool = True,
+                 progress: DeployProgress | None = None, seed_cache: bool = True) -> DeployResult:
+    """
+    Copy every file of the source's manifest into every destination, at the
+    same relative path, as a single transaction; dxvk.conf is rendered per
+    install from its layers (see bdo_vulkan_dxvkconf). The files written are
+    recorded as owned by each install (see remove_matching); a file that was
+    already up to date only stays owned if the install owned it before. With
+    seed_cache, a successful deploy also shares the installs' DXVK state
+    caches between them (see bdo_vulkan_statecache).
+    """
+    with trace_span("deploy", installs=len(dest_paths), delta=delta):
+        source = as_source(source)
+        result = DeployResult()
+        tx = DeployTransaction()
+        owned: dict[str, dict[str, list]] = {dest: {} for dest in dest_paths}
+        owned_before = {r.path: r.owned for r in load_cache_records() if r.path in owned}
+        written: list[tuple[str, SourceFile]] = []
+        with trace_span("deploy.compare"):
+            for base_sf in deploy_manifest(source):
+                for dest in dest_paths:
+                    src, sf = deploy_file_for(source, base_sf, dest)
+                    dst = Path(dest) / sf.rel
+                    try:
+                        if delta and is_up_to_date(src, sf, dst):
+                            log.debug("[COPY] %s already up to date in %s", sf.rel, dest)
+                            result.skipped += 1
+                            if sf.rel in owned_before.get(dest, ()):
+                                owned[dest][sf.rel] = [sf.size, sf.mtime_ns, sf.digest]
+                            continue
+                    except Exception as e:
+                        log.debug("[COPY] Compare failed %s -> %s: %s", sf.rel, dest, e)
+                        trace_error(e)
+                    tx.add(src, sf, dst, install=dest)
+                    written.append((dest, sf))
+        trace_count("deploy.files_skipped", result.skipped)
+
+        errors = tx.run(progress)
+        if errors:
+            result.failed += len(tx.ops)
+            result.errors.extend(errors)
+        else:
+            result.copied += len(tx.ops)
+            for dest, sf in written:
+                owned[dest][sf.rel] = [sf.size, sf.mtime_ns, sf.digest]
+                log.debug("[COPY] %s -> %s", sf.rel, dest)
+        # After a successful deploy every install's record is complete, even one
+        # that owns nothing because all its files were there already.
+        record_ownership({dest: files for dest, files in owned.items() if files or not errors})
+        clear_preflight_cache(dest_paths)
+        trace_count("deploy.files_copied", result.copied)
+        if seed_cache and not errors:
+            from bdo_vulkan_statecache import sync_state_caches
+            sync_state_caches(dest_paths)
+    return result
+
+
+def _owned_unchanged(target: Path, entry: list) -> bool:
+    """True if target still holds what was deployed (raises FileNotFoundError if gone)."""
+    st = os.stat(target)
+    size, mtime_ns, digest = entry
+    if st.st_size != size:
+        return False
+    return st.st_mtime_ns == mtime_ns or file_digest(target, st) == digest
+
+
+def _prune_empty_dirs(install: Path, rel: str):
+    for parent in PurePosixPath(rel).parents[:-1]:
+        try:
+            os.rmdir(install / parent)
+        except OSError:
+            return
+
+
+def remove_matching(source, dest_paths: list[str]) -> RemoveResult:
+    """
+    Remove the files this tool deployed to each install: those in the
+    install's ownership record or, for an install deployed before ownership
+    was recorded, the source's files whose content is still the preset's. A
+    file changed since it was deployed is left alone. A file that cannot be
+    removed (e.g. held open by the game) is reported in the result and its
+    install listed as incomplete.
+    """
+    result = RemoveResult()
+    with trace_span("remove", installs=len(dest_paths)):
+        records = {r.path: r for r in load_cache_records()}
+        fallback = None
+        changes: dict[str, dict[str, list | None]] = {}
+        for dest in dest_paths:
+            rec = records.get(dest)
+            owned = rec.owned if rec else None
+            if not owned and not (rec and rec.tracked):
+                if fallback is None:
+                    fallback = {sf.rel: [sf.size, sf.mtime_ns, sf.digest]
+                                for sf in deploy_manifest(source)}
+                owned = fallback
+            forget = changes[dest] = {}
+            for rel, entry in owned.items():
+                target = Path(dest) / rel
+                try:
+                    if not _owned_unchanged(target, entry):
+                        log.debug("[REMOVE] Keeping %s in %s: changed since it was deployed", rel, dest)
+                        forget[rel] = None
+                        result.kept += 1
+                        continue
+                    target.unlink()
+                except FileNotFoundError:
+                    forget[rel] = None
+                    continue
+                except Exception as e:
+                    log.debug("[REMOVE] Failed %s x %s: %s", rel, dest, e)
+                    trace_error(e)
+                    result.failed += 1
+                    result.errors.append(f"{target}: {e}")
+                    if dest not in result.incomplete:
+                        result.incomplete.append(dest)
+                    continue
+                forget[rel] = None
+                result.removed += 1
+                log.debug("[REMOVE] %s x %s", rel, dest)
+                _prune_empty_dirs(Path(dest), rel)
+        record_ownership({d: c for d, c in changes.items() if d in records and c})
+        clear_preflight_cache(dest_paths)
+    trace_count("remove.files_removed", result.removed)
+    return result
+
+
+# ==========================
+# Install status
+# ==========================
+VERIFY_WORKERS = 8   # concurrent file hashers
+PE_MAX_RESOURCE_SECTION = 16 << 20
+
+
+def _pe_version_resource(f) -> bytes | None:
+    """Raw VS_VERSIONINFO of an open PE file, located through the resource directory."""
+    import struct
+
+    def read_at(off: int, n: int) -> bytes:
+        f.seek(off)
+        data = f.read(n)
+        if len(data) != n:
+            raise ValueError("truncated PE file")
+        return data
+
+    if read_at(0, 2) != b"MZ":
+        return None
+    pe = struct.unpack("<I", read_at(0x3C, 4))[0]
+    if read_at(pe, 4) != b"PE\0\0":
+        return None
+    nsections, opt_size = struct.unpack("<2xH12xH2x", read_at(pe + 4, 20))
+    opt = pe + 24
+    magic = struct.unpack("<H", read_at(opt, 2))[0]
+    dirs = opt + (96 if magic == 0x10B else 112)    # PE32 / PE32+
+    res_rva, res_size = struct.unpack("<II", read_at(dirs + 2 * 8, 8))
+    if not res_rva:
+        return None
+    for i in range(nsections):
+        va, raw_size, raw_ptr = struct.unpack("<12xIII", read_at(opt + opt_size + 40 * i, 24))
+        if va <= res_rva < va + max(raw_size, 1):
+            break
+    else:
+        return None
+    if raw_size > PE_MAX_RESOURCE_SECTION:
+        return None
+    sec = read_at(raw_ptr, raw_size)
+    base = res_rva - va                      # resource directory offset within sec
+
+    def first_entry(dir_off: int, want_id: int | None) -> int | None:
+        named, ids = struct.unpack_from("<12xHH", sec, base + dir_off)
+        for k in range(named + ids):
+            name, target = struct.unpack_from("<II", sec, base + dir_off + 16 + 8 * k)
+            if want_id is None or name == want_id:
+                return target
+        return None
+
+    node = first_entry(0, 16)                # RT_VERSION
+    for _ in range(2):                       # name, then language: take the first of each
+        if node is None or not node & 0x80000000:
+            return None
+        node = first_entry(node & 0x7FFFFFFF, None)
+    if node is None or node & 0x80000000:
+        return None
+    data_rva, size = struct.unpack_from("<II", sec, base + node)
+    start = data_rva - va
+    return sec[start:start + size]
+
+
+def _version_blocks(data: bytes, off: int, end: int):
+    """(key, value bytes, type, children offset, block end) for each version block in data[off:end]."""
+    import struct
+    while off + 6 <= end:
+        length, value_len, vtype = struct.unpack_from("<HHH", data, off)
+        if length == 0:
+            return
+        key_end = off + 6
+        while data[key_end:key_end + 2] not in (b"\0\0", b""):
+            key_end += 2
+        key = data[off + 6:key_end].decode("utf-16-le", errors="replace")
+        value_off = (key_end + 2 + 3) & ~3
+        value_bytes = value_len * 2 if vtype == 1 else value_len
+        block_end = off + length
+        yield key, data[value_off:value_off + value_bytes], vtype, (value_off + value_bytes + 3) & ~3, block_end
+        off = (block_end + 3) & ~3
+
+
+def read_pe_version(path) -> dict | None:
+    """
+    Version resource of a DLL/EXE, read from the file without loading it:
+    {"file_version": "a.b.c.d", "product_version": "a.b.c.d", "strings": {...}}
+    where strings holds the StringFileInfo values (ProductName, ...). None if
+    the file has no version resource.
+    """
+    import struct
+    try:
+        with open(path, "rb") as f:
+            data = _pe_version_resource(f)
+        if not data:
+            return None
+        root = next(_version_blocks(data, 0, len(data)), None)
+        if root is None or root[0] != "VS_VERSION_INFO":
+            return None
+        _, fixed, _, children, end = root
+        out = {"file_version": None, "product_version": None, "strings": {}}
+        if len(fixed) >= 52 and struct.unpack_from("<I", fixed)[0] == 0xFEEF04BD:
+            fv_ms, fv_ls, pv_ms, pv_ls = struct.unpack_from("<4I", fixed, 8)
+            out["file_version"] = f"{fv_ms >> 16}.{fv_ms & 0xFFFF}.{fv_ls >> 16}.{fv_ls & 0xFFFF}"
+            out["product_version"] = f"{pv_ms >> 16}.{pv_ms & 0xFFFF}.{pv_ls >> 16}.{pv_ls & 0xFFFF}"
+        for key, _, _, child_off, child_end in _version_blocks(data, children, end):
+            if key != "StringFileInfo":
+                continue
+            for _, _, _, table_off, table_end in _version_blocks(data, child_off, child_end):
+                for name, value, _, _, _ in _version_blocks(data, table_off, table_end):
+                    out["strings"].setdefault(
+                        name, value.decode("utf-16-le", errors="replace").rstrip("\0"))
+        return out
+    except (OSError, ValueError, struct.error) as e:
+        log.debug(f"[STATUS] Cannot read version of {path}: {e}")
+        return None
+
+
+_DXVK_VERSION_RE = None
+
+
+def read_dxvk_version(path) -> str | None:
+    """
+    DXVK version of a dxgi.dll/d3d11.dll ("2.7.1"), or None if the file is
+    missing or not DXVK. DXVK's version resource mimics the Windows DLL it
+    replaces, so the version comes from the string DXVK embeds for its log
+    ("v2.7.1", "v2.7-12-gabcdef"); the resource only identifies the file.
+    """
+    global _DXVK_VERSION_RE
+    info = read_pe_version(path)
+    named = bool(info) and any("dxvk" in v.lower() for v in info["strings"].values())
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    if not size or size > PE_MAX_RESOURCE_SECTION * 4:
+        return None
+    import mmap
+    import re
+    if _DXVK_VERSION_RE is None:
+        _DXVK_VERSION_RE = re.compile(rb"\0v(\d+\.\d+(?:\.\d+)?(?:-\d+-g[0-9a-f]+)?)\0")
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if not named and (mm[:2] != b"MZ" or mm.find(b"DXVK") < 0):
+                return None
+            m = _DXVK_VERSION_RE.search(mm)
+            return m.group(1).decode("ascii") if m else "unknown"
+    except (OSError, ValueError) as e:
+        log.debug(f"[STATUS] Cannot scan {path}: {e}")
+        return None
+
+
+@dataclass
+class InstallStatus:
+    path: str
+    preset: str | None = None          # preset whose files are (best) matched
+    dxvk_version: str | None = None    # from the install's dxgi.dll
+    modified: list[str] = field(default_factory=list)   # preset files with other content
+    missing: list[str] = field(default_factory=list)    # preset files not present
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    def summary(self) -> str:
+        if self.error:
+            return self.error
+        text = self.preset or "no preset"
+        changes = [f"{len(v)} {k}" for k, v in (("modified", self.modified), ("missing", self.missing)) if v]
+        if changes:
+            text += f" ({', '.join(changes)})"
+        if self.dxvk_version:
+            text += f", DXVK {self.dxvk_version}"
+        return text
+
+
+def _file_state(dst: Path, by_preset: dict[str, SourceFile]) -> dict[str, str]:
+    """{preset: "match" | "modified" | "missing"} for one installed file."""
+    try:
+        st = os.stat(dst)
+    except FileNotFoundError:
+        return {m: "missing" for m in by_preset}
+    except OSError:
+        return {m: "modified" for m in by_preset}
+    states, digest = {}, None
+    for m, sf in by_preset.items():
+        if st.st_size != sf.size:
+            states[m] = "modified"
+            continue
+        try:
+            digest = digest or file_digest(dst, st)
+        except OSError:
+            return {m: "modified" for m in by_preset}
+        states[m] = "match" if digest == sf.digest else "modified"
+    return states
+
+
+def _install_status(path: str, states: dict[str, dict[str, str]],
+                    manifests: dict[str, list[SourceFile]], hint: str | None,
+                    version: str | None) -> InstallStatus:
+    status = InstallStatus(path, dxvk_version=version)
+    matches = {m: sum(states[sf.rel][m] == "match" for sf in files)
+               for m, files in manifests.items() if files}
+    complete = [m for m, n in matches.items() if n == len(manifests[m])]
+    if complete:
+        status.preset = hint if hint in complete else complete[0]
+        return status
+    best = max(matches, key=lambda m: (matches[m], m == hint), default=None)
+    if best is None or not matches[best]:
+        return status
+    status.preset = best
+    status.modified = sorted(sf.rel for sf in manifests[best] if states[sf.rel][best] == "modified")
+    status.missing = sorted(sf.rel for sf in manifests[best] if states[sf.rel][best] == "missing")
+    return status
+
+
+def verify_installs_async(paths: list[str], sources: dict | None = None,
+                          workers: int = VERIFY_WORKERS) -> "queue.Queue":
+    """
+    Compare each install against every preset's manifest on a daemon thread.
+    Files are hashed in parallel; digests come from the persistent digest
+    cache when the file's size and mtime are unchanged. Each result arrives
+    on the returned queue as (path, InstallStatus), in path order; a final
+    None marks the end. `sources` defaults to resolve_source() per preset.
+    """
+    results: queue.Queue = queue.Queue()
+    paths = list(paths)   # the caller may keep adding to its list
+
+    def run():
+        try:
+            with trace_span("verify", installs=len(paths)):
+                _verify_installs(paths, sources, workers, results.put)
+        except Exception as e:
+            log.debug(f"[STATUS] Verification failed: {e}")
+            trace_error(e)
+        finally:
+            save_digest_cache()
+            results.put(None)
+
+    threading.Thread(target=run, name="bdo-verify", daemon=True).start()
+    return results
+
+
+def _verify_installs(paths, sources, workers, emit):
+    if sources is None:
+        sources = {m: resolve_source(m) for m in PRESETS}
+    manifests = {m: deploy_manifest(s) for m, s in sources.items() if s is not None}
+    hints = {r.path: r.preset for r in load_cache_records()}
+    by_rel: dict[str, dict[str, SourceFile]] = {}
+    for m, files in manifests.items():
+        for sf in files:
+            by_rel.setdefault(sf.rel, {})[m] = sf
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bdo-verify") as pool:
+        pending = {}
+        for p in paths:
+            if not (Path(p) / GAME_EXE).exists():
+                emit((p, InstallStatus(p, error=f"{GAME_EXE} not found")))
+                continue
+            expected = {rel: {m: deploy_file_for(sources[m], sf, p)[1] for m, sf in ms.items()}
+                        for rel, ms in by_rel.items()}
+            pending[p] = ({rel: pool.submit(_file_state, Path(p) / rel, ms) for rel, ms in expected.items()},
+                          pool.submit(read_dxvk_version, Path(p) / DXGI_DLL))
+        for p, (futs, version) in pending.items():
+            states = {rel: fut.result() for rel, fut in futs.items()}
+            emit((p, _install_status(p, states, manifests, hints.get(p), version.result())))
+
+
+def verify_installs(paths: list[str], sources: dict | None = None) -> list[InstallStatus]:
+    """Blocking verify_installs_async(): one InstallStatus per path, in order."""
+    results = verify_installs_async(paths, sources)
+    out = {}
+    while (item := results.get()) is not None:
+        out[item[0]] = item[1]
+    return [out[p] for p in paths if p in out]
@@ -0,0 +1,419 @@
+# bdo_vulkan_discovery.py
+"""
+Scan-free install discovery: asks the places that already know where the
+game is (Steam library manifests, the uninstall entries in the registry, the
+Pearl Abyss launcher's files) instead of walking drives. Runs in a few
+milliseconds and is the first stage of bdo_vulkan_core.scan_all_installs().
+
+The registry is read through a RegistryReader: winreg on Windows, or .reg
+files (a regedit export, or a Wine/Proton prefix's system.reg/user.reg) set
+with `registry_files` in the [discovery] config section, which is also how
+fixtures are fed in on Linux.
+"""
+import abc
+import os
+import re
+from pathlib import Path
+
+from bdo_vulkan_core import GAME_EXE, load_config, log
+
+BDO_STEAM_APPIDS = ("582660",)   # Black Desert on Steam
+DISPLAY_NAME_HINTS = ("black desert",)
+UNINSTALL_KEYS = (
+    ("HKLM", r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ("HKLM", r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ("HKCU", r"Software\Microsoft\Windows\CurrentVersion\Uninstall"),
+)
+STEAM_KEYS = (
+    ("HKCU", r"Software\Valve\Steam", "SteamPath"),
+    ("HKLM", r"SOFTWARE\WOW6432Node\Valve\Steam", "InstallPath"),
+    ("HKLM", r"SOFTWARE\Valve\Steam", "InstallPath"),
+)
+# Where the Pearl Abyss launcher keeps its settings; the small text files near
+# the top of these folders are searched for folder paths. The walk is bounded so
+# a launcher folder full of caches or logs cannot eat the discovery budget.
+LAUNCHER_DIRS = ("%LOCALAPPDATA%/PearlAbyss", "%LOCALAPPDATA%/Pearl Abyss",
+                 "%APPDATA%/PearlAbyss", "%PROGRAMDATA%/PearlAbyss")
+LAUNCHER_FILE_SUFFIXES = (".ini", ".cfg", ".json", ".xml", ".txt", ".conf")
+LAUNCHER_MAX_FILE = 1 << 20
+LAUNCHER_MAX_DEPTH = 2       # the folder itself and one level of subfolders
+LAUNCHER_MAX_SUBDIRS = 32    # subfolders looked into per level
+LAUNCHER_MAX_ENTRIES = 256   # entries looked at per folder
+LAUNCHER_MAX_FILES = 64      # settings files read per launcher folder
+# Folders the exe may sit in, relative to the folder a manifest points at.
+EXE_SUBDIRS = ("", "bin64")
+
+# ==========================
+# Valve KeyValues (VDF / ACF)
+# ==========================
+_VDF_TOKEN = re.compile(r'"((?:\\.|[^"\\])*)"|([{}])|//[^\n]*|([^\s"{}]+)')
+
+
+def _vdf_unescape(s: str) -> str:
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t"}.get(m.group(1), m.group(1)), s)
+
+
+def parse_vdf(text: str) -> dict:
+    """libraryfolders.vdf / appmanifest_*.acf text -> nested dicts with lower-case keys."""
+    root: dict = {}
+    stack = [root]
+    key = None
+    for m in _VDF_TOKEN.finditer(text):
+        quoted, brace, bare = m.groups()
+        if brace == "{":
+            if key is None:
+                raise ValueError("block without a key")
+            child: dict = {}
+            stack[-1][key] = child
+            stack.append(child)
+            key = None
+        elif brace == "}":
+            if len(stack) == 1:
+                raise ValueError("unbalanced '}'")
+            stack.pop()
+            key = None
+        elif quoted is not None or bare is not None:
+            if bare is not None and bare.startswith("["):
+                continue   # platform conditional such as [$WIN32]
+            tok = _vdf_unescape(quoted) if quoted is not None else bare
+            if key is None:
+                key = tok.lower()
+            else:
+                stack[-1][key] = tok
+                key = None
+    return root
+
+
+def _read_vdf(path: Path) -> dict | None:
+    try:
+        return parse_vdf(path.read_text(encoding="utf-8", errors="replace"))
+    except (OSError, ValueError) as e:
+        log.debug(f"[DISCOVER] Could not read {path}: {e}")
+        return None
+
+
+# ==========================
+# Registry readers
+# ==========================
+_HIVES = {"hkey_local_machine": "hklm", "hkey_current_user": "hkcu", "hklm": "hklm", "hkcu": "hkcu"}
+
+
+def _norm_key(hive: str, path: str) -> str:
+    return _HIVES.get(hive.lower(), hive.lower()) + "\\" + path.strip("\\").lower()
+
+
+class RegistryReader(abc.ABC):
+    """Read-only registry view used by discovery. Value names are case-insensitive."""
+    name = "base"
+
+    @abc.abstractmethod
+    def subkeys(self, hive: str, path: str) -> list[str]:
+        ...
+
+    @abc.abstractmethod
+    def values(self, hive: str, path: str) -> dict[str, str]:
+        """String values of a key as {lower-case name: value}; {} if the key is missing."""
+
+    def translate_path(self, path: str) -> str:
+        """Map a path stored in this registry onto the local filesystem."""
+        return path
+
+
+class WinRegistryReader(RegistryReader):
+    name = "winreg"
+
+    def __init__(self):
+        import winreg
+        self._winreg = winreg
+        self._hives = {"hklm": winreg.HKEY_LOCAL_MACHINE, "hkcu": winreg.HKEY_CURRENT_USER}
+
+    def _open(self, hive: str, path: str):
+        return self._winreg.OpenKey(self._hives[_HIVES[hive.lower()]], path)
+
+    def subkeys(self, hive: str, path: str) -> list[str]:
+        try:
+            with self._open(hive, path) as k:
+                count = self._winreg.QueryInfoKey(k)[0]
+                return [self._winreg.EnumKey(k, i) for i in range(count)]
+        except OSError:
+            return []
+
+    def values(self, hive: str, path: str) -> dict[str, str]:
+        wr = self._winreg
+        out = {}
+        try:
+            with self._open(hive, path) as k:
+                for i in range(wr.QueryInfoKey(k)[1]):
+                    name, data, kind = wr.EnumValue(k, i)
+                    if kind == wr.REG_SZ:
+                        out[name.lower()] = data
+                    elif kind == wr.REG_EXPAND_SZ:
+                        out[name.lower()] = os.path.expandvars(data)
+        except OSError:
+            pass
+        return out
+
+
+class RegFileReader(RegistryReader):
+    """
+    .reg files as the registry: regedit exports ("Windows Registry Editor
+    Version 5.00" / REGEDIT4) with full key names, or Wine's system.reg
+    (HKLM) / user.reg (HKCU) with keys relative to the hive. For a Wine
+    prefix, drive letters are mapped onto <prefix>/dosdevices.
+    """
+    name = "regfile"
+    _SECTION = re.compile(r"^\[(.+?)\](?:\s+\d+)?\s*$")
+    _VALUE = re.compile(r'^(?:"((?:\\.|[^"\\])*)"|@)=(?:str\(2\):)?"((?:\\.|[^"\\])*)"\s*$')
+
+    def __init__(self, *files):
+        self._keys: dict[str, dict[str, str]] = {}
+        self._prefix: Path | None = None
+        for f in files:
+            self._load(Path(f))
+
+    def _load(self, path: Path):
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            log.debug(f"[DISCOVER] Could not read registry file {path}: {e}")
+            return
+        # regedit writes UTF-16 with a BOM, Wine and REGEDIT4 write 8-bit text.
+        text = data.decode("utf-16" if data[:2] == b"\xff\xfe" else "utf-8-sig", errors="replace")
+        wine = text.startswith("WINE REGISTRY")
+        if wine:
+            self._prefix = self._prefix or path.parent
+        hive = "hkcu" if path.name.lower() == "user.reg" else "hklm"
+        current = None
+        for line in text.splitlines():
+            line = line.strip()
+            m = self._SECTION.match(line)
+            if m:
+                name = m.group(1)
+                if wine:
+                    name = hive + "\\" + name.replace("\\\\", "\\")
+                head, _, rest = name.partition("\\")
+                current = self._keys.setdefault(_norm_key(head, rest), {})
+                continue
+            m = self._VALUE.match(line)
+            if m and current is not None:
+                current[(m.group(1) or "").replace('\\"', '"').replace("\\\\", "\\").lower()] = \
+                    m.group(2).replace('\\"', '"').replace("\\\\", "\\")
+
+    def subkeys(self, hive: str, path: str) -> list[str]:
+        parent = _norm_key(hive, path) + "\\"
+        names = {k[len(parent):].split("\\", 1)[0] for k in self._keys if k.startswith(parent)}
+        return sorted(names)
+
+    def values(self, hive: str, path: str) -> dict[str, str]:
+        return dict(self._keys.get(_norm_key(hive, path), {}))
+
+    def translate_path(self, path: str) -> str:
+        if self._prefix is None or not re.match(r"^[A-Za-z]:\\", path):
+            return path
+        drive = self._prefix / "dosdevices" / path[:2].lower()
+        return str(drive.joinpath(*[p for p in path[3:].split("\\") if p]))
+
+
+_REGISTRY_READER: RegistryReader | None = None
+_REGISTRY_READER_SET = False
+
+
+def get_registry_reader(cfg=None) -> RegistryReader | None:
+    """winreg on Windows; elsewhere the [discovery] registry_files, or None."""
+    global _REGISTRY_READER, _REGISTRY_READER_SET
+    if not _REGISTRY_READER_SET:
+        files = _config_paths(cfg, "registry_files")
+        if files:
+            _REGISTRY_READER = RegFileReader(*files)
+        elif os.name == "nt":
+            try:
+                _REGISTRY_READER = WinRegistryReader()
+            except Exception as e:
+                log.debug(f"[DISCOVER] Registry unavailable: {e}")
+        _REGISTRY_READER_SET = True
+    return _REGISTRY_READER
+
+
+def set_registry_reader(reader: RegistryReader | None):
+    global _REGISTRY_READER, _REGISTRY_READER_SET
+    _REGISTRY_READER, _REGISTRY_READER_SET = reader, reader is not None
+
+# ==========================
+# Discovery sources
+# ==========================
+
+
+def _config_paths(cfg, key: str) -> list[str]:
+    cfg = cfg if cfg is not None else load_config()
+    raw = cfg.get("discovery", key, fallback="")
+    return [os.path.expandvars(os.path.expanduser(p.strip()))
+            for p in raw.replace("\n", ",").split(",") if p.strip()]
+
+
+def resolve_install_dir(folder: str) -> str | None:
+    """The folder (or its bin64) that holds GAME_EXE, if any."""
+    folder = folder.strip()
+    if folder.startswith('"'):
+        folder = folder[1:].split('"', 1)[0]       # "C:\...\x.exe",0 or "...\unins000.exe" /S
+    elif re.search(r"\.exe\s*,\s*-?\d+$", folder, re.I):
+        folder = folder.rsplit(",", 1)[0].strip()  # C:\...\x.exe,0 (DisplayIcon)
+    if folder.lower().endswith(".exe"):
+        folder = os.path.dirname(folder)
+    if not folder:
+        return None
+    for sub in EXE_SUBDIRS:
+        cand = os.path.join(folder, sub) if sub else folder
+        try:
+            if os.path.isfile(os.path.join(cand, GAME_EXE)):
+                return os.path.normpath(cand)
+        except OSError:
+            continue
+    return None
+
+
+def steam_roots(reader: RegistryReader | None, cfg=None) -> list[Path]:
+    candidates = _config_paths(cfg, "steam_roots")
+    if reader:
+        for hive, key, value in STEAM_KEYS:
+            v = reader.values(hive, key).get(value.lower())
+            if v:
+                candidates.append(reader.translate_path(v.replace("/", "\\")))
+    if os.name == "nt":
+        for env in ("ProgramFiles(x86)", "ProgramFiles"):
+            if os.environ.get(env):
+                candidates.append(os.path.join(os.environ[env], "Steam"))
+    else:
+        home = Path.home()
+        candidates += [str(home / ".steam" / "steam"), str(home / ".local" / "share" / "Steam"),
+                       str(home / ".var" / "app" / "com.valvesoftware.Steam" / ".local" / "share" / "Steam")]
+    roots, seen = [], set()
+    for c in candidates:
+        p = Path(c)
+        try:
+            key = p.resolve()
+        except OSError:
+            continue
+        if key not in seen and (p / "steamapps").is_dir():
+            seen.add(key)
+            roots.append(p)
+    return roots
+
+
+def steam_libraries(root: Path) -> list[Path]:
+    """The Steam root plus every library listed in its libraryfolders.vdf (old and new format)."""
+    libs = [root]
+    for vdf in (root / "steamapps" / "libraryfolders.vdf", root / "config" / "libraryfolders.vdf"):
+        data = _read_vdf(vdf) if vdf.exists() else None
+        if not data:
+            continue
+        folders = data.get("libraryfolders") or {}
+        for k, v in folders.items():
+            path = v.get("path") if isinstance(v, dict) else (v if k.isdigit() else None)
+            if path:
+                libs.append(Path(path))
+        break
+    return libs
+
+
+def discover_steam(reader: RegistryReader | None = None, cfg=None) -> list[str]:
+    found = []
+    for root in steam_roots(reader, cfg):
+        for lib in steam_libraries(root):
+            for appid in BDO_STEAM_APPIDS:
+                acf = lib / "steamapps" / f"appmanifest_{appid}.acf"
+                if not acf.exists():
+                    continue
+                state = (_read_vdf(acf) or {}).get("appstate") or {}
+                installdir = state.get("installdir")
+                if installdir:
+                    found.append(str(lib / "steamapps" / "common" / installdir))
+    return found
+
+
+def discover_registry(reader: RegistryReader | None) -> list[str]:
+    """InstallLocation (or the DisplayIcon's folder) of every Black Desert uninstall entry."""
+    if reader is None:
+        return []
+    found = []
+    for hive, key in UNINSTALL_KEYS:
+        for sub in reader.subkeys(hive, key):
+            vals = reader.values(hive, f"{key}\\{sub}")
+            if not any(h in vals.get("displayname", "").lower() for h in DISPLAY_NAME_HINTS):
+                continue
+            for name in ("installlocation", "displayicon", "uninstallstring"):
+                if vals.get(name):
+                    found.append(reader.translate_path(vals[name]))
+    return found
+
+
+_WIN_PATH = re.compile(r'[A-Za-z]:[\\/](?:[^"\'<>|*?\r\n\t,;=]+)')
+
+
+def _launcher_files(folder: str) -> list[Path]:
+    """Settings-like files in folder and its subfolders, within the LAUNCHER_MAX_* bounds."""
+    files, level = [], [folder]
+    for _ in range(LAUNCHER_MAX_DEPTH):
+        below = []
+        for d in level:
+            try:
+                with os.scandir(d) as it:
+                    for n, e in enumerate(it):
+                        if n >= LAUNCHER_MAX_ENTRIES:
+                            break   # a cache or log folder, not settings
+                        if e.is_dir(follow_symlinks=False):
+                            below.append(e.path)
+                        elif os.path.splitext(e.name)[1].lower() in LAUNCHER_FILE_SUFFIXES:
+                            files.append(Path(e.path))
+            except OSError:
+                continue
+        level = below[:LAUNCHER_MAX_SUBDIRS]
+    return files[:LAUNCHER_MAX_FILES]
+
+
+def discover_launcher(cfg=None) -> list[str]:
+    """Folder paths mentioned in the Pearl Abyss launcher's settings files."""
+    found = []
+    targets = [os.path.expandvars(d) for d in LAUNCHER_DIRS] + _config_paths(cfg, "launcher_configs")
+    for target in targets:
+        if "%" in target:
+            continue   # variable not set on this system
+        p = Path(target)
+        files = [p] if p.is_file() else _launcher_files(target) if p.is_dir() else []
+        for f in files:
+            try:
+                if f.stat().st_size > LAUNCHER_MAX_FILE:
+                    continue
+                text = f.read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            found += [m.group(0).strip().replace("\\\\", "\\") for m in _WIN_PATH.finditer(text)]
+    return found
+
+
+def discover_installs(cfg=None) -> list[tuple[str, str]]:
+    """
+    [(install_dir, origin)] from every discovery source, de-duplicated, in
+    source order (steam, registry, launcher). Only folders that actually hold
+    GAME_EXE (directly or in bin64) are returned.
+    """
+    cfg = cfg if cfg is not None else load_config()
+    if not cfg.getboolean("discovery", "enabled", fallback=True):
+        return []
+    reader = get_registry_reader(cfg)
+    sources = (("steam", lambda: discover_steam(reader, cfg)),
+               ("registry", lambda: discover_registry(reader)),
+               ("launcher", lambda: discover_launcher(cfg)))
+    installs, seen = [], set()
+    for origin, source in sources:
+        try:
+            candidates = source()
+        except Exception as e:
+            log.debug(f"[DISCOVER] {origin} discovery failed: {e}")
+            continue
+        for cand in candidates:
+            path = resolve_install_dir(cand)
+            if path and os.path.normcase(path) not in seen:
+                seen.add(os.path.normcase(path))
+                installs.append((path, origin))
+                log.debug(f"[DISCOVER] {origin}: {path}")
+    return installs
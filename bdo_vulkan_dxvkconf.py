@@ -0,0 +1,221 @@
+# bdo_vulkan_dxvkconf.py
+"""
+dxvk.conf preset engine. The dxvk.conf a preset deploys is rendered per
+install from layers, later layers winning:
+
+  1. the preset's own dxvk.conf (assets/<Mode>/dxvk.conf)
+  2. the profiles listed in `[dxvk] profiles` of the app config, in order:
+     built-in ones (BUILTIN_PROFILES) or <name>.conf files in dxvk_profiles/
+     next to the app, which win over a built-in of the same name
+  3. dxvk.local.conf in the install folder (per-install overrides)
+
+Layers 2 and 3 are dxvk.conf fragments (`key = value` lines, optionally under
+`[app.exe]` sections). Merging keeps the preset's comments and ordering: an
+option that is already set is changed in place, one that is only documented
+(`# key = default`) is set right below its documentation, anything else is
+appended to its section.
+"""
+import difflib
+import hashlib
+import os
+import re
+from pathlib import Path
+
+import bdo_vulkan_core
+from bdo_vulkan_core import APP_DIR, MemorySource, SourceFile, load_config, log
+
+DXVK_CONF = "dxvk.conf"
+LOCAL_CONF = "dxvk.local.conf"
+PROFILE_DIR = APP_DIR / "dxvk_profiles"
+
+BUILTIN_PROFILES = {
+    "low-latency": "dxgi.maxFrameLatency = 1\nd3d9.maxFrameLatency = 1\n",
+    "fps-60": "dxgi.maxFrameRate = 60\nd3d9.maxFrameRate = 60\n",
+    "fps-144": "dxgi.maxFrameRate = 144\nd3d9.maxFrameRate = 144\n",
+    "gpl": "dxvk.enableGraphicsPipelineLibrary = True\n",
+    "no-gpl": "dxvk.enableGraphicsPipelineLibrary = False\n",
+    "hud": "dxvk.hud = fps,frametimes,gpuload,compiler\n",
+    "low-vram": "dxgi.maxDeviceMemory = 4096\ndxgi.maxSharedMemory = 2048\n",
+}
+
+_SECTION = re.compile(r"^\s*\[([^\]]+)\]\s*$")
+_OPTION = re.compile(r"^(\s*)([A-Za-z0-9_.]+)(\s*=\s*)(.*?)\s*$")
+_DOCUMENTED = re.compile(r"^\s*#\s*([A-Za-z0-9_.]+)\s*=")
+
+
+class DxvkConf:
+    """A dxvk.conf as its lines; options are edited in place so everything else survives."""
+
+    def __init__(self, lines: list[str], newline: str = "\n"):
+        self.lines = lines
+        self.newline = newline
+
+    @classmethod
+    def parse(cls, text: str) -> "DxvkConf":
+        return cls(text.splitlines(), "\r\n" if "\r\n" in text else "\n")
+
+    def render(self) -> str:
+        return self.newline.join(self.lines) + self.newline
+
+    def _sections(self) -> list[tuple[str | None, int, int]]:
+        """(section, first line, end line) for the global part and each [section]."""
+        out, name, start = [], None, 0
+        for i, line in enumerate(self.lines):
+            m = _SECTION.match(line)
+            if m:
+                out.append((name, start, i))
+                name, start = m.group(1).strip(), i + 1
+        out.append((name, start, len(self.lines)))
+        return out
+
+    def items(self) -> list[tuple[str | None, str, str]]:
+        """(section, key, value) of every option that is set, in file order."""
+        out = []
+        for section, start, end in self._sections():
+            for line in self.lines[start:end]:
+                m = _OPTION.match(line)
+                if m:
+                    out.append((section, m.group(2), m.group(4)))
+        return out
+
+    def get(self, key: str, section: str | None = None) -> str | None:
+        value = None
+        for sec, k, v in self.items():
+            if sec == section and k == key:
+                value = v   # DXVK uses the last one
+        return value
+
+    def set(self, key: str, value: str, section: str | None = None):
+        ranges = [(s, a, b) for s, a, b in self._sections() if s == section]
+        if not ranges:
+            if self.lines and self.lines[-1].strip():
+                self.lines.append("")
+            self.lines += [f"[{section}]", f"{key} = {value}"]
+            return
+        active = documented = None
+        for _, start, end in ranges:
+            for i in range(start, end):
+                m = _OPTION.match(self.lines[i])
+                if m and m.group(2) == key:
+                    active = (i, m)
+                elif documented is None and (d := _DOCUMENTED.match(self.lines[i])) and d.group(1) == key:
+                    documented = i
+        if active:
+            i, m = active
+            self.lines[i] = f"{m.group(1)}{key}{m.group(3)}{value}"
+        elif documented is not None:
+            self.lines.insert(documented + 1, f"{key} = {value}")
+        else:
+            end = ranges[-1][2]
+            while end > ranges[-1][1] and not self.lines[end - 1].strip():
+                end -= 1
+            self.lines.insert(end, f"{key} = {value}")
+
+    def merge(self, other: "DxvkConf"):
+        for section, key, value in other.items():
+            self.set(key, value, section)
+
+
+# ==========================
+# Layers
+# ==========================
+
+def profile_names(cfg=None) -> list[str]:
+    cfg = cfg if cfg is not None else load_config()
+    raw = cfg.get("dxvk", "profiles", fallback="")
+    return [p.strip() for p in raw.replace("\n", ",").split(",") if p.strip()]
+
+
+def available_profiles() -> dict[str, str]:
+    """{name: where it comes from} for the built-in and user profiles."""
+    out = {name: "built-in" for name in BUILTIN_PROFILES}
+    if PROFILE_DIR.is_dir():
+        for f in sorted(PROFILE_DIR.glob("*.conf")):
+            out[f.stem] = str(f)
+    return out
+
+
+def load_profile(name: str) -> tuple[str, int]:
+    """(text, mtime_ns) of a profile; mtime 0 for built-ins. Raises KeyError if unknown."""
+    path = PROFILE_DIR / f"{name}.conf"
+    try:
+        return path.read_text(encoding="utf-8"), path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return BUILTIN_PROFILES[name], 0
+
+
+def layers(install: str | None, cfg=None) -> list[tuple[str, str, int]]:
+    """(label, text, mtime_ns) of the layers above the preset, lowest first."""
+    out = []
+    names = profile_names(cfg)
+    for name in names:
+        try:
+            text, mtime_ns = load_profile(name)
+        except KeyError:
+            log.warning(f"[DXVKCONF] Unknown profile '{name}' in [dxvk] profiles")
+            continue
+        except OSError as e:
+            log.warning(f"[DXVKCONF] Cannot read profile '{name}': {e}")
+            continue
+        out.append((f"profile {name}", text, mtime_ns))
+    if names:
+        try:
+            cfg_mtime = os.stat(bdo_vulkan_core.CONFIG_FILE).st_mtime_ns
+        except OSError:
+            cfg_mtime = 0
+        out = [(label, text, max(mtime_ns, cfg_mtime)) for label, text, mtime_ns in out]
+    if install:
+        local = Path(install) / LOCAL_CONF
+        try:
+            out.append((str(local), local.read_text(encoding="utf-8"), local.stat().st_mtime_ns))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning(f"[DXVKCONF] Cannot read {local}: {e}")
+    return out
+
+
+def render_for_install(source, sf: SourceFile, install: str, cfg=None):
+    """
+    (source, file) to deploy in place of the preset's dxvk.conf `sf` for this
+    install, or None when no layer applies and the preset file goes out as is.
+    The rendered file's mtime is the newest of its inputs, so the delta check
+    notices a changed layer.
+    """
+    extra = layers(install, cfg)
+    if not extra:
+        return None
+    with source.open(sf) as f:
+        conf = DxvkConf.parse(f.read().decode("utf-8", errors="replace"))
+    for _, text, _ in extra:
+        conf.merge(DxvkConf.parse(text))
+    data = conf.render().encode("utf-8")
+    mtime_ns = max([sf.mtime_ns] + [m for _, _, m in extra])
+    rendered = SourceFile(sf.rel, len(data), mtime_ns, hashlib.sha256(data).hexdigest())
+    return MemorySource({sf.rel: data}, name=f"{DXVK_CONF} for {install}", mtime_ns=mtime_ns), rendered
+
+
+def is_dxvk_conf(sf: SourceFile) -> bool:
+    return Path(sf.rel).name.lower() == DXVK_CONF
+
+
+def diff_install(source, files: list[SourceFile], install: str, cfg=None) -> str:
+    """Unified diff of the install's dxvk.conf against what a deploy would write ('' if equal)."""
+    sf = next((f for f in files if is_dxvk_conf(f)), None)
+    if sf is None:
+        return ""
+    rendered = render_for_install(source, sf, install, cfg)
+    if rendered:
+        src, new_sf = rendered
+    else:
+        src, new_sf = source, sf
+    with src.open(new_sf) as f:
+        want = f.read().decode("utf-8", errors="replace")
+    target = Path(install) / sf.rel
+    try:
+        have = target.read_text(encoding="utf-8", errors="replace")
+    except FileNotFoundError:
+        have = ""
+    return "".join(difflib.unified_diff(
+        have.splitlines(keepends=True), want.splitlines(keepends=True),
+        fromfile=f"{target} (installed)", tofile=f"{target} (deploy)"))
@@ -0,0 +1,516 @@
+# bdo_vulkan_fleet.py
+"""
+Fleet mode: deploy to (or remove from) many installs listed in an inventory
+file, a few at a time, with retries, timeouts and resume.
+
+The inventory is an ini file. [fleet] holds the defaults, and every other
+section is one target:
+
+    [fleet]
+    concurrency = 8
+    preset = Normal
+    # Attempts after the first, the wait before the first retry (doubled on
+    # each further one) and the time one attempt may take, in seconds.
+    retries = 2
+    backoff = 5
+    timeout = 300
+
+    [lab-01]
+    path = \\\\lab-01\\Games\\BlackDesert
+
+    [lab-02]
+    path = Z:\\BlackDesert
+    preset = Potato
+    # dxvk.conf profiles and option lines for this install only; they are
+    # written to its dxvk.local.conf and layered over the preset's dxvk.conf.
+    # A dxvk.local.conf the inventory did not write is never replaced.
+    profiles = low-latency
+    overrides =
+        dxgi.maxFrameRate = 60
+
+    [old-share]
+    path = \\\\nas\\bdo
+    action = remove
+
+A target may also set `source` (a preset folder) and its own retries /
+backoff / timeout. Relative paths are taken from the inventory's folder.
+Each finished target is recorded in <inventory>.state.json. A rollout that was interrupted (or that had failures)
+picks up where it stopped when it is run again, skipping the targets that
+were done with the same options. <inventory>.report.json gets the outcome of
+every target.
+
+The installs are on other machines, so a running game cannot be detected
+there. The preflight's locked-file check stands in for it: a running game
+holds dxgi.dll. State caches are not shared across the fleet.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from bdo_vulkan_core import (
+    PRESETS, DeployProgress, add_cached_installs, copy_replace, deploy_manifest, log,
+    preflight, record_deploy, remove_matching, resolve_source, trace_count, trace_span,
+)
+
+FLEET_CONCURRENCY = 8
+FLEET_RETRIES = 2
+FLEET_BACKOFF = 5.0              # seconds before the first retry; doubled for each further one
+FLEET_TIMEOUT = 300.0            # seconds one attempt may take
+FLEET_CANCEL_GRACE = 30.0        # seconds a cancelled copy gets to roll back
+FLEET_ACTIONS = ("deploy", "remove")
+LOCAL_CONF = "dxvk.local.conf"
+MANAGED_HEADER = "# Managed by the fleet inventory"
+STATE_VERSION = 1
+
+
+class FleetError(ValueError):
+    pass
+
+
+@dataclass
+class FleetTarget:
+    name: str
+    path: str
+    action: str = "deploy"
+    preset: str = "Normal"
+    source: str | None = None
+    profiles: list[str] = field(default_factory=list)
+    overrides: str = ""
+    retries: int = FLEET_RETRIES
+    backoff: float = FLEET_BACKOFF
+    timeout: float = FLEET_TIMEOUT
+
+    def fingerprint(self) -> str:
+        """Changes whenever the target's options do, so resume redoes it."""
+        opts = {k: v for k, v in asdict(self).items() if k not in ("retries", "backoff", "timeout")}
+        return hashlib.sha256(json.dumps(opts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class Inventory:
+    path: Path
+    concurrency: int = FLEET_CONCURRENCY
+    targets: list[FleetTarget] = field(default_factory=list)
+
+
+def load_inventory(path) -> Inventory:
+    """Parse and check an inventory file (raises FleetError)."""
+    import configparser
+    path = Path(path)
+    cp = configparser.ConfigParser(interpolation=None)
+    try:
+        with open(path, encoding="utf-8") as f:
+            cp.read_file(f)
+    except (OSError, configparser.Error) as e:
+        raise FleetError(f"{path}: {e}") from None
+
+    def opt(section, key, fallback, conv=str):
+        raw = cp.get(section, key, fallback=None)
+        if raw is None:
+            raw = cp.get("fleet", key, fallback=None)
+        if raw is None:
+            return fallback
+        try:
+            return conv(raw.strip())
+        except ValueError:
+            raise FleetError(f"{path}: [{section}] {key}: bad value {raw!r}") from None
+
+    inv = Inventory(path, concurrency=max(1, opt("fleet", "concurrency", FLEET_CONCURRENCY, int)))
+    seen = {}
+    for name in cp.sections():
+        if name == "fleet":
+            continue
+        target_path = cp.get(name, "path", fallback="").strip()
+        if not target_path:
+            raise FleetError(f"{path}: [{name}] has no path")
+        if not os.path.isabs(target_path):
+            target_path = os.path.abspath(path.parent / target_path)
+        key = os.path.normcase(os.path.normpath(target_path))
+        if key in seen:
+            raise FleetError(f"{path}: [{name}] and [{seen[key]}] have the same path")
+        seen[key] = name
+        source = opt(name, "source", None)
+        t = FleetTarget(
+            name, target_path,
+            action=opt(name, "action", "deploy").lower(),
+            preset=opt(name, "preset", "Normal"),
+            source=str(path.parent / source) if source else None,
+            profiles=[p.strip() for p in opt(name, "profiles", "").replace("\n", ",").split(",") if p.strip()],
+            overrides="\n".join(line.strip() for line in opt(name, "overrides", "").splitlines() if line.strip()),
+            retries=max(0, opt(name, "retries", FLEET_RETRIES, int)),
+            backoff=max(0.0, opt(name, "backoff", FLEET_BACKOFF, float)),
+            timeout=max(1.0, opt(name, "timeout", FLEET_TIMEOUT, float)),
+        )
+        if t.action not in FLEET_ACTIONS:
+            raise FleetError(f"{path}: [{name}] action must be one of {', '.join(FLEET_ACTIONS)}")
+        if t.preset not in PRESETS and not t.source:
+            raise FleetError(f"{path}: [{name}] unknown preset {t.preset!r} (set source for a custom one)")
+        inv.targets.append(t)
+    if not inv.targets:
+        raise FleetError(f"{path}: no targets")
+    return inv
+
+
+# ==========================
+# Resume state and report
+# ==========================
+
+def state_path(inventory: Path) -> Path:
+    return inventory.with_name(inventory.name + ".state.json")
+
+
+def report_path(inventory: Path) -> Path:
+    return inventory.with_name(inventory.name + ".report.json")
+
+
+def load_state(inventory: Path) -> dict:
+    """{target name: {"fingerprint", "status", ...}} of the last rollout; {} if none."""
+    try:
+        data = json.loads(state_path(inventory).read_text(encoding="utf-8"))
+        if data.get("version") != STATE_VERSION:
+            raise ValueError("other version")
+        return data["targets"]
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        log.debug(f"[FLEET] Ignoring state file: {e}")
+        return {}
+
+
+def _write_json(path: Path, data: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+@dataclass
+class TargetOutcome:
+    name: str
+    path: str
+    action: str
+    preset: str
+    status: str = "pending"    # ok | failed | timed_out | cancelled | done_before
+    attempts: int = 0
+    seconds: float = 0.0
+    copied: int = 0
+    skipped: int = 0           # files already up to date
+    removed: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class FleetReport:
+    inventory: str
+    started: float
+    finished: float = 0.0
+    interrupted: bool = False
+    outcomes: list[TargetOutcome] = field(default_factory=list)
+
+    def counts(self) -> dict[str, int]:
+        out = {}
+        for o in self.outcomes:
+            out[o.status] = out.get(o.status, 0) + 1
+        return out
+
+    @property
+    def ok(self) -> bool:
+        return not self.interrupted and all(o.status in ("ok", "done_before") for o in self.outcomes)
+
+    def to_dict(self) -> dict:
+        return {"inventory": self.inventory, "started": self.started, "finished": self.finished,
+                "interrupted": self.interrupted, "counts": self.counts(),
+                "targets": [o.to_dict() for o in self.outcomes]}
+
+
+# ==========================
+# Rollout
+# ==========================
+
+def _managed_local_conf(inv: Inventory, t: FleetTarget) -> str:
+    from bdo_vulkan_dxvkconf import load_profile
+    parts = [f"{MANAGED_HEADER} {inv.path.name} [{t.name}]; edit it there."]
+    for name in t.profiles:
+        try:
+            parts.append(load_profile(name)[0].strip())
+        except KeyError:
+            raise FleetError(f"[{t.name}] unknown profile {name!r}") from None
+    if t.overrides:
+        parts.append(t.overrides)
+    return "\n".join(parts) + "\n"
+
+
+def _stage_local_conf(inv: Inventory, t: FleetTarget):
+    """
+    Bring the install's dxvk.local.conf in line with the inventory before the
+    copy or removal (a copy renders dxvk.conf from it): written for a deploy
+    with profiles or overrides, else dropped if the inventory wrote it.
+    Returns a callable that puts back what was there, for when the action
+    does not go through. A dxvk.local.conf the inventory did not write is
+    never replaced (FleetError).
+    """
+    local = Path(t.path) / LOCAL_CONF
+    try:
+        have = local.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        have = None
+    managed = have is not None and have.startswith(MANAGED_HEADER)
+    want = _managed_local_conf(inv, t) if t.action == "deploy" and (t.profiles or t.overrides) else None
+    if want == have or (want is None and not managed):
+        return lambda: None
+    if want is not None and have is not None and not managed:
+        raise FleetError(f"[{t.name}] {local} has settings of its own; move them into the inventory's "
+                         "overrides and delete the file")
+    if want is None:
+        local.unlink()
+    else:
+        local.write_text(want, encoding="utf-8")
+
+    def undo():
+        if have is None:
+            local.unlink(missing_ok=True)
+        else:
+            local.write_text(have, encoding="utf-8")
+    return undo
+
+
+class Fleet:
+    """
+    One rollout of an inventory. on_event(kind, target name, detail) is called
+    from the worker threads with kind "start", "retry", "ok", "failed",
+    "timed_out", "cancelled" or "done_before".
+    """
+
+    def __init__(self, inventory: Inventory, concurrency: int | None = None, resume: bool = True,
+                 only=None, on_event=None):
+        self.inv = inventory
+        self.concurrency = max(1, concurrency or inventory.concurrency)
+        self.resume = resume
+        self.only = set(only) if only else None
+        self.on_event = on_event or (lambda kind, name, detail: None)
+        self.stop_event = threading.Event()
+        self._state = load_state(inventory.path)
+        self._state_lock = threading.Lock()
+        self._sources: dict[tuple, object] = {}
+
+    def stop(self):
+        """Start no more targets and cancel the copies in progress (they roll back)."""
+        self.stop_event.set()
+
+    def targets(self) -> list[FleetTarget]:
+        return [t for t in self.inv.targets if self.only is None or t.name in self.only]
+
+    def done_before(self, t: FleetTarget) -> bool:
+        """Whether resuming skips t: it was done last time, with the same options."""
+        st = self._state.get(t.name)
+        return self.resume and bool(st) and st.get("status") == "ok" and st.get("fingerprint") == t.fingerprint()
+
+    def _source(self, t: FleetTarget):
+        key = (t.preset, t.source)
+        if key not in self._sources:
+            source = resolve_source(t.preset, t.source)
+            if source is not None:
+                deploy_manifest(source)
+            self._sources[key] = source
+        return self._sources[key]
+
+    def _save_state(self):
+        try:
+            _write_json(state_path(self.inv.path), {"version": STATE_VERSION, "targets": self._state})
+        except OSError as e:
+            log.warning(f"[FLEET] Cannot write the state file: {e}")
+
+    def _record(self, t: FleetTarget, outcome: TargetOutcome):
+        with self._state_lock:
+            self._state[t.name] = {"fingerprint": t.fingerprint(), "status": outcome.status,
+                                   "attempts": outcome.attempts, "finished_at": time.time(),
+                                   "error": outcome.errors[-1] if outcome.errors else None}
+            self._save_state()
+
+    def _attempt(self, t: FleetTarget, source, outcome: TargetOutcome) -> tuple[str, bool]:
+        """(status, retry?) of one attempt."""
+        removing = t.action == "remove"
+        check = preflight([t.path], source, removing=removing, refresh=True)[0]
+        if not check.ok:
+            outcome.errors.append("; ".join(check.problems()))
+            # A folder without the game will not grow one by retrying.
+            return "failed", not (check.exe_ok is False and not check.timed_out)
+        try:
+            undo = _stage_local_conf(self.inv, t)
+        except FleetError as e:
+            outcome.errors.append(str(e))
+            return "failed", False
+        status, retry, settle = self._execute(t, source, outcome)
+        if status == "ok":
+            return status, retry
+
+        def restore():
+            try:
+                undo()
+            except OSError as e:
+                log.warning(f"[FLEET] {t.name}: cannot restore {LOCAL_CONF}: {e}")
+
+        if settle is None:
+            # The copy rolled back (or the removal stopped); so does dxvk.local.conf.
+            restore()
+        else:
+            # The worker can still commit a dxvk.conf rendered from the new
+            # dxvk.local.conf: only put the old one back once it has rolled back.
+            threading.Thread(target=lambda: settle() or restore(),
+                             name=f"bdo-fleet-settle-{t.name}", daemon=True).start()
+        return status, retry
+
+    def _execute(self, t: FleetTarget, source, outcome: TargetOutcome) -> tuple[str, bool, object]:
+        """
+        Run the copy or removal on a worker of its own, so a share that stops
+        answering costs the timeout rather than a fleet slot for good. A copy
+        is cancelled and rolls back; a removal cannot be stopped half-way and
+        is left to finish. Returns (status, retry?, settle): settle is None
+        once the worker is done, else a callable that waits for it and says
+        whether the action went through after all.
+        """
+        removing = t.action == "remove"
+        progress = DeployProgress()
+        box = {}
+
+        def work():
+            try:
+                if removing:
+                    box["removed"] = remove_matching(source, [t.path])
+                else:
+                    box["result"] = copy_replace(source, [t.path], progress=progress, seed_cache=False)
+            except BaseException as e:
+                box["error"] = e
+
+        worker = threading.Thread(target=work, name=f"bdo-fleet-{t.name}", daemon=True)
+        worker.start()
+        deadline = time.monotonic() + t.timeout
+        while worker.is_alive() and time.monotonic() < deadline and not self.stop_event.is_set():
+            worker.join(0.2)
+        if worker.is_alive():
+            cancelled = self.stop_event.is_set()
+            progress.cancelled = True
+            worker.join(FLEET_CANCEL_GRACE)
+
+            def went_through() -> bool:
+                worker.join()
+                done = box.get("removed", box.get("result"))
+                return done is not None and not done.failed
+            settle = went_through if worker.is_alive() else None
+            if cancelled:
+                outcome.errors.append("cancelled")
+                return "cancelled", False, settle
+            if settle:
+                # Never start another transaction on an install while one still runs there.
+                outcome.errors.append(f"no result within {t.timeout:g} s (still running in the background)")
+                return "timed_out", False, settle
+            outcome.errors.append(f"no result within {t.timeout:g} s")
+            return "timed_out", True, None
+        if "error" in box:
+            outcome.errors.append(str(box["error"]))
+            return "failed", True, None
+        if removing:
+            removal = box["removed"]
+            outcome.removed = removal.removed
+            if removal.failed:
+                outcome.errors.append("; ".join(removal.errors[:3]))
+                return "failed", True, None
+            record_deploy([t.path], None)
+            return "ok", False, None
+        result = box["result"]
+        outcome.copied, outcome.skipped = result.copied, result.skipped
+        if result.failed:
+            outcome.errors.append("; ".join(result.errors[:3]))
+            return "failed", True, None
+        record_deploy([t.path], t.preset)
+        return "ok", False, None
+
+    def _run_target(self, t: FleetTarget) -> TargetOutcome:
+        outcome = TargetOutcome(t.name, t.path, t.action, t.preset)
+        started = time.monotonic()
+        source = self._source(t)
+        if source is None:
+            outcome.status = "failed"
+            outcome.errors.append(f"no source files for {t.preset}")
+        else:
+            add_cached_installs([t.path], "fleet")
+            for attempt in range(1, t.retries + 2):
+                if self.stop_event.is_set():
+                    outcome.status = "cancelled"
+                    break
+                outcome.attempts = attempt
+                self.on_event("start" if attempt == 1 else "retry", t.name, t.path)
+                try:
+                    with trace_span("fleet.target", target=t.name, attempt=attempt):
+                        outcome.status, retry = self._attempt(t, source, outcome)
+                except (OSError, FleetError) as e:
+                    outcome.status, retry = "failed", True
+                    outcome.errors.append(str(e))
+                if outcome.status == "ok" or not retry or attempt > t.retries:
+                    break
+                delay = t.backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+                log.debug(f"[FLEET] {t.name}: {outcome.errors[-1]}; retrying in {delay:.1f} s")
+                trace_count("fleet.retries")
+                if self.stop_event.wait(delay):
+                    outcome.status = "cancelled"
+                    break
+        outcome.seconds = time.monotonic() - started
+        self._record(t, outcome)
+        self.on_event(outcome.status, t.name, outcome.errors[-1] if outcome.errors else t.path)
+        return outcome
+
+    def run(self) -> FleetReport:
+        """Roll out to every target (blocks). Ctrl+C stops it cleanly; run again to resume."""
+        report = FleetReport(str(self.inv.path), time.time())
+        if not self.resume:
+            # Starting over: nothing of these targets counts as done until it is redone.
+            for t in self.targets():
+                self._state.pop(t.name, None)
+            self._save_state()
+        todo = []
+        for t in self.targets():
+            if self.done_before(t):
+                report.outcomes.append(TargetOutcome(t.name, t.path, t.action, t.preset, "done_before"))
+                self.on_event("done_before", t.name, t.path)
+            else:
+                todo.append(t)
+                self._source(t)   # resolved (and its manifest built) once, before the workers start
+        log.debug(f"[FLEET] {len(todo)} target(s) to do, {len(report.outcomes)} done before, "
+                  f"{self.concurrency} at a time")
+        with trace_span("fleet", targets=len(todo), concurrency=self.concurrency):
+            pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bdo-fleet")
+            futs = {pool.submit(self._run_target, t): t for t in todo}
+            finished = {}
+            try:
+                for fut in as_completed(futs):
+                    finished[fut] = fut.result()
+            except KeyboardInterrupt:
+                report.interrupted = True
+                self.stop()
+                log.warning("[FLEET] Interrupted; rolling back the targets in progress...")
+                for fut, t in futs.items():
+                    if fut in finished:
+                        continue
+                    finished[fut] = (TargetOutcome(t.name, t.path, t.action, t.preset, "cancelled")
+                                     if fut.cancel() else fut.result())
+            finally:
+                pool.shutdown(wait=True)
+            report.outcomes += finished.values()
+        order = {t.name: i for i, t in enumerate(self.inv.targets)}
+        report.outcomes.sort(key=lambda o: order[o.name])
+        report.finished = time.time()
+        return report
+
+
+def write_report(report: FleetReport, path=None) -> Path:
+    path = Path(path) if path else report_path(Path(report.inventory))
+    _write_json(path, report.to_dict())
+    return path
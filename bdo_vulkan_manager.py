@@ -1,86 +1,41 @@
 # bdo_vulkan_manager.py
-import ctypes
-import os
 import sys
-import shutil
-import string
 import logging
-import subprocess
+import queue
+import threading
 from pathlib import Path
-import configparser
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import base64
-import tempfile
-import atexit
 
-# ==========================
-# BUILD-TIME SWITCH
-# ==========================
-BUNDLED = True   # <<< SET THIS: True = bundle assets via --add-data, False = use local ./BDO_Vulkan_API
+from bdo_vulkan_core import (
+    InstallRecord, InstallStatus, add_cached_installs, load_cache_records, record_deploy,
+    update_cache_records, validate_records_async,
+    enable_tracing_from_config, write_trace, wait_for_process_exit,
+    APP_DIR, MEIPASS_DIR, BUNDLED, FROZEN, SOURCE_ROOT, GAME_EXE,
+    HandoffError, read_handoff, write_handoff,
+    DeployProgress, DeployResult, DirectorySource, DeploySource, deploy_manifest,
+    PreflightResult, ScanProgress, copy_replace, is_admin, is_process_running, preflight,
+    load_config, recover_interrupted_deploy, remove_matching, resolve_source,
+    iter_scan_installs, verify_installs_async, write_cache,
+)
 
 # ==========================
-# Runtime context & paths
+# GUI-only settings
 # ==========================
-# Detect if running as compiled executable (Nuitka uses __compiled__, PyInstaller uses frozen)
-FROZEN = getattr(sys, "frozen", False) or "__compiled__" in globals()
-APP_DIR = (Path(sys.executable).resolve(
-).parent if FROZEN else Path(__file__).resolve().parent)
-# For Nuitka: resources are typically next to exe; for PyInstaller: in _MEIPASS
-MEIPASS_DIR = Path(getattr(sys, "_MEIPASS", APP_DIR)).resolve()
-
-CONFIG_FILE = APP_DIR / "bdovulkan_config.ini"
-CACHE_FILE = APP_DIR / "bdovulkan_installs.txt"
 ICON_FILE = "BlackDesert.ico"  # searched in APP_DIR and MEIPASS_DIR
-
-SOURCE_ROOT = APP_DIR / "BDO_Vulkan_API"   # used when BUNDLED=False
-ASSETS_NORMAL_REL = Path("assets/Normal")  # used when BUNDLED=True
-ASSETS_POTATO_REL = Path("assets/Potato")  # used when BUNDLED=True
-
-GAME_EXE = "BlackDesert64.exe"
 APP_TITLE = "Black Desert Online Vulkan Utility — by KarmaPanda"
 
-COMMON_RELATIVE_PATHS = [
-    r"\BlackDesert",
-    r"\PearlAbyss",
-    r"\Program Files\BlackDesert",
-    r"\Program Files (x86)\BlackDesert",
-    r"\Program Files\PearlAbyss",
-    r"\Program Files (x86)\PearlAbyss",
-    r"\Program Files\Steam\steamapps\common\Black Desert Online",
-    r"\Program Files (x86)\Steam\steamapps\common\Black Desert Online",
-    r"\Games\BlackDesert",
-]
-
 # ==========================
 # Config (debug) + console
 # ==========================
+# Nothing here runs at import time: init_logging() is called from the entry
+# point, so importing this module neither touches the config file nor Tk.
 
 
-def load_config():
-    cfg = configparser.ConfigParser()
-    cfg["general"] = {"debug": "false"}
-    if CONFIG_FILE.exists():
-        try:
-            cfg.read(CONFIG_FILE, encoding="utf-8")
-        except Exception:
-            pass
-    else:
-        try:
-            CONFIG_FILE.write_text(
-                "[general]\ndebug = false\n", encoding="utf-8")
-        except Exception:
-            pass
-    return cfg
-
-
-CFG = load_config()
-DEBUG = CFG.getboolean("general", "debug", fallback=False)
-
-
-def _attach_debug_console_if_needed():
-    if not DEBUG:
+def _attach_debug_console_if_needed(debug: bool):
+    if not debug:
         return
+    import ctypes
     # If already running from a console, skip.
     if ctypes.windll.kernel32.GetConsoleWindow():
         return
@@ -93,13 +48,18 @@ def _attach_debug_console_if_needed():
             pass
 
 
-_attach_debug_console_if_needed()
+def init_logging():
+    cfg = load_config()
+    enable_tracing_from_config(cfg)
+    debug = cfg.getboolean("general", "debug", fallback=False)
+    _attach_debug_console_if_needed(debug)
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%H:%M:%S",
+    )
+
 
-logging.basicConfig(
-    level=logging.DEBUG if DEBUG else logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%H:%M:%S",
-)
 log = logging.getLogger("BDO-Vulkan")
 
 # ==========================
@@ -132,7 +92,10 @@ def _find_ico_path() -> Path | None:
 
 
 def _load_photo_from_b64_png():
+    # Decoded once, on the first window, then shared by every window.
     global _APP_ICON_PHOTO
+    if _APP_ICON_PHOTO is not None:
+        return _APP_ICON_PHOTO
     try:
         _APP_ICON_PHOTO = tk.PhotoImage(data=ICON_PNG_B64)
         return _APP_ICON_PHOTO
@@ -157,7 +120,7 @@ def setup_app_icon(win: tk.Misc):
 
 
 def new_window(title: str, geometry: tuple[int, int] | None = None) -> tk.Toplevel:
-    w = tk.Toplevel(ROOT)
+    w = tk.Toplevel(get_root())
     setup_app_icon(w)
     w.title(title)
     if geometry:
@@ -172,70 +135,130 @@ def new_window(title: str, geometry: tuple[int, int] | None = None) -> tk.Toplev
 # ==========================
 # Single hidden root
 # ==========================
-ROOT = tk.Tk()
-ROOT.withdraw()
-ROOT.title(APP_TITLE)
-setup_app_icon(ROOT)
+_ROOT: tk.Tk | None = None
+
+
+def get_root() -> tk.Tk:
+    """The hidden Tk root, created on first use (Tcl start-up is the slow part)."""
+    global _ROOT
+    if _ROOT is None:
+        _ROOT = tk.Tk()
+        _ROOT.withdraw()
+        _ROOT.title(APP_TITLE)
+        setup_app_icon(_ROOT)
+    return _ROOT
+
+
+def destroy_root():
+    global _ROOT
+    if _ROOT is not None:
+        try:
+            _ROOT.destroy()
+        except Exception:
+            pass
+        _ROOT = None
 
 # ==========================
 # UAC helpers
 # ==========================
 
 
-def is_admin() -> bool:
+def relaunch_as_admin(args=()) -> bool:
+    """Start an elevated copy of this app with args; False if UAC was declined or failed."""
+    import ctypes
+    params = " ".join([f'"{p}"' for p in ([] if FROZEN else [__file__]) + list(args)])
+    rc = ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, params, None, 1)
+    return rc > 32   # ShellExecuteW returns an error code <= 32 on failure
+
+
+def hand_off_elevated(action: str, mode: str, source: DeploySource,
+                      results: list[PreflightResult], wait_for_game: bool) -> bool:
+    """
+    Pass the installs that need administrator rights to an elevated instance,
+    which goes straight to executing `action` on them.
+    """
     try:
-        return ctypes.windll.shell32.IsUserAnAdmin() != 0
-    except Exception:
+        path, key = write_handoff(action, mode, source, results, wait_for_game)
+    except (HandoffError, OSError) as e:
+        log.debug(f"[UAC] Cannot write handoff: {e}")
         return False
+    log.debug("[UAC] Relaunching elevated...")
+    if relaunch_as_admin(["--handoff", str(path), "--handoff-key", key]):
+        return True
+    log.debug("[UAC] Elevated relaunch declined or failed")
+    try:
+        path.unlink()
+    except OSError:
+        pass
+    return False
 
 
-def relaunch_as_admin():
-    params = " ".join([f'"{p}"' for p in sys.argv[1:]])
-    ctypes.windll.shell32.ShellExecuteW(
-        None, "runas", sys.executable, f'"{__file__}" {params}', None, 1)
+def handoff_from_argv(argv: list[str]) -> tuple[str, str] | None:
+    """(file, key) of `--handoff FILE --handoff-key KEY` in argv, if given."""
+    try:
+        i, j = argv.index("--handoff"), argv.index("--handoff-key")
+        return argv[i + 1], argv[j + 1]
+    except (ValueError, IndexError):
+        return None
 
 # ==========================
 # Game-running guard
 # ==========================
 
 
-def is_process_running(image_name: str) -> bool:
+def start_game_running_check():
     """
-    Uses 'tasklist' to detect a running process by image name (e.g., BlackDesert64.exe).
-    Avoids external deps like psutil.
+    Run the (slow) process lookup on a background thread so the first window
+    can open meanwhile. Returns a callable that waits for and returns the answer.
     """
-    try:
-        res = subprocess.run(
-            ["tasklist", "/FI", f"IMAGENAME eq {image_name}"],
-            capture_output=True, text=True, creationflags=subprocess.CREATE_NO_WINDOW
-        )
-        out = res.stdout or ""
-        # tasklist returns a table where the image name appears if running
-        return image_name.lower() in out.lower()
-    except Exception as e:
-        log.debug(f"[PROC] tasklist failed: {e}")
-        return False
+    box = {}
 
+    def work():
+        box["running"] = is_process_running(GAME_EXE)
 
-def guard_game_not_running_or_exit():
-    if is_process_running(GAME_EXE):
-        # Make a small topmost dialog to ensure it's seen
-        messagebox.showerror(
-            "Game is Running",
-            f"{GAME_EXE} appears to be running.\n\nPlease close Black Desert Online before using this utility.",
-            parent=ROOT
-        )
-        sys.exit(0)
+    t = threading.Thread(target=work, name="bdo-game-check", daemon=True)
+    t.start()
+
+    def result() -> bool:
+        t.join()
+        return box.get("running", False)
+    return result
+
+
+def guard_game_not_running_or_exit(check=None) -> bool:
+    """
+    Exit if the game is running, unless the user opts into waiting for it
+    (or `wait_for_game_exit = true` in the config). Returns True when the
+    action should wait for the game to exit before it runs.
+    """
+    running = check() if check else is_process_running(GAME_EXE)
+    if not running:
+        return False
+    if load_config().getboolean("general", "wait_for_game_exit", fallback=False):
+        return True
+    if messagebox.askyesno(
+        "Game is Running",
+        f"{GAME_EXE} appears to be running.\n\n"
+        "Continue anyway and apply your changes automatically once the game exits?\n"
+        "(Choose No to close this utility.)",
+        parent=get_root()
+    ):
+        return True
+    sys.exit(0)
 
 # ==========================
 # Progress dialog
 # ==========================
 
 
+UI_FRAME_MS = 33  # progress dialogs redraw at ~30 fps
+
+
 class ProgressDialog:
-    def __init__(self, title="Scanning...", initial="Starting..."):
+    def __init__(self, title="Scanning...", initial="Starting...", height=140, on_cancel=None):
         self.cancelled = False
-        self.win = new_window(title, geometry=(520, 140))
+        self._cancel_hook = on_cancel
+        self.win = new_window(title, geometry=(520, height))
         self.win.resizable(False, False)
         self.label = tk.Label(self.win, text=initial,
                               width=62, anchor="w", justify="left")
@@ -244,13 +267,27 @@ class ProgressDialog:
         self.pb.pack(padx=14, pady=(0, 8))
         self.pb.start(40)
         tk.Button(self.win, text="Cancel", width=12,
-                  command=self._on_cancel).pack(pady=(0, 10))
+                  command=self._on_cancel).pack(side="bottom", pady=(0, 10))
         self.win.protocol("WM_DELETE_WINDOW", self._on_cancel)
 
-    def _on_cancel(self): self.cancelled = True
-
-    def update_status(self, text: str): self.label.config(
-        text=text); self.win.update()
+    def _on_cancel(self):
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.label.config(text="Cancelling...")
+        if self._cancel_hook:
+            self._cancel_hook()
+
+    def update_status(self, text: str):
+        if not self.cancelled:
+            self.label.config(text=text)
+
+    def set_fraction(self, fraction: float):
+        """Switch the bar to determinate mode and show fraction (0..1) done."""
+        if str(self.pb["mode"]) != "determinate":
+            self.pb.stop()
+            self.pb.config(mode="determinate", maximum=100)
+        self.pb["value"] = max(0.0, min(1.0, fraction)) * 100
 
     def close(self):
         try:
@@ -267,201 +304,114 @@ class ProgressDialog:
 # ==========================
 
 
-def _bundle_path(rel: Path) -> Path:
-    return (MEIPASS_DIR / rel).resolve()
-
+def ensure_source_for_mode(mode: str) -> DeploySource | None:
+    """
+    Returns the deploy source for the selected mode.
+    - BUNDLED=True: read bundled assets (assets/<Mode> or assets/<Mode>.zip) in place.
+    - BUNDLED=False: use ./BDO_Vulkan_API/<Mode>; if empty/missing, prompt user to pick.
+    """
+    source = resolve_source(mode)
+    if source is not None:
+        log.debug(f"[ASSETS] Using {mode} from {source}")
+        return source
 
-def copy_tree(src: Path, dst: Path):
-    for root, dirs, files in os.walk(src):
-        rel = Path(root).relative_to(src)
-        (dst / rel).mkdir(parents=True, exist_ok=True)
-        for f in files:
-            s = Path(root) / f
-            d = dst / rel / f
-            try:
-                shutil.copy2(s, d)
-            except Exception as e:
-                log.debug(f"[ASSETS] Copy failed {s} -> {d}: {e}")
+    if BUNDLED:
+        text = f"No embedded files found for '{mode}'.\n\nSelect the source folder manually."
+    else:
+        text = (f"Default source not found or empty:\n{SOURCE_ROOT / mode}"
+                "\n\nPlease select the source folder manually.")
+    messagebox.showinfo("Source Missing", text, parent=get_root())
+    chosen = filedialog.askdirectory(
+        parent=get_root(),
+        title="Select the SOURCE folder (files to manage)",
+        mustexist=True
+    )
+    return DirectorySource(chosen) if chosen else None
 
 
-def ensure_source_for_mode(mode: str) -> str | None:
+# ==========================
+# Scan with progress
+# ==========================
+def run_in_background(dlg: ProgressDialog, work, on_frame=None, name="bdo-worker"):
     """
-    Returns source folder path for selected mode.
-    - BUNDLED=True: copy from bundled assets (assets/<Mode>) into a temp dir.
-    - BUNDLED=False: use ./BDO_Vulkan_API/<Mode>; if empty/missing, prompt user to pick.
+    Run work() on a worker thread while the Tk loop keeps running; on_frame()
+    is called on the Tk thread every UI_FRAME_MS to refresh dlg. Closes dlg
+    when work() returns and hands back its result (or re-raises its error).
     """
-    if BUNDLED:
-        rel = ASSETS_NORMAL_REL if mode.lower() == "normal" else ASSETS_POTATO_REL
-        bundled_src = _bundle_path(rel)
+    box = {}
 
-        if not bundled_src.exists():
-            messagebox.showinfo(
-                "Source Missing",
-                f"No embedded files found for '{mode}'.\n\nSelect the source folder manually.",
-                parent=ROOT
-            )
-            chosen = filedialog.askdirectory(
-                parent=ROOT,
-                title="Select the SOURCE folder (files to manage)",
-                mustexist=True
-            )
-            return chosen or None
-
-        # Extract to a temporary folder
-        tempdir = Path(tempfile.mkdtemp(prefix=f"bdo_vulkan_{mode.lower()}_"))
-        log.debug(f"[ASSETS] Extracting bundled {mode} -> {tempdir}")
-        copy_tree(bundled_src, tempdir)
-
-        # Ensure cleanup on exit
-        def cleanup_temp():
-            try:
-                shutil.rmtree(tempdir, ignore_errors=True)
-                log.debug(f"[ASSETS] Cleaned up temp dir {tempdir}")
-            except Exception as e:
-                log.debug(f"[ASSETS] Failed to clean temp dir {tempdir}: {e}")
+    def target():
+        try:
+            box["result"] = work()
+        except BaseException as e:
+            box["error"] = e
 
-        atexit.register(cleanup_temp)
-        return str(tempdir)
+    worker = threading.Thread(target=target, name=name, daemon=True)
 
-    else:
-        # Non-bundled mode: look for ./BDO_Vulkan_API/<Mode>
-        target_dir = SOURCE_ROOT / mode
-        has_files = target_dir.exists() and any(target_dir.rglob("*"))
-        if has_files:
-            return str(target_dir)
+    def tick():
+        if on_frame:
+            on_frame()
+        if worker.is_alive():
+            dlg.win.after(UI_FRAME_MS, tick)
+        else:
+            dlg.close()
 
-        messagebox.showinfo(
-            "Source Missing",
-            f"Default source not found or empty:\n{target_dir}\n\nPlease select the source folder manually.",
-            parent=ROOT
-        )
-        chosen = filedialog.askdirectory(
-            parent=ROOT,
-            title="Select the SOURCE folder (files to manage)",
-            mustexist=True
-        )
-        return chosen or None
+    worker.start()
+    dlg.win.after(UI_FRAME_MS, tick)
+    dlg.win.wait_window()
+    worker.join()
+    if "error" in box:
+        raise box["error"]
+    return box["result"]
 
 
-# ==========================
-# Drive discovery & scan
-# ==========================
-def get_drives():
-    drives = []
-    bitmask = ctypes.windll.kernel32.GetLogicalDrives()
-    for i, letter in enumerate(string.ascii_uppercase):
-        if bitmask & (1 << i):
-            root = f"{letter}:\\"
-            try:
-                if os.path.isdir(root):
-                    drives.append(root)
-            except Exception:
-                pass
-    if not drives:
-        drives = ["C:\\"]
-    log.debug(f"Detected drives: {drives}")
-    return drives
-
-
-def quick_search_on_drive(drive_root: str, dlg: ProgressDialog | None = None):
-    found = []
-    for rel in COMMON_RELATIVE_PATHS:
-        if dlg and dlg.cancelled:
-            break
-        candidate = Path(drive_root + rel)
-        if dlg:
-            dlg.update_status(f"Scanning {drive_root} (quick)\n{candidate}")
+class LiveScan:
+    """
+    A drive scan on a worker thread that outlives the dialogs showing it, so
+    the user can act on the first installs while the rest of the drives are
+    walked. Every install is saved to the cache as soon as it is found; a scan
+    that runs to the end also drops the cached installs it did not find.
+    """
+
+    def __init__(self):
+        self.progress = ScanProgress()
+        self.found: queue.Queue = queue.Queue()   # (path, origin) for the dialog showing the scan
+        self.count = 0
+        self.done = False
+        self._thread = threading.Thread(target=self._run, name="bdo-scan-main", daemon=True)
+        self._thread.start()
+        _LIVE_SCANS.append(self)
+
+    def _run(self):
+        origins = {}
         try:
-            if (candidate / GAME_EXE).exists():
-                log.debug(f"[QUICK] Found at {candidate}")
-                found.append(str(candidate))
-        except PermissionError:
-            log.debug(f"[QUICK] Permission denied: {candidate}")
+            for path, origin in iter_scan_installs(self.progress):
+                origins[path] = origin
+                add_cached_installs([path], origin)
+                self.count += 1
+                self.found.put((path, origin))
+            if not self.progress.cancelled:
+                write_cache(list(origins), found_by=origins)
         except Exception as e:
-            log.debug(f"[QUICK] Error at {candidate}: {e}")
-    return found
-
-
-def deep_scan_drive(drive_root: str, dlg: ProgressDialog | None = None):
-    found = []
-    skip_dirs = {"System Volume Information",
-                 "$Recycle.Bin", "Windows", "Recovery", "PerfLogs"}
-    scanned_dirs = 0
-    for root, dirs, files in os.walk(drive_root, topdown=True, followlinks=False):
-        if dlg and dlg.cancelled:
-            break
-        dirs[:] = [d for d in dirs if d not in skip_dirs]
-        scanned_dirs += 1
-        if dlg and scanned_dirs % 100 == 0:
-            dlg.update_status(
-                f"Scanning {drive_root} (deep)\nDirs scanned: {scanned_dirs}")
-        if GAME_EXE in files:
-            log.debug(f"[DEEP] Found at {root}")
-            found.append(root)
-    if dlg and not dlg.cancelled:
-        dlg.update_status(
-            f"Scanning {drive_root} (deep) complete\nDirs scanned: {scanned_dirs}")
-    return found
-
-
-def scan_all_installs_with_progress():
-    dlg = ProgressDialog(title="Scanning for Black Desert",
-                         initial="Detecting drives...")
-    installs, seen = [], set()
-    try:
-        for drv in get_drives():
-            if dlg.cancelled:
-                break
-            dlg.update_status(f"Scanning {drv} (quick)")
-            for p in quick_search_on_drive(drv, dlg):
-                if p not in seen:
-                    installs.append(p)
-                    seen.add(p)
-            if not any(str(p).startswith(drv) for p in installs):
-                if dlg.cancelled:
-                    break
-                dlg.update_status(
-                    f"Scanning {drv} (deep)\nThis may take a while…")
-                for p in deep_scan_drive(drv, dlg):
-                    if p not in seen:
-                        installs.append(p)
-                        seen.add(p)
-            else:
-                log.debug(
-                    f"[SCAN] Skipping deep scan on {drv}: found in quick pass.")
-    finally:
-        dlg.close()
-    log.debug(f"Scan complete. Found installs: {installs}")
-    return installs
+            log.debug(f"[SCAN] Scan failed: {e}")
+        finally:
+            self.done = True
 
-# ==========================
-# Cache
-# ==========================
+    def cancel(self):
+        self.progress.cancel()
 
+    def stop(self, timeout: float = 5.0):
+        """Cancel and give the walk a moment to save its scan index."""
+        self.cancel()
+        self._thread.join(timeout)
 
-def load_cache():
-    paths = []
-    if CACHE_FILE.exists():
-        try:
-            for line in CACHE_FILE.read_text(encoding="utf-8").splitlines():
-                p = line.strip().strip('"')
-                if p and (Path(p) / GAME_EXE).exists():
-                    paths.append(p)
-                else:
-                    log.debug(f"[CACHE] Invalid or missing exe: {p}")
-        except Exception as e:
-            log.debug(f"[CACHE] Error reading cache: {e}")
-    log.debug(f"[CACHE] Loaded: {paths}")
-    return paths
 
+_LIVE_SCANS: list[LiveScan] = []
 
-def write_cache(paths):
-    try:
-        uniq = sorted(dict.fromkeys(paths))
-        CACHE_FILE.write_text("\n".join(uniq), encoding="utf-8")
-        log.debug(f"[CACHE] Wrote {len(uniq)} path(s) to {CACHE_FILE}")
-    except Exception as e:
-        log.debug(f"[CACHE] Write failed: {e}")
+
+def stop_live_scans():
+    while _LIVE_SCANS:
+        _LIVE_SCANS.pop().stop()
 
 # ==========================
 # UI helpers
@@ -507,14 +457,90 @@ def choose_source_mode():
     return state["mode"] or "Normal"
 
 
+def ask_install_folder() -> str | None:
+    """Let the user pick the game folder; caches and returns it, or None."""
+    manual = filedialog.askdirectory(
+        parent=get_root(), title="Select your Black Desert Online folder (must contain BlackDesert64.exe)", mustexist=True)
+    if not manual:
+        return None
+    if not (Path(manual) / GAME_EXE).exists():
+        messagebox.showerror("Invalid Folder",
+                             f"BlackDesert64.exe not found in:\n{manual}",
+                             parent=get_root())
+        return None
+    write_cache([manual], found_by="manual")
+    return manual
+
+
 def browse_folder(prompt: str):
-    path = filedialog.askdirectory(parent=ROOT, title=prompt, mustexist=True)
+    path = filedialog.askdirectory(parent=get_root(), title=prompt, mustexist=True)
     if path:
         log.debug(f"[UI] Folder chosen: {path}")
     return path or ""
 
 
-def select_installs_dialog(paths):
+CACHE_POLL_MS = 50  # how often the selection dialog picks up validation results
+STATUS_CHANGED_FG = "#b35900"  # installs whose preset files were modified or are missing
+
+
+def _install_label(rec: InstallRecord, ok: bool | None, status: InstallStatus | None = None) -> str:
+    text = rec.path
+    if ok is False:
+        return text + "   [not found]"
+    if status:
+        text += f"   [{status.summary()}]"
+    elif rec.preset:
+        text += f"   [{rec.preset}]"
+    return text
+
+
+def show_conf_diff(parent, source: DeploySource, paths: list[str]):
+    """Read-only window with the dxvk.conf each install would get, as a diff against its current one."""
+    from bdo_vulkan_dxvkconf import diff_install
+    files = deploy_manifest(source)
+    win = tk.Toplevel(parent)
+    win.title("dxvk.conf changes")
+    win.geometry("900x600")
+    text = tk.Text(win, wrap="none", font=("Consolas", 10))
+    ysb = ttk.Scrollbar(win, orient="vertical", command=text.yview)
+    text.configure(yscrollcommand=ysb.set)
+    ysb.pack(side="right", fill="y")
+    text.pack(fill="both", expand=True)
+    text.tag_configure("add", foreground="#007a00")
+    text.tag_configure("del", foreground="#b30000")
+    for path in paths:
+        try:
+            diff = diff_install(source, files, path)
+        except OSError as e:
+            text.insert(tk.END, f"{path}: {e}\n\n")
+            continue
+        if not diff:
+            text.insert(tk.END, f"{path}: dxvk.conf up to date\n\n")
+            continue
+        for line in diff.splitlines():
+            tag = "add" if line.startswith("+") else "del" if line.startswith("-") else None
+            text.insert(tk.END, line + "\n", tag)
+        text.insert(tk.END, "\n")
+    text.configure(state="disabled")
+    win.bind("<Escape>", lambda e: win.destroy())
+
+
+def select_installs_dialog(paths, source: DeploySource | None = None, scan: LiveScan | None = None):
+    """
+    Opens immediately with the cached paths; each install's exe is checked and
+    its files are verified against the presets in the background. Stale
+    entries are greyed out and each entry shows its preset, DXVK version and
+    changed files as the results come in. With a running scan, installs are
+    added as it finds them and can be acted on before it ends; "Stop Scan"
+    cancels it. With a source, "Config Diff" shows what a deploy would change
+    in the selected (or all) installs' dxvk.conf.
+    Returns (mode, selected paths); mode "NOT_FOUND" if a scan ended with
+    nothing to list.
+    """
+    paths = sorted(paths)
+    known = {r.path: r for r in load_cache_records()}
+    records = [known.get(p) or InstallRecord(p) for p in paths]
+
     win = new_window("Select Black Desert Installation(s)",
                      geometry=(840, 520))
     tk.Label(win, text="Select one or more installations:").pack(
@@ -523,10 +549,105 @@ def select_installs_dialog(paths):
     lb = tk.Listbox(win, selectmode=tk.MULTIPLE,
                     exportselection=False, font=("Consolas", 10))
     lb.pack(fill="both", expand=True, padx=12)
-    for p in sorted(paths):
-        lb.insert(tk.END, p)
+    for rec in records:
+        lb.insert(tk.END, _install_label(rec, None))
+    scan_label = tk.Label(win, text="", anchor="w", justify="left")
+    if scan is not None:
+        scan_label.pack(fill="x", padx=12, pady=(6, 0))
+
+    index_of = {p: i for i, p in enumerate(paths)}
+    validation = validate_records_async(records)
+
+    def relabel(i: int, text: str, fg: str | None):
+        was_selected = lb.selection_includes(i)
+        lb.delete(i)
+        lb.insert(i, text)
+        if fg:
+            lb.itemconfig(i, fg=fg)
+        if was_selected:
+            lb.select_set(i)
+
+    def drain(entry: list) -> bool:
+        """Handle what is queued; False once the queue's end marker came."""
+        q, handle = entry
+        try:
+            while True:
+                item = q.get_nowait()
+                if item is None:
+                    if q is validation:
+                        update_cache_records(records)  # persist refreshed exe metadata
+                    return False
+                handle(*item)
+        except queue.Empty:
+            return True
+
+    def on_validated(rec: InstallRecord, ok: bool):
+        if not ok:
+            relabel(index_of[rec.path], _install_label(rec, False), "gray")
+
+    def on_verified(path: str, st: InstallStatus):
+        if st.error:
+            return  # a missing exe is reported by the validation
+        i = index_of[path]
+        relabel(i, _install_label(records[i], True, st),
+                STATUS_CHANGED_FG if st.modified or st.missing else None)
+
+    # [queue, handler] pairs still being drained; found installs add their own
+    # verification, so this one gets a snapshot of the rows listed so far.
+    active = [[validation, on_validated], [verify_installs_async(list(paths)), on_verified]]
+
+    def on_found(path: str, origin: str):
+        if path in index_of:
+            return
+        index_of[path] = len(paths)
+        paths.append(path)
+        records.append(InstallRecord(path, found_by=origin))
+        lb.insert(tk.END, _install_label(records[-1], None))
+        lb.see(tk.END)
+        active.append([verify_installs_async([path]), on_verified])
+
+    def poll_scan():
+        status = None
+        while True:
+            try:
+                kind, value = scan.progress.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "status":
+                status = value
+        while True:
+            try:
+                on_found(*scan.found.get_nowait())
+            except queue.Empty:
+                break
+        if scan.done:
+            stop_btn.config(text="Rescan", command=lambda: set_mode_and_close("RESCAN"))
+            if scan.progress.cancelled:
+                scan_label.config(text=f"Scan stopped: {scan.count} installation(s) found.")
+            else:
+                scan_label.config(text=f"Scan complete: {scan.count} installation(s) found.")
+        elif status and not scan.progress.cancelled:
+            # The walk's status minus its current-folder line, which flickers too fast to read here.
+            lines = status.splitlines()[:2]
+            scan_label.config(text="\n".join([f"{scan.count} installation(s) found so far"] + lines))
+
+    def poll():
+        try:
+            if scan is not None and not state["scan_done"]:
+                poll_scan()
+                state["scan_done"] = scan.done
+                if scan.done and not paths:
+                    set_mode_and_close("NOT_FOUND")
+                    return
+            active[:] = [entry for entry in active if drain(entry)]
+        except tk.TclError:
+            return  # window closed
+        if active or (scan is not None and not state["scan_done"]):
+            win.after(CACHE_POLL_MS, poll)
+
+    win.after(CACHE_POLL_MS, poll)
 
-    state = {"mode": None, "sel_idx": []}
+    state = {"mode": None, "sel_idx": [], "scan_done": scan is None}
     bar = tk.Frame(win)
     bar.pack(pady=10)
 
@@ -547,6 +668,10 @@ def select_installs_dialog(paths):
         state["sel_idx"] = list(lb.curselection())
         win.destroy()
 
+    def stop_scan():
+        scan.cancel()
+        scan_label.config(text="Stopping the scan...")
+
     tk.Button(bar, text="Select All",   width=14,
               command=select_all).pack(side="left", padx=6)
     tk.Button(bar, text="Clear",        width=14,
@@ -555,8 +680,14 @@ def select_installs_dialog(paths):
               command=lambda: set_mode_and_close("COPY")).pack(side="left", padx=6)
     tk.Button(bar, text="Remove",       width=14, command=lambda: set_mode_and_close(
         "REMOVE")).pack(side="left", padx=6)
-    tk.Button(bar, text="Rescan",       width=14, command=lambda: set_mode_and_close(
-        "RESCAN")).pack(side="left", padx=6)
+    if scan is not None and not scan.done:
+        stop_btn = tk.Button(bar, text="Stop Scan", width=14, command=stop_scan)
+    else:
+        stop_btn = tk.Button(bar, text="Rescan", width=14, command=lambda: set_mode_and_close("RESCAN"))
+    stop_btn.pack(side="left", padx=6)
+    if source is not None:
+        tk.Button(bar, text="Config Diff",  width=14, command=lambda: show_conf_diff(
+            win, source, [paths[i] for i in lb.curselection()] or paths)).pack(side="left", padx=6)
 
     # footer credits
     foot = tk.Frame(win)
@@ -576,63 +707,143 @@ def select_installs_dialog(paths):
 # ==========================
 
 
-def ensure_uac_for_paths(paths):
-    needs_elev = False
-    for p in paths:
-        test = Path(p) / ".__bdo_uac_test.tmp"
+def _preflight_report(results: list[PreflightResult]) -> str:
+    lines = []
+    for r in results:
+        notes = r.problems() + r.warnings()
+        if notes:
+            lines.append(r.path)
+            lines += [f"    - {n}" for n in notes]
+    return "\n".join(lines)
+
+
+def preflight_report_dialog(results: list[PreflightResult], elevated: int = 0) -> str | None:
+    """
+    One report for every install with a problem or warning: "retry", "continue"
+    or None. `elevated` installs are left out of results and will be updated
+    with administrator rights.
+    """
+    usable = [r for r in results if r.ok]
+    failing = len(results) - len(usable)
+    heading = (f"{failing} of {len(results)} installation(s) cannot be updated:" if failing
+               else "Please note before continuing:")
+    if elevated:
+        heading = f"{elevated} installation(s) will be updated with administrator rights.\n" + heading
+    win = new_window("Installation Check", geometry=(640, 360))
+    tk.Label(win, anchor="w", justify="left", text=heading).pack(padx=12, pady=(10, 4), fill="x")
+    text = tk.Text(win, wrap="word", height=12, font=("Consolas", 10))
+    text.insert("1.0", _preflight_report(results))
+    text.configure(state="disabled")
+    text.pack(fill="both", expand=True, padx=12)
+
+    state = {"choice": None}
+
+    def choose(c):
+        state["choice"] = c
+        win.destroy()
+
+    bar = tk.Frame(win)
+    bar.pack(pady=10)
+    tk.Button(bar, text="Retry", width=14, command=lambda: choose("retry")).pack(side="left", padx=6)
+    tk.Button(bar, text="Skip These" if failing else "Continue", width=14,
+              state="normal" if usable or elevated else "disabled",
+              command=lambda: choose("continue")).pack(side="left", padx=6)
+    tk.Button(bar, text="Cancel", width=14, command=lambda: choose(None)).pack(side="left", padx=6)
+    win.protocol("WM_DELETE_WINDOW", lambda: choose(None))
+    win.bind("<Escape>", lambda e: choose(None))
+    win.grab_set()
+    win.wait_window()
+    return state["choice"]
+
+
+def preflight_with_report(paths: list[str], source: DeploySource,
+                          removing: bool = False) -> tuple[list[str], list[PreflightResult]] | None:
+    """
+    Check the selected installs at once (write access, free space, locked
+    files, GAME_EXE, drive type) and show a single report if anything is off.
+    Where administrator rights are missing, offers to hand those installs to
+    an elevated instance. Returns (installs to update here, preflight results
+    of the installs to hand off), or None to cancel. Installs that passed are
+    cached by preflight(), so Retry only probes the failing ones.
+    """
+    elevate = None   # the user's answer to elevating, once asked
+    while True:
+        dlg = ProgressDialog(title="Checking installations",
+                             initial=f"Checking {len(paths)} installation(s)...", height=110)
+        results = run_in_background(dlg, lambda: preflight(paths, source, removing=removing),
+                                    name="bdo-preflight-main")
+        if dlg.cancelled:
+            return None
+
+        gone = {r.path for r in results if not r.exe_ok and not r.timed_out}
+        if gone:
+            # forget installs that no longer exist
+            update_cache_records(forget=gone)
+
+        protected = [r for r in results if r.needs_elevation and r.exe_ok]
+        if protected and elevate is None and not is_admin():
+            elevate = messagebox.askyesno(
+                "Administrator Permission Required",
+                f"{len(protected)} of the selected installations are in protected locations and require\n"
+                "administrator permission to modify.\n\n"
+                "Update them with UAC elevation? The others are updated without it.",
+                parent=get_root())
+            if not elevate:
+                log.debug("[UAC] User chose to continue without elevation.")
+        handed = protected if elevate else []   # latest results, so a fixed install is done here
+        rest = [r for r in results if r not in handed]
+
+        if all(r.ok and not r.warnings() for r in rest):
+            return [r.path for r in rest], handed
+        choice = preflight_report_dialog(rest, elevated=len(handed))
+        log.debug(f"[PREFLIGHT] Report choice: {choice}")
+        if choice == "continue":
+            return [r.path for r in rest if r.ok], handed
+        if choice != "retry":
+            return None
+
+
+def copy_replace_with_progress(source, dest_paths: list[str]) -> DeployResult:
+    """Run copy_replace on a worker thread while the UI thread shows live throughput."""
+    progress = DeployProgress()
+
+    def work():
         try:
-            with open(test, "w", encoding="utf-8") as f:
-                f.write("test")
-            test.unlink(missing_ok=True)
-        except Exception:
-            needs_elev = True
-            log.debug(f"[UAC] Write test failed at {p}")
-            break
-
-    if needs_elev and not is_admin():
-        if messagebox.askyesno("Administrator Permission Required",
-                               "Some selected installations are in protected locations and require administrator\n"
-                               "permission to modify.\n\nRelaunch with UAC elevation now?",
-                               parent=ROOT):
-            log.debug("[UAC] Relaunching elevated...")
-            relaunch_as_admin()
-            sys.exit(0)
-        else:
-            messagebox.showwarning("Continuing without elevation",
-                                   "Continuing without elevation. Some actions may fail due to permissions.",
-                                   parent=ROOT)
-            log.debug("[UAC] User chose to continue without elevation.")
-
-
-def copy_replace(source_root: str, dest_paths: list[str]):
-    copied = 0
-    for root, _, files in os.walk(source_root):
-        for name in files:
-            src = Path(root) / name
-            for dest in dest_paths:
-                try:
-                    shutil.copy2(src, Path(dest) / name)
-                    log.debug(f"[COPY] {name} -> {dest}")
-                    copied += 1
-                except Exception as e:
-                    log.debug(f"[COPY] Failed {name} -> {dest}: {e}")
-    return copied
-
-
-def remove_matching(source_root: str, dest_paths: list[str]):
-    removed = 0
-    for root, _, files in os.walk(source_root):
-        for name in files:
-            for dest in dest_paths:
-                target = Path(dest) / name
-                if target.exists():
-                    try:
-                        target.unlink()
-                        log.debug(f"[REMOVE] {name} x {dest}")
-                        removed += 1
-                    except Exception as e:
-                        log.debug(f"[REMOVE] Failed {name} x {dest}: {e}")
-    return removed
+            return copy_replace(source, dest_paths, progress=progress)
+        except Exception as e:
+            log.debug(f"[COPY] Deploy crashed: {e}")
+            return DeployResult(failed=1, errors=[str(e)])
+
+    def cancel():
+        progress.cancelled = True
+
+    def on_frame():
+        dlg.set_fraction(progress.fraction())
+        dlg.update_status(progress.status_text())
+
+    dlg = ProgressDialog(title="Copying files", initial="Preparing...",
+                         height=110 + 18 * min(len(dest_paths), 6), on_cancel=cancel)
+    return run_in_background(dlg, work, on_frame, name="bdo-deploy-main")
+
+
+def wait_for_game_exit_with_progress() -> bool:
+    """Wait (cancellable) for the game to exit; the OS wait runs on a worker thread."""
+    dlg = ProgressDialog(title="Waiting for Black Desert",
+                         initial=f"Waiting for {GAME_EXE} to exit...\n"
+                                 "Your changes will be applied as soon as it closes.")
+    return run_in_background(
+        dlg, lambda: wait_for_process_exit(GAME_EXE, cancelled=lambda: dlg.cancelled),
+        name="bdo-game-wait")
+
+
+def recover_interrupted_deploy_with_notice():
+    # Roll back anything a previously interrupted deploy left half-done
+    restored = recover_interrupted_deploy()
+    if restored:
+        messagebox.showinfo(
+            "Previous Deploy Recovered",
+            f"The last Copy/Replace was interrupted.\n\nRestored {restored} file(s) to their previous state.",
+            parent=get_root())
 
 # ==========================
 # Main
@@ -640,119 +851,169 @@ def remove_matching(source_root: str, dest_paths: list[str]):
 
 
 def main():
-    # 0) Guard: exit if Black Desert is running
-    guard_game_not_running_or_exit()
+    # 0) Start the game-running check in the background; the answer is only
+    #    needed once the user has picked a mode.
+    game_check = start_game_running_check()
 
     # 1) Mode selection
     mode = choose_source_mode()
     if mode is None:
         return  # user canceled
 
+    # Guard: exit if Black Desert is running (or queue the action until it exits)
+    wait_for_game = guard_game_not_running_or_exit(game_check)
+    if not wait_for_game:
+        recover_interrupted_deploy_with_notice()
+
     # 2) Resolve source based on bundling mode
     source = ensure_source_for_mode(mode)
     if not source:
         return
     log.debug(f"[MAIN] Source = {source}")
 
-    # 3) Load cache or scan
-    installs = load_cache()
+    # 3) Load cache (validated lazily by the selection dialog) or scan
+    installs = [r.path for r in load_cache_records()]
+    scan = None
     if not installs:
         if messagebox.askyesno("Scan for Installations",
                                "No cached Black Desert installations found.\n\nScan all drives now?",
-                               parent=ROOT):
-            installs = scan_all_installs_with_progress()
-            if installs:
-                write_cache(installs)
-            else:
-                if messagebox.askyesno("Not Found",
-                                       "No installations found automatically.\n\nSelect the game folder manually?",
-                                       parent=ROOT):
-                    manual = filedialog.askdirectory(
-                        parent=ROOT, title="Select your Black Desert Online folder (must contain BlackDesert64.exe)", mustexist=True)
-                    if not manual:
-                        return
-                    if not (Path(manual) / GAME_EXE).exists():
-                        messagebox.showerror("Invalid Folder",
-                                             f"BlackDesert64.exe not found in:\n{manual}",
-                                             parent=ROOT)
-                        return
-                    installs = [manual]
-                    write_cache(installs)
-                else:
-                    return
+                               parent=get_root()):
+            scan = LiveScan()
         else:
-            manual = filedialog.askdirectory(
-                parent=ROOT, title="Select your Black Desert Online folder (must contain BlackDesert64.exe)", mustexist=True)
+            manual = ask_install_folder()
             if not manual:
                 return
-            if not (Path(manual) / GAME_EXE).exists():
-                messagebox.showerror("Invalid Folder",
-                                     f"BlackDesert64.exe not found in:\n{manual}",
-                                     parent=ROOT)
-                return
             installs = [manual]
-            write_cache(installs)
 
-    # 4) Selection loop
+    # 4) Selection loop (a running scan keeps adding to the list)
     while True:
-        mode_action, selected = select_installs_dialog(installs)
+        mode_action, selected = select_installs_dialog(installs, source, scan)
         if mode_action == "RESCAN":
-            if messagebox.askyesno("Rescan", "Rescan all drives now? (This may take a while)", parent=ROOT):
-                installs = scan_all_installs_with_progress()
-                if installs:
-                    write_cache(installs)
-                else:
-                    try:
-                        if CACHE_FILE.exists():
-                            CACHE_FILE.unlink()
-                    except Exception:
-                        pass
+            if messagebox.askyesno("Rescan", "Rescan all drives now? (This may take a while)", parent=get_root()):
+                scan = LiveScan()
+            installs = [r.path for r in load_cache_records()]
+            continue
+        if mode_action == "NOT_FOUND":
+            if not messagebox.askyesno("Not Found",
+                                       "No installations found automatically.\n\nSelect the game folder manually?",
+                                       parent=get_root()):
+                return
+            manual = ask_install_folder()
+            if not manual:
+                return
+            installs, scan = [manual], None
             continue
 
         if not mode_action:
             return
         if not selected:
             messagebox.showinfo(
-                "No Selection", "No installations selected.", parent=ROOT)
+                "No Selection", "No installations selected.", parent=get_root())
             return
 
-        # validate & prune cache
-        bad = [p for p in selected if not (Path(p) / GAME_EXE).exists()]
-        if bad:
-            messagebox.showerror("Invalid Selection",
-                                 "These paths do not contain BlackDesert64.exe:\n\n" +
-                                 "\n".join(bad),
-                                 parent=ROOT)
-            installs = [p for p in installs if p not in bad]
-            write_cache(installs)
-            continue
-
-        # UAC check + confirm
-        ensure_uac_for_paths(selected)
+        # Preflight (exe, write access, space, locks; UAC) + confirm
+        picked = preflight_with_report(selected, source, removing=mode_action == "REMOVE")
+        if not picked:
+            return
+        selected, elevated = picked
         if not messagebox.askyesno(
             "Confirm",
             f"Source:\n{source}\n\nAction: {mode_action}\n\nDestinations:\n" +
-                "\n".join(selected),
-            parent=ROOT
+                "\n".join(selected + [f"{r.path}  (administrator)" for r in elevated]),
+            parent=get_root()
         ):
             return
 
-        # Execute
-        if mode_action == "COPY":
-            total = copy_replace(source, selected)
-            messagebox.showinfo(
-                "Done", f"Copied/Replaced: {total}", parent=ROOT)
+        # Execute (once the game has exited, if the user chose to wait); the
+        # installs that need elevation go to an elevated instance afterwards.
+        if wait_for_game:
+            if not wait_for_game_exit_with_progress():
+                log.debug("[MAIN] Wait for game exit cancelled")
+                return
+            recover_interrupted_deploy_with_notice()
+        if selected:
+            run_action(mode_action, mode, source, selected)
+        if elevated and not hand_off_elevated(mode_action, mode, source, elevated, wait_for_game):
+            messagebox.showwarning(
+                "Not Elevated",
+                "These installations were not updated because administrator rights were not granted:\n\n" +
+                "\n".join(r.path for r in elevated),
+                parent=get_root())
+        return
+
+
+def run_action(mode_action: str, mode: str, source: DeploySource, paths: list[str]):
+    """Copy/Replace or Remove on the installs, then report and record the result."""
+    if mode_action == "COPY":
+        result = copy_replace_with_progress(source, paths)
+        if result.failed:
+            messagebox.showwarning(
+                "Done with errors",
+                result.summary() + "\n\n" + "\n".join(result.errors[:10]),
+                parent=get_root())
+        else:
+            messagebox.showinfo("Done", result.summary(), parent=get_root())
+        if not result.failed:
+            record_deploy(paths, mode)
+    else:
+        result = remove_matching(source, paths)
+        record_deploy(result.cleaned(paths), None)
+        if result.failed:
+            messagebox.showwarning(
+                "Done with errors",
+                result.summary() + "\n\n" + "\n".join(result.errors[:10]),
+                parent=get_root())
         else:
-            total = remove_matching(source, selected)
-            messagebox.showinfo("Done", f"Removed: {total}", parent=ROOT)
+            messagebox.showinfo("Done", result.summary(), parent=get_root())
+
+
+def main_elevated(handoff_file: str, key: str):
+    """
+    Entry point of the elevated instance: run the operation the unelevated
+    instance handed off, without asking for mode, source or installs again.
+    """
+    try:
+        handoff = read_handoff(handoff_file, key)
+    except HandoffError as e:
+        log.debug(f"[UAC] {e}")
+        messagebox.showerror("Elevation Failed",
+                             f"The pending operation could not be loaded:\n\n{e}", parent=get_root())
         return
+    source = handoff.source()
+    if source is None:
+        messagebox.showerror("Source Missing", f"No source found for '{handoff.mode}'.", parent=get_root())
+        return
+    log.debug(f"[UAC] Elevated: {handoff.action} {source} -> {handoff.paths}")
+
+    if is_process_running(GAME_EXE):
+        if not handoff.wait_for_game:
+            guard_game_not_running_or_exit(lambda: True)   # wait, or exit
+        if not wait_for_game_exit_with_progress():
+            log.debug("[MAIN] Wait for game exit cancelled")
+            return
+    recover_interrupted_deploy_with_notice()
+
+    # Probe again, now elevated; the report only shows up if something else is off
+    picked = preflight_with_report(handoff.paths, source, removing=handoff.action == "REMOVE")
+    if not picked or not picked[0]:
+        return
+    run_action(handoff.action, handoff.mode, source, picked[0])
 
 
 if __name__ == "__main__":
+    # Same executable, headless: `BDOVulkanUtility.exe deploy --mode Normal --all`
+    if len(sys.argv) > 1:
+        from bdo_vulkan_cli import is_cli_argv, main as cli_main
+        if is_cli_argv(sys.argv[1:]):
+            sys.exit(cli_main())
+    init_logging()
+    handoff = handoff_from_argv(sys.argv[1:])
     try:
-        main()
+        if handoff:
+            main_elevated(*handoff)
+        else:
+            main()
     finally:
-        try:
-            ROOT.destroy()
-        except Exception:
-            pass
+        stop_live_scans()
+        destroy_root()
+        write_trace()
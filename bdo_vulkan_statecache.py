@@ -0,0 +1,267 @@
+# bdo_vulkan_statecache.py
+"""
+DXVK state cache (BlackDesert64.dxvk-cache) handling: read and validate cache
+files, merge the entries of several installs (or of caches copied from other
+machines) into one store next to the app, and seed installs from that store so
+the game does not start with a cold pipeline cache after a reinstall or a
+preset switch.
+
+Files are streamed entry by entry; only the 20-byte hashes of the entries
+already written are kept in memory.
+
+Layout (state cache v8 and later; older versions used fixed-size entries and
+are dropped):
+    header   "DXVK", u32 version, u32 entry size (unused since v8)
+    entry    u32 stage mask (low 8 bits) | data size (high 24 bits),
+             sha1(data), data
+"""
+import hashlib
+import os
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from bdo_vulkan_core import APP_DIR, GAME_EXE, load_config, log, trace_count, trace_span
+
+STATE_CACHE_NAME = Path(GAME_EXE).stem + ".dxvk-cache"   # what DXVK writes next to the exe
+STATE_CACHE_STORE = APP_DIR / "bdovulkan_statecache.dxvk-cache"
+MAGIC = b"DXVK"
+MIN_VERSION = 8
+MAX_ENTRY_SIZE = 1 << 20   # real entries are a few KB; anything bigger is corruption
+
+_HEADER = struct.Struct("<4sII")
+_ENTRY = struct.Struct("<I20s")
+
+
+class StateCacheError(ValueError):
+    pass
+
+
+@dataclass
+class StateCacheInfo:
+    path: str
+    version: int = 0
+    entries: int = 0           # valid, unique entries
+    invalid: int = 0           # entries whose hash does not match their data
+    duplicates: int = 0
+    truncated: bool = False    # the file ends (or breaks off) inside an entry
+    added: int = 0             # merge: entries that were new to the destination
+    dropped: list[str] = field(default_factory=list)   # merge: inputs of another version, or unreadable
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def read_header(f) -> tuple[int, int]:
+    """(version, entry size) from the header at f's current position."""
+    raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise StateCacheError("file too short")
+    magic, version, entry_size = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise StateCacheError("not a DXVK state cache")
+    return version, entry_size
+
+
+def iter_entries(f, info: StateCacheInfo):
+    """
+    Yield (hash, raw entry) for each entry whose hash checks out, reading from
+    f's current position (just past the header). Entries with a bad hash are
+    counted in info.invalid and skipped; a size field that cannot be right
+    ends the walk (there is no way to find the next entry) with info.truncated.
+    """
+    while True:
+        head = f.read(_ENTRY.size)
+        if not head:
+            return
+        if len(head) < _ENTRY.size:
+            info.truncated = True
+            return
+        word, digest = _ENTRY.unpack(head)
+        size = word >> 8
+        data = f.read(size) if size <= MAX_ENTRY_SIZE else b""
+        if size > MAX_ENTRY_SIZE or len(data) < size:
+            info.truncated = True
+            return
+        if hashlib.sha1(data).digest() != digest:
+            info.invalid += 1
+            continue
+        yield digest, head + data
+
+
+def inspect_state_cache(path) -> StateCacheInfo:
+    """Version and entry counts of a cache file (raises OSError / StateCacheError)."""
+    info = StateCacheInfo(str(path))
+    with open(path, "rb") as f:
+        info.version, _ = read_header(f)
+        if info.version < MIN_VERSION:
+            return info
+        seen = set()
+        for digest, _ in iter_entries(f, info):
+            if digest in seen:
+                info.duplicates += 1
+            else:
+                seen.add(digest)
+                info.entries += 1
+    return info
+
+
+def _headers(paths) -> dict[Path, tuple[int, int]]:
+    out = {}
+    for p in paths:
+        try:
+            with open(p, "rb") as f:
+                out[Path(p)] = read_header(f)
+        except FileNotFoundError:
+            continue
+        except (OSError, StateCacheError) as e:
+            log.debug(f"[STATECACHE] Ignoring {p}: {e}")
+    return out
+
+
+def _copy_entries(out, sources: list[Path], seen: set, info: StateCacheInfo):
+    for src in sources:
+        with open(src, "rb") as f:
+            read_header(f)
+            for digest, raw in iter_entries(f, info):
+                if digest in seen:
+                    info.duplicates += 1
+                    continue
+                seen.add(digest)
+                out.write(raw)
+                info.added += 1
+
+
+def _scan_existing(path: Path, info: StateCacheInfo) -> tuple[set, int]:
+    """Hashes already in path and the offset just past its last complete entry."""
+    seen = set()
+    with open(path, "rb") as f:
+        read_header(f)
+        end = f.tell()
+        for digest, _ in iter_entries(f, info):
+            seen.add(digest)
+            end = f.tell()
+    return seen, end
+
+
+def merge_state_caches(dest, sources, version: int | None = None) -> StateCacheInfo:
+    """
+    Add every entry of `sources` that dest does not have yet to dest.
+
+    The result has one cache version: `version` if given, else the newest one
+    among dest and the sources. Inputs of any other version, or that are not
+    state caches at all, are dropped (and listed in info.dropped). When
+    dest already has that version, new entries are appended in place (as DXVK
+    itself does), after cutting off a half-written last entry; otherwise dest
+    is rewritten at that version.
+    """
+    dest = Path(dest)
+    info = StateCacheInfo(str(dest))
+    with trace_span("statecache.merge", dest=dest.name, sources=len(sources)):
+        headers = _headers([dest, *sources])
+        usable = [v for v, _ in headers.values() if v >= MIN_VERSION]
+        if version is None:
+            version = max(usable, default=0)
+        info.version = version
+        inputs = []
+        for src in sources:
+            src = Path(src)
+            if src == dest:
+                continue
+            if src not in headers:
+                if src.exists():
+                    info.dropped.append(str(src))
+                continue
+            if headers[src][0] != version or version < MIN_VERSION:
+                info.dropped.append(str(src))
+                log.debug(f"[STATECACHE] Dropping {src}: version {headers[src][0]}, want {version}")
+                continue
+            inputs.append(src)
+        if version < MIN_VERSION:
+            return info
+
+        if headers.get(dest, (None,))[0] == version:
+            seen, end = _scan_existing(dest, info)
+            info.truncated = False
+            with open(dest, "r+b") as out:
+                out.truncate(end)
+                out.seek(end)
+                _copy_entries(out, inputs, seen, info)
+        else:
+            if dest in headers:
+                info.dropped.append(str(dest))
+            seen = set()
+            entry_size = next((es for v, es in headers.values() if v == version), 0)
+            tmp = dest.with_name(dest.name + ".tmp")
+            with open(tmp, "wb") as out:
+                out.write(_HEADER.pack(MAGIC, version, entry_size))
+                _copy_entries(out, inputs, seen, info)
+            os.replace(tmp, dest)
+        info.entries = len(seen)
+        trace_count("statecache.entries_added", info.added)
+    log.debug(f"[STATECACHE] {dest}: +{info.added} entries, {info.entries} total (v{version})")
+    return info
+
+
+def prune_state_cache(path) -> StateCacheInfo:
+    """Rewrite a cache without duplicate, corrupt or truncated entries."""
+    path = Path(path)
+    info = StateCacheInfo(str(path))
+    with open(path, "rb") as f:
+        info.version, entry_size = read_header(f)
+    if info.version < MIN_VERSION:
+        raise StateCacheError(f"unsupported state cache version {info.version}")
+    seen = set()
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as out:
+        out.write(_HEADER.pack(MAGIC, info.version, entry_size))
+        _copy_entries(out, [path], seen, info)
+    os.replace(tmp, path)
+    info.entries, info.added = len(seen), 0
+    return info
+
+
+def install_cache_path(install: str) -> Path:
+    return Path(install) / STATE_CACHE_NAME
+
+
+def collect_state_caches(installs, extra=()) -> StateCacheInfo:
+    """Merge the caches of these installs (and any extra cache files) into the store."""
+    sources = [install_cache_path(i) for i in installs] + [Path(p) for p in extra]
+    return merge_state_caches(STATE_CACHE_STORE, sources)
+
+
+def seed_state_caches(installs) -> dict[str, StateCacheInfo]:
+    """
+    Add the store's entries to each install's cache, creating the cache where
+    there is none. An install whose cache has another version than the store
+    is left alone, since its DXVK could not read the other version.
+    """
+    out = {}
+    if not STATE_CACHE_STORE.exists():
+        return out
+    for install in installs:
+        dest = install_cache_path(install)
+        try:
+            have = _headers([dest]).get(dest)
+            out[install] = merge_state_caches(dest, [STATE_CACHE_STORE],
+                                              version=have[0] if have else None)
+        except OSError as e:
+            log.debug(f"[STATECACHE] Cannot seed {dest}: {e}")
+    return out
+
+
+def sync_state_caches(installs) -> dict[str, StateCacheInfo]:
+    """
+    Deploy hook: collect the installs' caches into the store, then seed every
+    install from it. Controlled by [statecache] seed (default on); never raises.
+    """
+    if not load_config().getboolean("statecache", "seed", fallback=True):
+        return {}
+    try:
+        with trace_span("statecache", installs=len(installs)):
+            collect_state_caches(installs)
+            return seed_state_caches(installs)
+    except Exception as e:
+        log.debug(f"[STATECACHE] Sync failed: {e}")
+        return {}
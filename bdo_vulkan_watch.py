@@ -0,0 +1,415 @@
+# bdo_vulkan_watch.py
+"""
+Watch mode: keep the deployed preset files in place across game patches.
+
+Black Desert patches overwrite or delete dxgi.dll / dxvk.conf. The watcher
+follows the files each cached install got from its last deploy (and its
+dxvk.local.conf), using native change notifications where there are some
+(inotify on Linux, ReadDirectoryChangesW on Windows) and polling otherwise.
+After a change it waits for the patcher's burst of writes to settle
+(debounce) and for the game and the launcher to exit, then redeploys the
+install's preset. The delta copy only rewrites the files that drifted.
+
+Between changes the watcher blocks in the OS (or sleeps between polls) and
+wakes once every WATCH_WAKE seconds to see if it should stop.
+"""
+import abc
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from bdo_vulkan_core import (
+    GAME_EXE, copy_replace, deploy_file_for, deploy_manifest, get_process_backend, is_up_to_date,
+    load_cache_records, load_config, log, preflight, record_deploy, resolve_source, trace_count,
+    trace_span,
+)
+
+WATCH_BACKENDS = ("auto", "native", "poll")
+WATCH_WAKE = 1.0                 # seconds; longest block before checking the stop flag
+WATCH_DEBOUNCE = 10.0            # seconds without changes before an install is checked
+WATCH_POLL_INTERVAL = 30.0       # seconds between stats with the polling backend
+WATCH_BUSY_RECHECK = 15.0        # seconds between checks while the game or launcher runs
+WATCH_BUSY_PROCESSES = (GAME_EXE, "BlackDesertLauncher.exe", "BlackDesertPatcher32.pae")
+LOCAL_CONF = "dxvk.local.conf"   # re-rendered into dxvk.conf when it changes
+
+
+# ==========================
+# Change notification backends
+# ==========================
+
+class Watcher(abc.ABC):
+    """Blocks until some of the watched files change; reports which."""
+    name = "base"
+
+    def __init__(self, files):
+        self.files = {os.path.normcase(os.path.abspath(f)) for f in files}
+        self.dirs = sorted({os.path.dirname(f) for f in self.files if os.path.isdir(os.path.dirname(f))})
+
+    @abc.abstractmethod
+    def wait(self, timeout: float) -> set[str]:
+        """Watched paths that changed within timeout seconds (empty if none did)."""
+
+    def close(self):
+        pass
+
+    def _in_dir(self, folder: str, name: str | None) -> set[str]:
+        if not name:   # the folder itself, or the event queue overflowed
+            return {f for f in self.files if os.path.dirname(f) == folder}
+        path = os.path.normcase(os.path.join(folder, name))
+        return {path} if path in self.files else set()
+
+
+class PollingWatcher(Watcher):
+    name = "poll"
+
+    def __init__(self, files, interval: float = WATCH_POLL_INTERVAL):
+        super().__init__(files)
+        self.interval = interval
+        self._seen = self._stat_all()
+        self._next = time.monotonic() + interval
+
+    def _stat_all(self) -> dict[str, tuple | None]:
+        out = {}
+        for f in self.files:
+            try:
+                st = os.stat(f)
+                out[f] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                out[f] = None
+        return out
+
+    def wait(self, timeout: float) -> set[str]:
+        delay = self._next - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(0.0, delay))
+        self._next = time.monotonic() + self.interval
+        now = self._stat_all()
+        changed = {f for f, sig in now.items() if self._seen.get(f) != sig}
+        self._seen = now
+        return changed
+
+
+class InotifyWatcher(Watcher):
+    """Linux: one inotify watch per folder that holds watched files."""
+    name = "inotify"
+    IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+    IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+    IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW = 0x400, 0x800, 0x4000
+    IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+
+    def __init__(self, files):
+        super().__init__(files)
+        import ctypes
+        import ctypes.util
+        import struct
+        self._event = struct.Struct("iIII")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (self.IN_MODIFY | self.IN_ATTRIB | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM
+                | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE | self.IN_DELETE_SELF
+                | self.IN_MOVE_SELF)
+        self._dirs = {}
+        for d in self.dirs:
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(d), mask)
+            if wd < 0:
+                os.close(self._fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {d}")
+            self._dirs[wd] = d
+
+    def wait(self, timeout: float) -> set[str]:
+        import select
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed, off = set(), 0
+        while off + self._event.size <= len(data):
+            wd, mask, _, length = self._event.unpack_from(data, off)
+            off += self._event.size
+            name = data[off:off + length].split(b"\0", 1)[0]
+            off += length
+            if mask & self.IN_Q_OVERFLOW:
+                return set(self.files)
+            folder = self._dirs.get(wd)
+            if folder is not None:
+                self_event = mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF)
+                changed |= self._in_dir(folder, None if self_event else os.fsdecode(name))
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class ReadDirectoryChangesWatcher(Watcher):
+    """Windows: a thread per folder blocked in ReadDirectoryChangesW."""
+    name = "readdirectorychanges"
+    FILE_LIST_DIRECTORY = 0x0001
+    SHARE_ALL = 0x7
+    OPEN_EXISTING = 3
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+    # FILE_NAME | DIR_NAME | SIZE | LAST_WRITE
+    NOTIFY_FILTER = 0x1 | 0x2 | 0x8 | 0x10
+
+    def __init__(self, files):
+        super().__init__(files)
+        import ctypes
+        from ctypes import wintypes
+        k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        k32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                    wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+        k32.CreateFileW.restype = wintypes.HANDLE
+        k32.ReadDirectoryChangesW.argtypes = [
+            wintypes.HANDLE, wintypes.LPVOID, wintypes.DWORD, wintypes.BOOL, wintypes.DWORD,
+            ctypes.POINTER(wintypes.DWORD), wintypes.LPVOID, wintypes.LPVOID]
+        k32.ReadDirectoryChangesW.restype = wintypes.BOOL
+        k32.OpenThread.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+        k32.OpenThread.restype = wintypes.HANDLE
+        k32.CancelSynchronousIo.argtypes = [wintypes.HANDLE]
+        k32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._ctypes, self._wintypes, self._k32 = ctypes, wintypes, k32
+        self._queue: queue.Queue = queue.Queue()
+        self._handles = []
+        self._threads: list[int] = []   # native ids of the readers, to cancel their blocking call
+        self._closed = False
+        invalid = wintypes.HANDLE(-1).value
+        for d in self.dirs:
+            h = k32.CreateFileW(d, self.FILE_LIST_DIRECTORY, self.SHARE_ALL, None, self.OPEN_EXISTING,
+                                self.FILE_FLAG_BACKUP_SEMANTICS, None)
+            if h == invalid:
+                self.close()
+                raise OSError(ctypes.get_last_error(), f"cannot watch {d}")
+            self._handles.append(h)
+            threading.Thread(target=self._read, args=(h, d), name="bdo-watch", daemon=True).start()
+
+    def _read(self, handle, folder: str):
+        import struct
+        self._threads.append(threading.get_native_id())
+        buf = self._ctypes.create_string_buffer(64 * 1024)
+        returned = self._wintypes.DWORD()
+        while not self._closed and self._k32.ReadDirectoryChangesW(
+                handle, buf, len(buf), False, self.NOTIFY_FILTER, self._ctypes.byref(returned), None, None):
+            if not returned.value:   # the buffer overflowed
+                self._queue.put(self._in_dir(folder, None))
+                continue
+            raw, off, changed = buf.raw[:returned.value], 0, set()
+            while True:
+                next_off, _, length = struct.unpack_from("<III", raw, off)
+                changed |= self._in_dir(folder, raw[off + 12:off + 12 + length].decode("utf-16-le"))
+                if not next_off:
+                    break
+                off += next_off
+            self._queue.put(changed)
+        if not self._closed:   # the folder is gone: report it once
+            self._queue.put(self._in_dir(folder, None))
+
+    def wait(self, timeout: float) -> set[str]:
+        try:
+            changed = set(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return set()
+        while True:
+            try:
+                changed |= self._queue.get_nowait()
+            except queue.Empty:
+                return changed
+
+    def close(self):
+        self._closed = True
+        THREAD_TERMINATE = 0x0001   # the access CancelSynchronousIo needs
+        for tid in self._threads:
+            th = self._k32.OpenThread(THREAD_TERMINATE, False, tid)
+            if th:
+                self._k32.CancelSynchronousIo(th)
+                self._k32.CloseHandle(th)
+        for h in self._handles:
+            self._k32.CloseHandle(h)
+        self._handles = []
+
+
+def make_watcher(files, backend: str = "auto", poll_interval: float = WATCH_POLL_INTERVAL) -> Watcher:
+    """A native watcher for files where the platform has one (unless backend="poll"), else polling."""
+    if backend != "poll":
+        native = {"nt": ReadDirectoryChangesWatcher}.get(os.name) or (
+            InotifyWatcher if os.path.exists("/proc/sys/fs/inotify") else None)
+        if native is not None:
+            try:
+                return native(files)
+            except OSError as e:
+                if backend == "native":
+                    raise
+                log.debug(f"[WATCH] {native.name} unavailable, polling instead: {e}")
+        elif backend == "native":
+            raise OSError("no native change notifications on this platform")
+    return PollingWatcher(files, poll_interval)
+
+
+# ==========================
+# Watch loop
+# ==========================
+
+def _busy(processes) -> str | None:
+    """The first of processes that is running, if any."""
+    backend = get_process_backend()
+    for name in processes:
+        try:
+            if backend.pids(name):
+                return name
+        except Exception as e:
+            log.debug(f"[WATCH] Cannot check {name}: {e}")
+    return None
+
+
+def drifted_files(source, install: str) -> list[str]:
+    """The preset files that are missing or differ in install (dxvk.conf as rendered for it)."""
+    out = []
+    for base_sf in deploy_manifest(source):
+        src, sf = deploy_file_for(source, base_sf, install)
+        try:
+            if not is_up_to_date(src, sf, Path(install) / sf.rel):
+                out.append(sf.rel)
+        except OSError:
+            out.append(sf.rel)
+    return out
+
+
+class InstallWatch:
+    """
+    Redeploys each watched install's last preset when its files drift.
+    on_event(kind, install, detail) is called with kind "watching", "changed",
+    "waiting", "redeployed", "failed" or "up_to_date".
+    """
+
+    def __init__(self, installs=None, backend: str = "auto", debounce: float | None = None,
+                 poll_interval: float | None = None, busy_processes=None, on_event=None):
+        cfg = load_config()
+        self.backend = backend if backend != "auto" else cfg.get("watch", "backend", fallback="auto")
+        self.debounce = debounce if debounce is not None else cfg.getfloat(
+            "watch", "debounce", fallback=WATCH_DEBOUNCE)
+        self.poll_interval = poll_interval if poll_interval is not None else cfg.getfloat(
+            "watch", "poll_interval", fallback=WATCH_POLL_INTERVAL)
+        if busy_processes is None:
+            raw = cfg.get("watch", "busy_processes", fallback="")
+            busy_processes = [p.strip() for p in raw.replace("\n", ",").split(",") if p.strip()]
+        self.busy_processes = tuple(busy_processes) or WATCH_BUSY_PROCESSES
+        self.installs = installs
+        self.on_event = on_event or (lambda kind, install, detail: None)
+        self.stop_event = threading.Event()
+        self._sources = {}
+
+    def stop(self):
+        self.stop_event.set()
+
+    def targets(self) -> dict[str, tuple]:
+        """{install: (preset, source)} of the cached installs to watch: those with a recorded preset."""
+        wanted = set(self.installs) if self.installs is not None else None
+        out = {}
+        for rec in load_cache_records():
+            if not rec.preset or (wanted is not None and rec.path not in wanted):
+                continue
+            if not (Path(rec.path) / GAME_EXE).exists():
+                continue
+            if rec.preset not in self._sources:
+                self._sources[rec.preset] = resolve_source(rec.preset)
+            if self._sources[rec.preset] is not None:
+                out[rec.path] = (rec.preset, self._sources[rec.preset])
+        return out
+
+    def _watched_files(self, targets) -> dict[str, str]:
+        """{normalized file path: install} of everything whose change matters."""
+        out = {}
+        for install, (_, source) in targets.items():
+            rels = {sf.rel for sf in deploy_manifest(source)} | {LOCAL_CONF}
+            for rec in load_cache_records():
+                if rec.path == install:
+                    rels |= set(rec.owned)
+            for rel in rels:
+                out[os.path.normcase(os.path.abspath(Path(install) / rel))] = install
+        return out
+
+    def _redeploy(self, install: str, preset: str, source) -> bool:
+        drift = drifted_files(source, install)
+        if not drift:
+            self.on_event("up_to_date", install, preset)
+            return False
+        check = preflight([install], source)[0]
+        if not check.ok:
+            self.on_event("failed", install, "; ".join(check.problems()))
+            return False
+        result = copy_replace(source, [install], seed_cache=False)
+        if result.failed:
+            self.on_event("failed", install, "; ".join(result.errors))
+            return False
+        record_deploy([install], preset)
+        trace_count("watch.redeploys")
+        self.on_event("redeployed", install, ", ".join(drift))
+        return True
+
+    def run(self, duration: float | None = None) -> int:
+        """
+        Watch until stop() (or for duration seconds); blocks the calling thread.
+        Returns the number of installs watched (0 right away if there are none).
+        """
+        end = time.monotonic() + duration if duration is not None else None
+        targets = self.targets()
+        if not targets:
+            return 0
+        owner = self._watched_files(targets)
+        watcher = make_watcher(owner, self.backend, self.poll_interval)
+        log.debug(f"[WATCH] {len(targets)} install(s), {len(owner)} file(s), backend {watcher.name}")
+        for install, (preset, _) in targets.items():
+            self.on_event("watching", install, f"{preset} ({watcher.name})")
+        # Files may have drifted while nothing was watching: check everything once.
+        pending = {install: time.monotonic() for install in targets}
+        waiting_for = None
+        try:
+            while not self.stop_event.is_set():
+                now = time.monotonic()
+                if end is not None and now >= end:
+                    break
+                timeout = WATCH_WAKE
+                if pending:
+                    timeout = min(timeout, max(0.0, min(pending.values()) - now))
+                for path in watcher.wait(timeout):
+                    install = owner.get(path)
+                    if install:
+                        if install not in pending:
+                            self.on_event("changed", install, path)
+                        pending[install] = time.monotonic() + self.debounce
+
+                now = time.monotonic()
+                due = [i for i, t in pending.items() if t <= now]
+                if not due:
+                    continue
+                busy = _busy(self.busy_processes)
+                if busy:
+                    if busy != waiting_for:
+                        self.on_event("waiting", "", f"{busy} is running")
+                    waiting_for = busy
+                    for install in due:
+                        pending[install] = now + WATCH_BUSY_RECHECK
+                    continue
+                waiting_for = None
+                with trace_span("watch.check", installs=len(due)):
+                    for install in due:
+                        del pending[install]
+                        preset, source = targets[install]
+                        try:
+                            self._redeploy(install, preset, source)
+                        except Exception as e:
+                            log.debug(f"[WATCH] Redeploy of {install} failed: {e}")
+                            self.on_event("failed", install, str(e))
+                # Folders may have been recreated by the patcher (or by the redeploy): start
+                # over on fresh handles, which also drops the events of our own writes.
+                watcher.close()
+                watcher = make_watcher(owner, self.backend, self.poll_interval)
+        finally:
+            watcher.close()
+        return len(targets)
@@ -0,0 +1,442 @@
+# benchmarks/bench_hotpaths.py
+"""
+Throughput benchmark for the scan, cache and deploy hot paths.
+
+Builds a reproducible synthetic "drive" (same --seed, same tree) under a work
+directory, tmpfs by default:
+  - --dirs directories in a random tree of average --fanout, --files-per-dir
+    small files each
+  - BlackDesert64.exe installs planted at --install-depths, plus one at a
+    common quick-search location (Program Files/BlackDesert)
+  - skip-listed subtrees (Windows, $Recycle.Bin) holding ~10% of the dirs and
+    an exe that must NOT be found
+  - --junk-share of the dirs in trees the default [scan] rules prune
+    (node_modules, .git, AppData/Local/Temp) but the old fixed skip list did not
+  - --decoys install-looking folders without an exe
+  - --targets fake install roots used as deploy targets and cache entries
+  - a synthetic preset of --preset-mb spread over a few dll/conf files
+    (copy_replace_pack deploys the repo's real assets/Normal from a preset
+    pack instead, since random bytes do not compress)
+
+Each case runs --repeat times, each run in a fresh interpreter so peak RSS is
+per case. The app-dir files (install cache, scan index, deploy journal,
+manifest and digest caches) are redirected into the work directory (the
+config too, so the default [scan] rules apply), quick-search paths use '/'
+instead of '\\', and the process backend is replaced by one that sees no
+game; none of the measured paths reach ctypes.windll, tasklist or Tk on Linux.
+
+    python benchmarks/bench_hotpaths.py
+    python benchmarks/bench_hotpaths.py --dirs 1000000 --keep --work /dev/shm/bdo-bench
+    python benchmarks/bench_hotpaths.py --save hotpaths_baseline.json
+    python benchmarks/bench_hotpaths.py --compare hotpaths_baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+GAME_EXE = "BlackDesert64.exe"
+SKIP_NAMES = ("Windows", "$Recycle.Bin")
+JUNK_PARENTS = ("Users/dev/projects/app/node_modules", "Users/dev/projects/app/.git",
+                "Users/dev/AppData/Local/Temp")
+MANIFEST = "tree.json"
+TREE_VERSION = 2
+PRESET_FILES = (("dxgi.dll", 0.45), ("d3d11.dll", 0.45), ("d3d10core.dll", 0.0995),
+                ("dxvk.conf", 0.0005))
+
+CASES = ("quick_search", "deep_scan", "deep_scan_unpruned", "deep_scan_first",
+         "deep_scan_indexed", "scan_stream", "load_cache",
+         "copy_replace", "copy_replace_delta", "copy_replace_pack", "fleet", "remove_matching", "verify",
+         "verify_cached")
+
+
+# ==========================
+# Synthetic tree
+# ==========================
+
+def _grow(top: str, budget: int, fanout: int, files_per_dir: int, rng: random.Random):
+    """Breadth-first random tree of `budget` dirs under top; returns (levels, files)."""
+    levels, made, files = [[top]], 0, 0
+    while made < budget:
+        nxt = []
+        for parent in levels[-1]:
+            for i in range(rng.randint(1, 2 * fanout - 1)):
+                if made >= budget:
+                    break
+                d = os.path.join(parent, f"d{i:03d}")
+                os.mkdir(d)
+                for j in range(files_per_dir):
+                    open(os.path.join(d, f"f{j}.dat"), "wb").close()
+                made += 1
+                files += files_per_dir
+                nxt.append(d)
+            if made >= budget:
+                break
+        levels.append(nxt)
+    return levels, files
+
+
+def _plant(folder: str) -> str:
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, GAME_EXE), "wb") as f:
+        f.write(b"MZ")
+    return folder
+
+
+def generate_tree(work: Path, params: dict) -> dict:
+    rng = random.Random(params["seed"])
+    drive = str(work / "drive")
+    os.makedirs(drive)
+    fanout, fpd = params["fanout"], params["files_per_dir"]
+
+    skip_budget = params["dirs"] // 10
+    junk_budget = int(params["dirs"] * params["junk_share"])
+    levels, files = _grow(drive, params["dirs"] - skip_budget - junk_budget, fanout, fpd, rng)
+    dirs = params["dirs"] - skip_budget - junk_budget
+
+    # Pruned by the default rules only: counted separately for the unpruned case.
+    junk_dirs = junk_files = 0
+    for rel in JUNK_PARENTS:
+        top = os.path.join(drive, *rel.split("/"))
+        os.makedirs(top)
+        junk_dirs += 1
+        _, f = _grow(top, junk_budget // len(JUNK_PARENTS), fanout, fpd, rng)
+        junk_dirs += junk_budget // len(JUNK_PARENTS)
+        junk_files += f
+    dirs += 6   # Users, dev, projects, app, AppData, Local: walked, not pruned
+
+    skipped = []
+    for name in SKIP_NAMES:
+        top = os.path.join(drive, name)
+        os.mkdir(top)
+        sub, _ = _grow(top, skip_budget // len(SKIP_NAMES), fanout, fpd, rng)
+        skipped.append(_plant(os.path.join(rng.choice(sub[-1]), "BlackDesert")))
+
+    installs = []
+    for depth in params["install_depths"]:
+        parent = rng.choice(levels[min(depth, len(levels) - 1)])
+        installs.append(_plant(os.path.join(parent, f"BlackDesert{len(installs)}")))
+    installs.append(_plant(os.path.join(drive, "Program Files", "BlackDesert")))
+    dirs += len(installs) + 1   # + Program Files
+    files += len(installs)
+
+    for i in range(params["decoys"]):
+        os.mkdir(os.path.join(rng.choice(rng.choice(levels)), f"PearlAbyss{i}"))
+    dirs += params["decoys"]
+
+    targets = [_plant(str(work / "targets" / f"install{i:04d}")) for i in range(params["targets"])]
+
+    preset = work / "preset"
+    preset.mkdir()
+    preset_bytes = 0
+    for name, share in PRESET_FILES:
+        size = max(1, int(params["preset_mb"] * (1 << 20) * share))
+        (preset / name).write_bytes(rng.randbytes(size))
+        preset_bytes += size
+
+    return {"version": TREE_VERSION, "params": params, "drive": drive,
+            "dirs": dirs, "files": files, "junk_dirs": junk_dirs, "junk_files": junk_files,
+            "installs": sorted(installs),
+            "skipped_installs": skipped, "targets": targets,
+            "preset": str(preset), "preset_files": len(PRESET_FILES),
+            "preset_bytes": preset_bytes}
+
+
+def ensure_tree(work: Path, params: dict) -> dict:
+    mf = work / MANIFEST
+    if mf.exists():
+        manifest = json.loads(mf.read_text(encoding="utf-8"))
+        if manifest.get("version") == TREE_VERSION and manifest.get("params") == params:
+            return manifest
+        shutil.rmtree(work)
+    work.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    manifest = generate_tree(work, params)
+    manifest["generate_seconds"] = time.perf_counter() - t0
+    mf.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+# ==========================
+# Cases (run in a child interpreter)
+# ==========================
+
+def _isolate(core, work: Path, manifest: dict):
+    class NoGame(core.ProcessBackend):
+        def pids(self, image_name):
+            return []
+
+        def is_alive(self, pid):
+            return False
+
+    core.CONFIG_FILE = work / "config.ini"
+    core.CACHE_FILE = work / "installs.json"
+    core.LEGACY_CACHE_FILE = work / "installs.txt"
+    core.SCAN_INDEX_FILE = work / "scanindex.bin"
+    core.DEPLOY_JOURNAL_FILE = work / "deploy.journal"
+    core.MANIFEST_FILE = work / "manifests.json"
+    core.DIGEST_CACHE_FILE = work / "digests.json"
+    core.COMMON_RELATIVE_PATHS = [p.replace("\\", "/") for p in core.COMMON_RELATIVE_PATHS]
+    core.get_drives = lambda: [manifest["drive"]]
+    core.set_process_backend(NoGame())
+
+
+def _clean_targets(core, manifest: dict):
+    core.remove_matching(manifest["preset"], manifest["targets"])
+
+
+def run_case(case: str, work: Path) -> dict:
+    import resource
+    from concurrent.futures import ThreadPoolExecutor
+    import bdo_vulkan_core as core
+
+    manifest = json.loads((work / MANIFEST).read_text(encoding="utf-8"))
+    _isolate(core, work, manifest)
+    drive, targets = manifest["drive"], manifest["targets"]
+    deploy_files = manifest["preset_files"] * len(targets)
+    deploy_bytes = manifest["preset_bytes"] * len(targets)
+    out = {}
+
+    if case == "quick_search":
+        rounds = 200
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            found = core.quick_search_on_drive(drive)
+        seconds = time.perf_counter() - t0
+        out.update(probes=rounds * len(core.COMMON_RELATIVE_PATHS),
+                   ok=found == [os.path.join(drive, "Program Files", "BlackDesert")])
+    elif case == "deep_scan":
+        t0 = time.perf_counter()
+        found = core.deep_scan_drive(drive)
+        seconds = time.perf_counter() - t0
+        out.update(dirs=manifest["dirs"], files=manifest["files"],
+                   ok=sorted(found) == manifest["installs"])
+    elif case == "deep_scan_unpruned":
+        # Only the original fixed skip list: what the pruning rules save.
+        rules = core.ScanRules(skip=tuple(core.SKIP_DIRS), max_depth=0, max_entries=0, priority=())
+        t0 = time.perf_counter()
+        found = core.deep_scan_drive(drive, rules=rules)
+        seconds = time.perf_counter() - t0
+        out.update(dirs=manifest["dirs"] + manifest["junk_dirs"],
+                   files=manifest["files"] + manifest["junk_files"],
+                   ok=sorted(found) == manifest["installs"])
+    elif case == "deep_scan_first":
+        rules = core.ScanRules(stop_after=1)
+        t0 = time.perf_counter()
+        found = core.deep_scan_drive(drive, rules=rules)
+        seconds = time.perf_counter() - t0
+        out.update(ok=len(found) >= 1 and set(found) <= set(manifest["installs"]))
+    elif case == "deep_scan_indexed":
+        with ThreadPoolExecutor(max_workers=core.SCAN_WORKERS) as pool:
+            first = core.TreeScanner(drive, pool, build_index=True).start()
+            first.wait()
+            t0 = time.perf_counter()
+            again = core.TreeScanner(drive, pool, index=first.new_index).start()
+            again.wait()
+            seconds = time.perf_counter() - t0
+        out.update(dirs=manifest["dirs"], reused_dirs=again.reused_dirs,
+                   ok=sorted(again.results()) == manifest["installs"])
+    elif case == "scan_stream":
+        # The whole pipeline as the selection dialog consumes it: when the first install shows up.
+        rules = core.ScanRules(deep_scan="always")
+        found, first = [], None
+        t0 = time.perf_counter()
+        for path, _ in core.iter_scan_installs(rules=rules):
+            if first is None:
+                first = time.perf_counter() - t0
+            found.append(path)
+        seconds = time.perf_counter() - t0
+        out.update(dirs=manifest["dirs"], first_result_seconds=first,
+                   ok=sorted(set(found)) == manifest["installs"] and len(found) == len(set(found)))
+    elif case == "load_cache":
+        # Every target plus as many paths that no longer exist.
+        missing = [str(work / "gone" / f"install{i:04d}") for i in range(len(targets))]
+        core.write_cache(targets + missing)
+        t0 = time.perf_counter()
+        valid = core.load_cache()
+        seconds = time.perf_counter() - t0
+        out.update(records=len(targets) + len(missing), ok=sorted(valid) == sorted(targets))
+    elif case in ("copy_replace", "copy_replace_delta"):
+        _clean_targets(core, manifest)
+        if case == "copy_replace_delta":
+            core.copy_replace(manifest["preset"], targets)
+        t0 = time.perf_counter()
+        result = core.copy_replace(manifest["preset"], targets)
+        seconds = time.perf_counter() - t0
+        if case == "copy_replace":
+            out.update(files=deploy_files, bytes=deploy_bytes,
+                       ok=result.copied == deploy_files and not result.failed)
+        else:
+            out.update(files=deploy_files, ok=result.skipped == deploy_files)
+    elif case == "copy_replace_pack":
+        from bdo_vulkan_assetstore import PackSource, build_pack
+        pack = work / "presets.pack"
+        if not pack.exists():
+            build_pack(pack, {"Normal": str(REPO / "assets" / "Normal")})
+        source = PackSource(pack, "Normal")
+        pack_files = len(source.files()) * len(targets)
+        _clean_targets(core, manifest)
+        t0 = time.perf_counter()
+        result = core.copy_replace(source, targets)
+        seconds = time.perf_counter() - t0
+        core.remove_matching(source, targets)
+        out.update(files=pack_files, bytes=sum(sf.size for sf in source.files()) * len(targets),
+                   ok=result.copied == pack_files and not result.failed)
+    elif case == "fleet":
+        # Every target as its own inventory entry and transaction, 8 at a time.
+        from bdo_vulkan_fleet import Fleet, load_inventory
+        inventory = work / "fleet.ini"
+        inventory.write_text(f"[fleet]\nconcurrency = 8\nsource = {manifest['preset']}\n\n" + "".join(
+            f"[t{i}]\npath = {t}\n\n" for i, t in enumerate(targets)), encoding="utf-8")
+        _clean_targets(core, manifest)
+        t0 = time.perf_counter()
+        report = Fleet(load_inventory(inventory), resume=False).run()
+        seconds = time.perf_counter() - t0
+        out.update(files=deploy_files, bytes=deploy_bytes,
+                   ok=report.ok and sum(o.copied for o in report.outcomes) == deploy_files)
+    elif case == "remove_matching":
+        core.copy_replace(manifest["preset"], targets)
+        t0 = time.perf_counter()
+        result = core.remove_matching(manifest["preset"], targets)
+        seconds = time.perf_counter() - t0
+        out.update(files=deploy_files, ok=result.removed == deploy_files and not result.failed)
+    elif case in ("verify", "verify_cached"):
+        # Hash every deployed file (cold), or with the digests of a previous run on disk.
+        core.copy_replace(manifest["preset"], targets)
+        sources = {"Bench": core.DirectorySource(manifest["preset"])}
+        core.DIGEST_CACHE_FILE.unlink(missing_ok=True)
+        if case == "verify_cached":
+            core.verify_installs(targets, sources)
+        core._DIGEST_CACHE.clear()
+        core._DIGEST_STATE.update(loaded=False, dirty=False)
+        t0 = time.perf_counter()
+        statuses = core.verify_installs(targets, sources)
+        seconds = time.perf_counter() - t0
+        out.update(files=deploy_files,
+                   ok=len(statuses) == len(targets) and all(
+                       st.preset == "Bench" and not st.modified and not st.missing for st in statuses))
+        if case == "verify":
+            out.update(bytes=deploy_bytes)
+    else:
+        raise SystemExit(f"unknown case {case}")
+
+    out["seconds"] = seconds
+    out["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return out
+
+
+# ==========================
+# Driver
+# ==========================
+
+def _child(case: str, work: Path) -> dict:
+    proc = subprocess.run([sys.executable, __file__, "--run-case", case, "--work", str(work)],
+                          capture_output=True, text=True, cwd=REPO, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure(work: Path, manifest: dict, cases: list[str], repeat: int) -> dict:
+    report = {"python": sys.version.split()[0], "platform": sys.platform,
+              "tree": {k: manifest[k] for k in ("params", "dirs", "files", "preset_bytes")},
+              "cases": {}, "failures": []}
+    for case in cases:
+        runs = [_child(case, work) for _ in range(repeat)]
+        seconds = statistics.median(r["seconds"] for r in runs)
+        row = {"seconds": seconds, "peak_rss_kb": max(r["peak_rss_kb"] for r in runs)}
+        for key in ("dirs", "files", "bytes", "probes", "records"):
+            if key in runs[0]:
+                row[f"{key}_per_s"] = runs[0][key] / seconds if seconds else None
+        if "reused_dirs" in runs[0]:
+            row["reused_dirs"] = runs[0]["reused_dirs"]
+        if "first_result_seconds" in runs[0]:
+            row["first_result_seconds"] = statistics.median(r["first_result_seconds"] for r in runs)
+        row["ok"] = all(r["ok"] for r in runs)
+        if not row["ok"]:
+            report["failures"].append(f"{case}: wrong result")
+        report["cases"][case] = row
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    if baseline.get("tree", {}).get("params") != report["tree"]["params"]:
+        return ["baseline was measured on a different tree; rerun with the same options"]
+    regressions = []
+    for case, base in baseline.get("cases", {}).items():
+        now = report["cases"].get(case)
+        if now and now["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append(f"{case}: {now['seconds'] * 1000:.1f} ms "
+                               f"vs baseline {base['seconds'] * 1000:.1f} ms")
+    return regressions
+
+
+def _default_root() -> str | None:
+    return "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--dirs", type=int, default=10_000, help="directories in the tree (10^4..10^6)")
+    ap.add_argument("--fanout", type=int, default=8)
+    ap.add_argument("--files-per-dir", type=int, default=2)
+    ap.add_argument("--install-depths", default="2,4,6",
+                    help="comma-separated depths for planted installs")
+    ap.add_argument("--decoys", type=int, default=50)
+    ap.add_argument("--junk-share", type=float, default=0.3,
+                    help="share of dirs in trees the default scan rules prune")
+    ap.add_argument("--targets", type=int, default=20, help="fake install roots to deploy into")
+    ap.add_argument("--preset-mb", type=float, default=8.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--cases", default=",".join(CASES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--work", metavar="DIR",
+                    help="tree location; reused across runs when the options match")
+    ap.add_argument("--keep", action="store_true", help="keep a temporary work dir")
+    ap.add_argument("--save", metavar="FILE", help="write the report as a new baseline")
+    ap.add_argument("--compare", metavar="FILE", help="fail if slower than this baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="allowed slowdown vs baseline (fraction, default 0.25)")
+    ap.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, Path(args.work))))
+        return 0
+
+    params = {"dirs": args.dirs, "fanout": args.fanout, "files_per_dir": args.files_per_dir,
+              "install_depths": [int(d) for d in args.install_depths.split(",") if d],
+              "decoys": args.decoys, "junk_share": args.junk_share, "targets": args.targets,
+              "preset_mb": args.preset_mb, "seed": args.seed}
+    temporary = not args.work
+    work = Path(args.work or tempfile.mkdtemp(prefix="bdo-bench-", dir=_default_root()))
+    try:
+        manifest = ensure_tree(work, params)
+        report = measure(work, manifest, [c for c in args.cases.split(",") if c], args.repeat)
+    finally:
+        if temporary and not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+        elif temporary:
+            print(f"tree kept in {work}", file=sys.stderr)
+
+    failures = list(report["failures"])
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        report["regressions"] = compare(report, baseline, args.tolerance)
+        failures += report["regressions"]
+    print(json.dumps(report, indent=2))
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
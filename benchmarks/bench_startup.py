@@ -0,0 +1,121 @@
+# benchmarks/bench_startup.py
+"""
+Startup-time benchmark and regression guard.
+
+Every sample runs in a fresh interpreter and measures:
+  - import time of bdo_vulkan_core, bdo_vulkan_cli and bdo_vulkan_manager
+  - time to first window: import the GUI module, create the hidden root and the
+    first Toplevel, flush it with update_idletasks(). The window is withdrawn,
+    so nothing is shown; it is reported as null when Tk has no display.
+It also fails if an import drags in modules that belong to a later code path
+(tkinter for the headless modules, subprocess/configparser/zipfile/ctypes for all).
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --save startup_baseline.json
+    python benchmarks/bench_startup.py --compare startup_baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+# Modules that must not be imported just by importing each of ours.
+FORBIDDEN = {
+    "bdo_vulkan_core": ["tkinter", "subprocess", "configparser", "zipfile", "ctypes"],
+    "bdo_vulkan_cli": ["tkinter", "subprocess", "configparser", "zipfile", "ctypes"],
+    "bdo_vulkan_manager": ["subprocess", "configparser", "zipfile", "ctypes"],
+}
+
+IMPORT_SNIPPET = """
+import sys, time, json
+sys.path.insert(0, {repo!r})
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+print(json.dumps({{"seconds": t1 - t0, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+WINDOW_SNIPPET = """
+import sys, time, json
+sys.path.insert(0, {repo!r})
+t0 = time.perf_counter()
+import bdo_vulkan_manager as gui
+try:
+    w = gui.new_window("startup benchmark", geometry=(200, 100))
+    w.withdraw()
+    w.update_idletasks()
+    t1 = time.perf_counter()
+    gui.destroy_root()
+    print(json.dumps({{"seconds": t1 - t0}}))
+except Exception as e:   # no display
+    print(json.dumps({{"seconds": None, "error": str(e)}}))
+"""
+
+
+# Bytecode caching on, like a real install; the first (warm-up) run writes the .pyc files.
+_ENV = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+
+
+def _run(snippet: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True,
+                         text=True, cwd=REPO, env=_ENV, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(samples: int) -> dict:
+    report = {"python": sys.version.split()[0], "samples": samples, "metrics": {}, "violations": []}
+    for module, forbidden in FORBIDDEN.items():
+        _run(IMPORT_SNIPPET.format(repo=str(REPO), module=module, forbidden=forbidden))  # warm-up
+        runs = [_run(IMPORT_SNIPPET.format(repo=str(REPO), module=module, forbidden=forbidden))
+                for _ in range(samples)]
+        report["metrics"][f"import_{module}"] = statistics.median(r["seconds"] for r in runs)
+        for name in sorted({m for r in runs for m in r["loaded"]}):
+            report["violations"].append(f"importing {module} loads {name}")
+
+    runs = [_run(WINDOW_SNIPPET.format(repo=str(REPO))) for _ in range(samples)]
+    times = [r["seconds"] for r in runs if r["seconds"] is not None]
+    report["metrics"]["first_window"] = statistics.median(times) if times else None
+    if not times:
+        report["first_window_skipped"] = runs[0].get("error")
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, base in baseline.get("metrics", {}).items():
+        now = report["metrics"].get(name)
+        if base is None or now is None:
+            continue
+        if now > base * (1 + tolerance):
+            regressions.append(f"{name}: {now * 1000:.1f} ms vs baseline {base * 1000:.1f} ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--samples", type=int, default=7)
+    ap.add_argument("--save", metavar="FILE", help="write the report as a new baseline")
+    ap.add_argument("--compare", metavar="FILE", help="fail if slower than this baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="allowed slowdown vs baseline (fraction, default 0.25)")
+    args = ap.parse_args(argv)
+
+    report = measure(args.samples)
+    failures = list(report["violations"])
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        report["regressions"] = compare(report, baseline, args.tolerance)
+        failures += report["regressions"]
+    print(json.dumps(report, indent=2))
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
+python bdo_vulkan_assetstore.py build assets/presets.pack Normal=assets/Normal Potato=assets/Potato || exit /b 1
 pyinstaller --onefile --windowed ^
-  --add-data "assets/Normal;assets/Normal" ^
-  --add-data "assets/Potato;assets/Potato" ^
+  --add-data "assets/presets.pack;assets" ^
   --add-data "BlackDesert.ico;." ^
   --name "BDOVulkanUtility" ^
   bdo_vulkan_manager.py
@@ -6,6 +6,9 @@ REM This approach typically has fewer antivirus false positives than --onefile
 REM Activate Python 3.12 virtual environment
 call venv-py312\Scripts\activate.bat
 
+REM Pack the presets into one deduplicated, compressed file
+python bdo_vulkan_assetstore.py build assets/presets.pack Normal=assets/Normal Potato=assets/Potato || exit /b 1
+
 python -m nuitka ^
   --standalone ^
   --windows-console-mode=disable ^
@@ -16,8 +19,7 @@ python -m nuitka ^
   --noinclude-unittest-mode=nofollow ^
   --mingw64 ^
   --windows-icon-from-ico=BlackDesert.ico ^
-  --include-data-dir=assets/Normal=assets/Normal ^
-  --include-data-dir=assets/Potato=assets/Potato ^
+  --include-data-files=assets/presets.pack=assets/presets.pack ^
   --include-data-files=BlackDesert.ico=BlackDesert.ico ^
   --output-filename=BDOVulkanUtility.exe ^
   --company-name=KarmaPanda ^
@@ -0,0 +1,67 @@
+# tests/conftest.py
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bdo_vulkan_cli as cli  # noqa: E402
+import bdo_vulkan_core as core  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class NoGame(core.ProcessBackend):
+    name = "test"
+
+    def pids(self, image_name: str) -> list[int]:
+        return []
+
+    def is_alive(self, pid: int) -> bool:
+        return False
+
+
+@pytest.fixture(autouse=True)
+def app_dir(tmp_path, monkeypatch):
+    """Point every file the app keeps next to itself into a fresh folder; the game is never running."""
+    app = tmp_path / "app"
+    app.mkdir()
+    for name in ("CONFIG_FILE", "CACHE_FILE", "LEGACY_CACHE_FILE", "SCAN_INDEX_FILE", "DEPLOY_JOURNAL_FILE",
+                 "TRACE_FILE", "MANIFEST_FILE", "DIGEST_CACHE_FILE"):
+        monkeypatch.setattr(core, name, app / getattr(core, name).name)
+    monkeypatch.setattr(core, "_MANIFEST_SOURCES", None)
+    core.set_process_backend(NoGame())
+    yield app
+    core.set_process_backend(None)
+
+
+@pytest.fixture
+def make_install(tmp_path):
+    """make_install(name, cache=None): a folder with GAME_EXE and optionally a copy of a fixture cache."""
+    def make(name: str, cache: str | None = None) -> Path:
+        folder = tmp_path / name
+        folder.mkdir()
+        (folder / core.GAME_EXE).write_bytes(b"MZ")
+        if cache:
+            from bdo_vulkan_statecache import install_cache_path
+            install_cache_path(str(folder)).write_bytes((FIXTURES / cache).read_bytes())
+        return folder
+    return make
+
+
+@pytest.fixture
+def preset(tmp_path):
+    """A preset folder with a dxgi.dll and a dxvk.conf."""
+    folder = tmp_path / "preset"
+    folder.mkdir()
+    (folder / "dxgi.dll").write_bytes(b"MZ dxvk")
+    (folder / "dxvk.conf").write_text("dxgi.maxFrameRate = 0\n", encoding="utf-8")
+    return folder
+
+
+def cli_run(capsys, *argv) -> tuple[int, dict]:
+    """Run the CLI with --json; (exit code, parsed output)."""
+    code = cli.main(["--json", *argv])
+    return code, json.loads(capsys.readouterr().out)
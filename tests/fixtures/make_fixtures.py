@@ -0,0 +1,49 @@
+# tests/fixtures/make_fixtures.py
+"""
+Writes the small .dxvk-cache fixtures the state cache tests read. The files
+are committed; run this only to regenerate them.
+
+    entry(n)   a valid entry whose data is derived from n, so the same n gives
+               the same entry (and hash) in every file
+"""
+import hashlib
+import struct
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def header(version: int, entry_size: int = 0) -> bytes:
+    return struct.pack("<4sII", b"DXVK", version, entry_size)
+
+
+def entry(n: int, stages: int = 0x11, bad_hash: bool = False) -> bytes:
+    data = bytes((n * 7 + i) & 0xFF for i in range(32 + n))
+    digest = hashlib.sha1(data).digest()
+    if bad_hash:
+        digest = bytes(20)
+    return struct.pack("<I20s", (len(data) << 8) | stages, digest) + data
+
+
+FIXTURES = {
+    # entries 1 and 2, with entry 1 twice
+    "v15_dupes.dxvk-cache": header(15) + entry(1) + entry(2) + entry(1),
+    # entries 2 and 3 around one whose sha1 does not match its data
+    "v15_badhash.dxvk-cache": header(15) + entry(2) + entry(9, bad_hash=True) + entry(3),
+    # entries 4 and 5, then one that breaks off halfway through its data
+    "v15_truncated.dxvk-cache": header(15) + entry(4) + entry(5) + entry(6)[:40],
+    # a newer version than the others
+    "v16.dxvk-cache": header(16) + entry(7),
+    # fixed-size entries from before state cache v8
+    "v7.dxvk-cache": header(7, 24) + bytes(range(24)) * 2,
+}
+
+
+def main():
+    for name, data in FIXTURES.items():
+        (HERE / name).write_bytes(data)
+        print(f"{name}: {len(data)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# tests/test_deploy.py
+import os
+
+import pytest
+
+import bdo_vulkan_core as core
+
+OLD_DLL = b"MZ old"
+
+
+class Crash(BaseException):
+    """The process dying half-way: nothing catches it, so the journal stays behind."""
+
+
+@pytest.fixture
+def installs(make_install):
+    """Two installs that already have a dxgi.dll of their own and no dxvk.conf."""
+    folders = [make_install("a"), make_install("b")]
+    for folder in folders:
+        (folder / "dxgi.dll").write_bytes(OLD_DLL)
+    return folders
+
+
+def fail_swap_into(monkeypatch, target, exc):
+    """Make the commit's os.replace of the staged file onto target raise exc."""
+    replace = os.replace
+
+    def guarded(src, dst, *a, **k):
+        if str(src).endswith(core.STAGE_SUFFIX) and str(dst) == str(target):
+            raise exc
+        return replace(src, dst, *a, **k)
+    monkeypatch.setattr(os, "replace", guarded)
+
+
+def leftovers(folder) -> list[str]:
+    return [p.name for p in folder.iterdir() if p.name.endswith((core.STAGE_SUFFIX, core.BACKUP_SUFFIX))]
+
+
+def assert_untouched(folders):
+    for folder in folders:
+        assert (folder / "dxgi.dll").read_bytes() == OLD_DLL
+        assert not (folder / "dxvk.conf").exists()
+        assert leftovers(folder) == []
+    assert core._journal_files() == []
+
+
+def test_failed_commit_restores_every_install(preset, installs, monkeypatch):
+    a, b = installs
+    fail_swap_into(monkeypatch, b / "dxgi.dll", PermissionError(13, "in use"))
+    result = core.copy_replace(core.DirectorySource(preset), [str(a), str(b)])
+    assert (result.copied, result.failed) == (0, 4)
+    assert "in use" in result.errors[0]
+    # Every other file was already swapped in when b's dxgi.dll failed; all are put back.
+    assert_untouched(installs)
+
+
+def test_interrupted_commit_is_rolled_back_from_the_journal(preset, installs, monkeypatch):
+    a, b = installs
+    replace = os.replace
+    fail_swap_into(monkeypatch, b / "dxgi.dll", Crash())
+    with pytest.raises(Crash):
+        core.copy_replace(core.DirectorySource(preset), [str(a), str(b)])
+    monkeypatch.setattr(os, "replace", replace)   # the next run
+    assert (a / "dxgi.dll").read_bytes() == b"MZ dxvk" and (b / "dxvk.conf").exists()
+    assert len(core._journal_files()) == 1
+    assert core.recover_interrupted_deploy() == 4
+    assert_untouched(installs)
+
+
+def test_recovery_after_the_commit_only_drops_the_backups(preset, installs, monkeypatch):
+    unlink = os.unlink
+
+    def crash_on_backup(path, *a, **k):
+        if str(path).endswith(core.BACKUP_SUFFIX):
+            raise Crash()
+        return unlink(path, *a, **k)
+    monkeypatch.setattr(os, "unlink", crash_on_backup)
+    with pytest.raises(Crash):
+        core.copy_replace(core.DirectorySource(preset), [str(p) for p in installs])
+    monkeypatch.setattr(os, "unlink", unlink)
+    assert core.recover_interrupted_deploy() == 0
+    for folder in installs:
+        assert (folder / "dxgi.dll").read_bytes() == b"MZ dxvk"
+        assert (folder / "dxvk.conf").exists()
+        assert leftovers(folder) == []
+    assert core._journal_files() == []
@@ -0,0 +1,27 @@
+# tests/test_discovery.py
+import configparser
+
+import bdo_vulkan_discovery as disc
+
+
+def test_launcher_walk_is_bounded(tmp_path):
+    root = tmp_path / "PearlAbyss"
+    (root / "Launcher").mkdir(parents=True)
+    (root / "top.ini").write_text("GamePath=E:\\BDO\n", encoding="utf-8")
+    (root / "Launcher" / "settings.json").write_text('{"path": "D:\\\\Games\\\\BlackDesert"}', encoding="utf-8")
+    # too deep to be looked at
+    deep = root / "cache" / "a"
+    deep.mkdir(parents=True)
+    (deep / "x.txt").write_text("F:\\Deep\n", encoding="utf-8")
+    # a big folder is only partly listed, and does not hide its siblings
+    logs = root / "logs"
+    logs.mkdir()
+    for i in range(disc.LAUNCHER_MAX_ENTRIES * 2):
+        (logs / f"{i}.log").write_bytes(b"")
+
+    cfg = configparser.ConfigParser()
+    cfg["discovery"] = {"launcher_configs": str(root)}
+    found = disc.discover_launcher(cfg)
+    assert "E:\\BDO" in found and "D:\\Games\\BlackDesert" in found
+    assert "F:\\Deep" not in found
+    assert len(disc._launcher_files(str(logs))) <= disc.LAUNCHER_MAX_ENTRIES
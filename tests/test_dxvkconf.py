@@ -0,0 +1,61 @@
+# tests/test_dxvkconf.py
+from bdo_vulkan_dxvkconf import DxvkConf
+
+PRESET = """\
+# Frame rate limit
+# dxgi.maxFrameRate = 0
+
+  dxgi.syncInterval  =  1
+d3d11.samplerAnisotropy = 16
+
+[BlackDesert64.exe]
+dxvk.hud = fps
+"""
+
+
+def test_set_edits_an_option_in_place():
+    conf = DxvkConf.parse(PRESET)
+    conf.set("dxgi.syncInterval", "0")
+    assert conf.lines[3] == "  dxgi.syncInterval  =  0"
+    assert conf.render() == PRESET.replace("=  1", "=  0")
+
+
+def test_set_puts_a_documented_key_under_its_comment():
+    conf = DxvkConf.parse(PRESET)
+    conf.set("dxgi.maxFrameRate", "60")
+    assert conf.lines[1:3] == ["# dxgi.maxFrameRate = 0", "dxgi.maxFrameRate = 60"]
+
+
+def test_set_appends_other_keys_to_their_section():
+    conf = DxvkConf.parse(PRESET)
+    conf.set("dxvk.numCompilerThreads", "4")
+    conf.set("dxvk.hud", "off", section="BlackDesert64.exe")
+    assert conf.lines[4:6] == ["d3d11.samplerAnisotropy = 16", "dxvk.numCompilerThreads = 4"]
+    assert conf.get("dxvk.hud", "BlackDesert64.exe") == "off"
+    assert conf.get("dxvk.hud") is None
+
+
+def test_set_starts_a_new_section():
+    conf = DxvkConf.parse(PRESET)
+    conf.set("dxgi.maxFrameRate", "30", section="BlackDesertLauncher.exe")
+    assert conf.render().endswith("dxvk.hud = fps\n\n[BlackDesertLauncher.exe]\ndxgi.maxFrameRate = 30\n")
+
+
+def test_merge_layers_every_option_over_the_preset():
+    conf = DxvkConf.parse(PRESET)
+    conf.merge(DxvkConf.parse("dxgi.syncInterval = 0\n[BlackDesert64.exe]\ndxvk.hud = off\n"))
+    assert conf.items() == [
+        (None, "dxgi.syncInterval", "0"),
+        (None, "d3d11.samplerAnisotropy", "16"),
+        ("BlackDesert64.exe", "dxvk.hud", "off"),
+    ]
+
+
+def test_crlf_line_endings_survive_an_edit():
+    text = PRESET.replace("\n", "\r\n")
+    conf = DxvkConf.parse(text)
+    conf.set("d3d11.samplerAnisotropy", "8")
+    conf.set("dxvk.hud", "off", section="Launcher.exe")
+    out = conf.render()
+    assert "\n" not in out.replace("\r\n", "")
+    assert "d3d11.samplerAnisotropy = 8\r\n" in out and out.endswith("[Launcher.exe]\r\ndxvk.hud = off\r\n")
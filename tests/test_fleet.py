@@ -0,0 +1,128 @@
+# tests/test_fleet.py
+import threading
+import time
+
+import pytest
+
+import bdo_vulkan_fleet as fleet
+from bdo_vulkan_core import DeployResult
+
+
+def inventory(tmp_path, preset, body: str, timeout: float | None = None) -> fleet.Inventory:
+    path = tmp_path / "lab.ini"
+    path.write_text(f"[fleet]\nsource = {preset}\nretries = 2\nbackoff = 0.01\n\n" + body, encoding="utf-8")
+    inv = fleet.load_inventory(path)
+    for t in inv.targets:
+        t.timeout = timeout or t.timeout   # below the inventory's 1 s minimum, to keep the tests quick
+    return inv
+
+
+def run(inv) -> fleet.TargetOutcome:
+    report = fleet.Fleet(inv).run()
+    assert len(report.outcomes) == 1
+    return report.outcomes[0]
+
+
+OVERRIDES = "[m1]\npath = m1\noverrides =\n    dxgi.maxFrameRate = 60\n"
+
+
+def test_overrides_are_written_and_rendered(tmp_path, preset, make_install):
+    m1 = make_install("m1")
+    out = run(inventory(tmp_path, preset, OVERRIDES))
+    assert out.status == "ok"
+    assert (m1 / fleet.LOCAL_CONF).read_text(encoding="utf-8").startswith(fleet.MANAGED_HEADER)
+    assert "dxgi.maxFrameRate = 60" in (m1 / "dxvk.conf").read_text(encoding="utf-8")
+
+
+def test_hand_written_local_conf_is_never_replaced(tmp_path, preset, make_install):
+    m1 = make_install("m1")
+    (m1 / fleet.LOCAL_CONF).write_text("dxgi.maxFrameRate = 30\n", encoding="utf-8")
+    out = run(inventory(tmp_path, preset, OVERRIDES))
+    assert (out.status, out.attempts) == ("failed", 1)
+    assert "settings of its own" in out.errors[-1]
+    assert (m1 / fleet.LOCAL_CONF).read_text(encoding="utf-8") == "dxgi.maxFrameRate = 30\n"
+    assert not (m1 / "dxgi.dll").exists()
+
+
+def test_hand_written_local_conf_survives_a_remove(tmp_path, preset, make_install):
+    m1 = make_install("m1")
+    (m1 / fleet.LOCAL_CONF).write_text("dxgi.maxFrameRate = 30\n", encoding="utf-8")
+    assert run(inventory(tmp_path, preset, "[m1]\npath = m1\naction = remove\n")).status == "ok"
+    assert (m1 / fleet.LOCAL_CONF).exists()
+
+
+def test_local_conf_is_rolled_back_with_a_failed_copy(tmp_path, preset, make_install, monkeypatch):
+    fresh, managed = make_install("m1"), make_install("m2")
+    old = f"{fleet.MANAGED_HEADER} lab.ini [m2]; edit it there.\ndxgi.maxFrameRate = 30\n"
+    (managed / fleet.LOCAL_CONF).write_text(old, encoding="utf-8")
+    monkeypatch.setattr(fleet, "copy_replace",
+                        lambda *a, **k: DeployResult(failed=1, errors=["disk full"]))
+    report = fleet.Fleet(inventory(tmp_path, preset, OVERRIDES + OVERRIDES.replace("m1", "m2"))).run()
+    assert [o.status for o in report.outcomes] == ["failed", "failed"]
+    assert not (fresh / fleet.LOCAL_CONF).exists()
+    assert (managed / fleet.LOCAL_CONF).read_text(encoding="utf-8") == old
+
+
+def test_no_retry_while_a_timed_out_attempt_still_runs(tmp_path, preset, make_install, monkeypatch):
+    make_install("m1")
+    release, calls = threading.Event(), []
+
+    def stuck(*a, **k):
+        calls.append(time.monotonic())
+        release.wait(10)   # ignores cancellation, like a removal on a share that stopped answering
+        return DeployResult(copied=1)
+    monkeypatch.setattr(fleet, "copy_replace", stuck)
+    monkeypatch.setattr(fleet, "FLEET_CANCEL_GRACE", 0.1)
+    try:
+        out = run(inventory(tmp_path, preset, "[m1]\npath = m1\n", timeout=0.2))
+    finally:
+        release.set()
+    assert (out.status, out.attempts, len(calls)) == ("timed_out", 1, 1)
+    assert "still running" in out.errors[-1]
+
+
+def settle_late(monkeypatch, tmp_path, preset, commit: bool):
+    """Run OVERRIDES with a commit that only starts after the attempt has timed out."""
+    import bdo_vulkan_core as core
+    release, commit_run = threading.Event(), core.DeployTransaction.run
+
+    def late(self, progress=None):
+        release.wait(10)
+        if progress and commit:
+            progress.cancelled = False   # too late to stop: the copy goes through
+        return commit_run(self, progress)
+    monkeypatch.setattr(core.DeployTransaction, "run", late)
+    monkeypatch.setattr(fleet, "FLEET_CANCEL_GRACE", 0.1)
+    try:
+        out = run(inventory(tmp_path, preset, OVERRIDES, timeout=0.1))
+    finally:
+        release.set()
+    for th in threading.enumerate():
+        if th.name.startswith("bdo-fleet"):
+            th.join(10)
+    return out
+
+
+@pytest.mark.parametrize("commit", [True, False])
+def test_local_conf_matches_a_late_copy(tmp_path, preset, make_install, monkeypatch, commit):
+    m1 = make_install("m1")
+    out = settle_late(monkeypatch, tmp_path, preset, commit)
+    assert (out.status, out.attempts) == ("timed_out", 1)
+    rendered = "dxgi.maxFrameRate = 60" in (m1 / "dxvk.conf").read_text(encoding="utf-8") \
+        if (m1 / "dxvk.conf").exists() else False
+    assert rendered is commit
+    assert (m1 / fleet.LOCAL_CONF).exists() is commit
+
+
+def test_timed_out_attempt_that_rolled_back_is_retried(tmp_path, preset, make_install, monkeypatch):
+    make_install("m1")
+    calls = []
+
+    def slow(source, dests, progress=None, **k):
+        calls.append(dests)
+        while not progress.cancelled:
+            time.sleep(0.01)
+        return DeployResult(failed=1, errors=["cancelled"])
+    monkeypatch.setattr(fleet, "copy_replace", slow)
+    out = run(inventory(tmp_path, preset, "[m1]\npath = m1\n", timeout=0.1))
+    assert (out.status, out.attempts, len(calls)) == ("timed_out", 3, 3)
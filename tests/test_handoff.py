@@ -0,0 +1,67 @@
+# tests/test_handoff.py
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+import bdo_vulkan_core as core
+
+
+@pytest.fixture(autouse=True)
+def temp_dir(tmp_path, monkeypatch):
+    """Handoff files go to the temp folder; keep them in the test's own."""
+    folder = tmp_path / "temp"
+    folder.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(folder))
+    return folder
+
+
+@pytest.fixture
+def handoff(preset, make_install):
+    results = [core.PreflightResult(str(make_install("a")), exe_ok=True, needs_elevation=True),
+               core.PreflightResult(str(make_install("b")), exe_ok=True, writable=True)]
+    return core.write_handoff("COPY", "Normal", core.DirectorySource(preset), results, wait_for_game=True)
+
+
+def test_round_trip(preset, handoff, temp_dir):
+    path, key = handoff
+    assert path.parent == temp_dir
+    h = core.read_handoff(path, key)
+    assert (h.action, h.mode, h.wait_for_game) == ("COPY", "Normal", True)
+    assert h.source_dir == str(preset.resolve())
+    assert len(h.results) == 2
+    assert [Path(p).name for p in h.paths] == ["a"]   # only the install that needs elevation
+    assert str(h.source().root) == str(preset.resolve())
+
+
+def test_tampered_payload_is_refused(handoff):
+    path, key = handoff
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    doc["payload"]["action"] = "REMOVE"
+    path.write_text(json.dumps(doc), encoding="utf-8")
+    with pytest.raises(core.HandoffError, match="bad signature"):
+        core.read_handoff(path, key)
+
+
+def test_other_key_is_refused(handoff):
+    path, _ = handoff
+    with pytest.raises(core.HandoffError, match="bad signature"):
+        core.read_handoff(path, "00" * 32)
+
+
+def test_expired_handoff_is_refused(handoff, monkeypatch):
+    path, key = handoff
+    later = time.time() + core.HANDOFF_TTL + 1
+    monkeypatch.setattr(time, "time", lambda: later)
+    with pytest.raises(core.HandoffError, match="expired"):
+        core.read_handoff(path, key)
+
+
+def test_a_handoff_is_read_once(handoff):
+    path, key = handoff
+    core.read_handoff(path, key)
+    assert not path.exists()
+    with pytest.raises(core.HandoffError, match="cannot read"):
+        core.read_handoff(path, key)
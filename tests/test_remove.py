@@ -0,0 +1,118 @@
+# tests/test_remove.py
+import os
+from pathlib import Path
+
+import pytest
+
+import bdo_vulkan_cli as cli
+import bdo_vulkan_core as core
+import bdo_vulkan_fleet as fleet
+from conftest import cli_run
+
+
+@pytest.fixture
+def locked(monkeypatch):
+    """Paths whose unlink fails, as for a dxgi.dll the running game holds open."""
+    paths = set()
+    unlink = Path.unlink
+
+    def guarded(self, *a, **k):
+        if self in paths:
+            raise PermissionError(13, "in use", str(self))
+        return unlink(self, *a, **k)
+    monkeypatch.setattr(Path, "unlink", guarded)
+    return paths
+
+
+def presets() -> dict[str, str | None]:
+    return {Path(r.path).name: r.preset for r in core.load_cache_records()}
+
+
+def test_remove_reports_files_it_could_not_remove(capsys, preset, make_install, locked):
+    a, b = make_install("a"), make_install("b")
+    targets = ["--install", str(a), "--install", str(b)]
+    code, _ = cli_run(capsys, "deploy", "--source", str(preset), *targets)
+    assert code == cli.EXIT_OK
+    assert presets() == {"a": "Normal", "b": "Normal"}
+
+    locked.add(b / "dxgi.dll")
+    code, out = cli_run(capsys, "remove", "--source", str(preset), *targets)
+    assert code == cli.EXIT_FAILED
+    assert (out["removed"], out["failed"], out["incomplete"]) == (3, 1, [str(b)])
+    assert str(b / "dxgi.dll") in out["errors"][0]
+    assert not (a / "dxgi.dll").exists() and (b / "dxgi.dll").exists()
+    # only the install that was fully cleaned loses its deploy record
+    assert presets() == {"a": None, "b": "Normal"}
+
+    # once the file is free again, a second run finishes the job
+    locked.clear()
+    code, out = cli_run(capsys, "remove", "--source", str(preset), "--install", str(b))
+    assert (code, out["removed"], out["failed"]) == (cli.EXIT_OK, 1, 0)
+    assert presets() == {"a": None, "b": None}
+
+
+def test_fleet_retries_a_failed_removal(tmp_path, preset, make_install, locked):
+    m1 = make_install("m1")
+    assert core.copy_replace(core.DirectorySource(preset), [str(m1)]).copied == 2
+    locked.add(m1 / "dxgi.dll")
+    inv = tmp_path / "lab.ini"
+    inv.write_text(f"[fleet]\nsource = {preset}\nretries = 1\nbackoff = 0.01\n\n"
+                   "[m1]\npath = m1\naction = remove\n", encoding="utf-8")
+    out, = fleet.Fleet(fleet.load_inventory(inv)).run().outcomes
+    assert (out.status, out.attempts) == ("failed", 2)
+    assert "in use" in out.errors[-1]
+
+
+def place_by_hand(preset: Path, install: Path, *names: str):
+    """Copy preset files into install as a user would, keeping content and mtime."""
+    for name in names:
+        st = (preset / name).stat()
+        (install / name).write_bytes((preset / name).read_bytes())
+        os.utime(install / name, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def test_files_that_were_already_there_are_not_owned(capsys, preset, make_install):
+    a = make_install("a")
+    place_by_hand(preset, a, "dxgi.dll")
+    code, out = cli_run(capsys, "deploy", "--source", str(preset), "--install", str(a))
+    assert (code, out["copied"], out["skipped"]) == (cli.EXIT_OK, 1, 1)
+    rec, = core.load_cache_records()
+    assert sorted(rec.owned) == ["dxvk.conf"] and rec.tracked
+
+    code, out = cli_run(capsys, "remove", "--source", str(preset), "--install", str(a))
+    assert (code, out["removed"]) == (cli.EXIT_OK, 1)
+    assert (a / "dxgi.dll").exists() and not (a / "dxvk.conf").exists()
+
+
+def test_a_deploy_that_writes_nothing_owns_nothing(capsys, preset, make_install):
+    a = make_install("a")
+    place_by_hand(preset, a, "dxgi.dll", "dxvk.conf")
+    code, out = cli_run(capsys, "deploy", "--source", str(preset), "--install", str(a))
+    assert (code, out["copied"], out["skipped"]) == (cli.EXIT_OK, 0, 2)
+    code, out = cli_run(capsys, "remove", "--source", str(preset), "--install", str(a))
+    assert (code, out["removed"]) == (cli.EXIT_OK, 0)
+    assert (a / "dxgi.dll").exists() and (a / "dxvk.conf").exists()
+
+
+def test_installs_deployed_before_ownership_fall_back_to_the_preset(capsys, preset, make_install):
+    a = make_install("a")
+    assert core.copy_replace(core.DirectorySource(preset), [str(a)]).copied == 2
+    rec, = core.load_cache_records()
+    rec.owned, rec.tracked = {}, False   # as written by a version without ownership records
+    core.write_cache_records([rec])
+    code, out = cli_run(capsys, "remove", "--source", str(preset), "--install", str(a))
+    assert (code, out["removed"]) == (cli.EXIT_OK, 2)
+
+
+def test_a_validation_pass_keeps_ownership_recorded_meanwhile(preset, make_install, monkeypatch):
+    a = make_install("a")
+    core.add_cached_installs([str(a)], "manual")
+    validate = core.validate_record
+
+    def deploy_then_validate(rec):
+        assert core.copy_replace(core.DirectorySource(preset), [rec.path]).copied == 2
+        return validate(rec)
+    monkeypatch.setattr(core, "validate_record", deploy_then_validate)
+    assert core.load_cache() == [str(a)]
+    rec, = core.load_cache_records()
+    assert sorted(rec.owned) == ["dxgi.dll", "dxvk.conf"] and rec.tracked and rec.last_verified
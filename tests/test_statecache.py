@@ -0,0 +1,165 @@
+# tests/test_statecache.py
+import shutil
+
+import pytest
+
+import bdo_vulkan_cli as cli
+import bdo_vulkan_statecache as sc
+from conftest import FIXTURES, cli_run
+from fixtures.make_fixtures import entry
+
+
+def digest(n: int) -> bytes:
+    return entry(n)[4:24]
+
+
+def hashes(path) -> list[bytes]:
+    """Entry hashes of a cache file in file order (bad and truncated entries left out)."""
+    with open(path, "rb") as f:
+        sc.read_header(f)
+        return [d for d, _ in sc.iter_entries(f, sc.StateCacheInfo(str(path)))]
+
+
+def version(path) -> int:
+    with open(path, "rb") as f:
+        return sc.read_header(f)[0]
+
+
+@pytest.fixture(autouse=True)
+def store(app_dir, monkeypatch):
+    path = app_dir / "bdovulkan_statecache.dxvk-cache"
+    monkeypatch.setattr(sc, "STATE_CACHE_STORE", path)
+    return path
+
+
+@pytest.mark.parametrize("name, entries, duplicates, invalid, truncated", [
+    ("v15_dupes.dxvk-cache", 2, 1, 0, False),
+    ("v15_badhash.dxvk-cache", 2, 0, 1, False),
+    ("v15_truncated.dxvk-cache", 2, 0, 0, True),
+    ("v16.dxvk-cache", 1, 0, 0, False),
+])
+def test_inspect(name, entries, duplicates, invalid, truncated):
+    info = sc.inspect_state_cache(FIXTURES / name)
+    assert (info.entries, info.duplicates, info.invalid, info.truncated) == (entries, duplicates, invalid, truncated)
+
+
+def test_inspect_pre_v8_reads_header_only():
+    info = sc.inspect_state_cache(FIXTURES / "v7.dxvk-cache")
+    assert (info.version, info.entries) == (7, 0)
+
+
+def test_import_merges_without_duplicates_or_bad_entries(capsys, store):
+    code, out = cli_run(capsys, "statecache", *[f"--import={FIXTURES / n}" for n in
+                              ("v15_dupes.dxvk-cache", "v15_badhash.dxvk-cache", "v15_truncated.dxvk-cache")])
+    assert code == cli.EXIT_OK
+    assert hashes(store) == [digest(n) for n in (1, 2, 3, 4, 5)]
+    assert out["store"]["entries"] == 5
+    assert out["store"]["invalid"] == 1
+    assert out["store"]["truncated"] is True
+    assert out["store"]["duplicates"] == 2   # entry 1 twice in one file, entry 2 in two files
+
+    # importing the same files again adds nothing
+    code, out = cli_run(capsys, "statecache", f"--import={FIXTURES / 'v15_dupes.dxvk-cache'}")
+    assert (code, out["store"]["added"], out["store"]["entries"]) == (cli.EXIT_OK, 0, 5)
+    assert hashes(store) == [digest(n) for n in (1, 2, 3, 4, 5)]
+
+
+def test_mixed_versions_keep_the_newest(capsys, store):
+    code, out = cli_run(capsys, "statecache", f"--import={FIXTURES / 'v15_dupes.dxvk-cache'}", f"--import={FIXTURES / 'v16.dxvk-cache'}")
+    assert version(store) == 16
+    assert hashes(store) == [digest(7)]
+    assert out["store"]["dropped"] == [str(FIXTURES / "v15_dupes.dxvk-cache")]
+    assert out["not_imported"] == [str(FIXTURES / "v15_dupes.dxvk-cache")]
+    assert code == cli.EXIT_FAILED
+
+
+def test_pre_v8_import_is_refused(capsys, store):
+    code, out = cli_run(capsys, "statecache", f"--import={FIXTURES / 'v7.dxvk-cache'}")
+    assert code == cli.EXIT_FAILED
+    assert out["not_imported"] == [str(FIXTURES / "v7.dxvk-cache")]
+    assert not store.exists()
+
+    # next to a supported file, only the old one is left out
+    code, out = cli_run(capsys, "statecache", f"--import={FIXTURES / 'v7.dxvk-cache'}", f"--import={FIXTURES / 'v16.dxvk-cache'}")
+    assert out["not_imported"] == [str(FIXTURES / "v7.dxvk-cache")]
+    assert hashes(store) == [digest(7)]
+
+
+def test_not_a_cache_is_refused(capsys, tmp_path, store):
+    junk = tmp_path / "junk.dxvk-cache"
+    junk.write_bytes(b"not a cache at all")
+    code, out = cli_run(capsys, "statecache", f"--import={junk}", f"--import={tmp_path / 'missing.dxvk-cache'}")
+    assert code == cli.EXIT_FAILED
+    assert out["not_imported"] == [str(junk), str(tmp_path / "missing.dxvk-cache")]
+
+
+def test_seed_appends_missing_entries(capsys, make_install, store):
+    fresh = make_install("fresh")
+    partial = make_install("partial", cache="v15_truncated.dxvk-cache")
+    code, out = cli_run(capsys, "statecache", f"--import={FIXTURES / 'v15_dupes.dxvk-cache'}", "--seed",
+                    "--install", str(fresh), "--install", str(partial))
+    assert code == cli.EXIT_OK
+    # the store collects the installs' caches first
+    assert hashes(store) == [digest(n) for n in (4, 5, 1, 2)]
+    # a fresh install gets a cache of the store's version
+    assert hashes(sc.install_cache_path(str(fresh))) == hashes(store)
+    assert version(sc.install_cache_path(str(fresh))) == 15
+    # the half-written tail is cut off before the store's entries are appended
+    assert hashes(sc.install_cache_path(str(partial))) == [digest(n) for n in (4, 5, 1, 2)]
+    assert sc.inspect_state_cache(sc.install_cache_path(str(partial))).truncated is False
+    assert out["seeded"][str(partial)]["added"] == 2
+
+
+def test_seed_with_a_newer_install_cache(capsys, make_install, store):
+    older = make_install("older", cache="v15_dupes.dxvk-cache")
+    newer = make_install("newer", cache="v16.dxvk-cache")
+    code, out = cli_run(capsys, "statecache", "--seed", "--install", str(older), "--install", str(newer))
+    assert code == cli.EXIT_OK
+    # the newest version wins; v15 entries are never mixed into a v16 cache
+    assert version(store) == 16
+    assert hashes(store) == [digest(7)]
+    assert out["store"]["dropped"] == [str(sc.install_cache_path(str(older)))]
+    assert hashes(sc.install_cache_path(str(newer))) == [digest(7)]
+    assert sc.install_cache_path(str(older)).read_bytes() == (FIXTURES / "v15_dupes.dxvk-cache").read_bytes()
+
+
+def test_seed_leaves_other_versions_alone(capsys, make_install, store):
+    old = make_install("old", cache="v7.dxvk-cache")
+    newer = make_install("newer", cache="v16.dxvk-cache")
+    shutil.copyfile(FIXTURES / "v15_dupes.dxvk-cache", store)
+    sc.seed_state_caches([str(old), str(newer)])
+    assert sc.install_cache_path(str(old)).read_bytes() == (FIXTURES / "v7.dxvk-cache").read_bytes()
+    assert sc.install_cache_path(str(newer)).read_bytes() == (FIXTURES / "v16.dxvk-cache").read_bytes()
+
+
+def test_prune_drops_duplicates_bad_and_truncated_entries(capsys, make_install):
+    dupes = make_install("dupes", cache="v15_dupes.dxvk-cache")
+    bad = make_install("bad", cache="v15_badhash.dxvk-cache")
+    cut = make_install("cut", cache="v15_truncated.dxvk-cache")
+    code, out = cli_run(capsys, "statecache", "--prune", "--install", str(dupes), "--install", str(bad), "--install", str(cut))
+    assert code == cli.EXIT_OK
+    for folder, want in ((dupes, (1, 2)), (bad, (2, 3)), (cut, (4, 5))):
+        path = sc.install_cache_path(str(folder))
+        assert hashes(path) == [digest(n) for n in want]
+        info = sc.inspect_state_cache(path)
+        assert (info.duplicates, info.invalid, info.truncated) == (0, 0, False)
+    assert out["pruned"][str(dupes)]["duplicates"] == 1
+    assert out["pruned"][str(bad)]["invalid"] == 1
+
+
+def test_prune_refuses_pre_v8(capsys, make_install):
+    old = make_install("old", cache="v7.dxvk-cache")
+    code, out = cli_run(capsys, "statecache", "--prune", "--install", str(old))
+    assert code == cli.EXIT_FAILED
+    assert "unsupported state cache version 7" in out["errors"][str(old)]
+    assert sc.install_cache_path(str(old)).read_bytes() == (FIXTURES / "v7.dxvk-cache").read_bytes()
+
+
+def test_export_writes_the_merged_store(capsys, tmp_path, store):
+    target = tmp_path / "export.dxvk-cache"
+    code, _ = cli_run(capsys, "statecache", f"--import={FIXTURES / 'v15_dupes.dxvk-cache'}",
+                  f"--import={FIXTURES / 'v15_badhash.dxvk-cache'}", f"--export={target}")
+    assert code == cli.EXIT_OK
+    assert target.read_bytes() == store.read_bytes()
+    assert hashes(target) == [digest(n) for n in (1, 2, 3)]
+    assert version(target) == 15